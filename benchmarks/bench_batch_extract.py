@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch_url_extract wall-clock time against local stub hosts.
+
+Compares the bounded-concurrency engine with a sequential run (one URL at a
+time, no politeness delay) for growing batch sizes spread over several hosts.
+The response cache is disabled, so both passes go to the network.
+
+Usage: python benchmarks/bench_batch_extract.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import enhanced_server_pure as server_module
+from enhanced_server_pure import batch_url_extract, close_http_client
+from benchmarks.stub_server import StubServer
+
+HOSTS = 10
+LATENCY = 0.2
+BATCH_SIZES = [5, 10, 25, 50]
+
+
+async def timed_batch(urls, **kwargs) -> float:
+    start = time.perf_counter()
+    results = await batch_url_extract(urls, **kwargs)
+    elapsed = time.perf_counter() - start
+    failed = [r for r in results if r.get("status") != "success"]
+    assert not failed, failed[0]
+    assert [r["url"] for r in results] == urls, "results out of input order"
+    return elapsed
+
+
+async def run_benchmark(servers):
+    print(f"{HOSTS} stub hosts, {LATENCY:.1f}s server latency")
+    print(f"{'urls':>6} {'sequential':>12} {'concurrent':>12} {'speedup':>9}")
+
+    for size in BATCH_SIZES:
+        urls = [servers[i % HOSTS].url(f"/page/{i}") for i in range(size)]
+
+        server_module.CONFIG["per_host_delay"] = 0.0
+        sequential = await timed_batch(urls, max_concurrency=1)
+
+        server_module.CONFIG["per_host_delay"] = 0.1
+        concurrent = await timed_batch(urls)
+
+        print(
+            f"{size:>6} {sequential:>11.2f}s {concurrent:>11.2f}s "
+            f"{sequential / concurrent:>8.1f}x"
+        )
+
+    await close_http_client()
+
+
+def main():
+    # A warm cache would serve the second pass without touching the stub hosts
+    server_module.CONFIG["cache_enabled"] = False
+    servers = [StubServer(latency=LATENCY).start() for _ in range(HOSTS)]
+    try:
+        asyncio.run(run_benchmark(servers))
+    finally:
+        for stub in servers:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
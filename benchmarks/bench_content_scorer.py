@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Regression benchmark for the fallback content scorer on large nested pages.
+
+Generates pages with no semantic content container, nested ``depth`` divs
+deep, and compares extract_page (linear bottom-up scoring) with the former
+"largest div" fallback, which re-read the text of every div and is therefore
+quadratic in nesting depth.
+
+Usage: python benchmarks/bench_content_scorer.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enhanced_server_pure import element_text, extract_page, parse_html
+
+DEPTHS = [250, 500, 1000, 2000]
+PARAGRAPH = "<p>Deeply nested pages still deserve fast, accurate extraction.</p>"
+
+
+def nested_page(depth: int) -> str:
+    """A page whose text is spread over ``depth`` nested wrapper divs"""
+
+    opening = "".join(
+        f'<div class="level-{i}"><a href="/l/{i}">link {i}</a>{PARAGRAPH}'
+        for i in range(depth)
+    )
+    return (
+        "<html><head><title>Nested</title></head><body>"
+        '<div class="share-widget"><a href="/s">Share</a></div>'
+        + opening
+        + "</div>" * depth
+        + "</body></html>"
+    )
+
+
+def legacy_largest_div(content: str) -> int:
+    """Former fallback: pick the div with the most text by re-reading each subtree"""
+
+    root = parse_html(content)
+    best = None
+    max_text_length = 0
+    for div in root.iter("div"):
+        text_length = len(element_text(div))
+        if text_length > max_text_length:
+            max_text_length = text_length
+            best = div
+    return len(element_text(best, " ")) if best is not None else 0
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'depth':>6} {'size':>8} {'largest div':>12} {'scorer':>10} {'speedup':>9}")
+    for depth in DEPTHS:
+        content = nested_page(depth)
+
+        result = extract_page(content, "nested")
+        assert result["content"].count("Deeply nested") == depth, "content was lost"
+
+        legacy_time = timed(legacy_largest_div, content)
+        scorer_time = timed(extract_page, content, "nested")
+        print(
+            f"{depth:>6} {len(content) // 1024:>6}KB {legacy_time * 1000:>10.1f}ms "
+            f"{scorer_time * 1000:>8.1f}ms {legacy_time / scorer_time:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
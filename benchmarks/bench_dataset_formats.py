@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark query_dataset load+query time across CSV, JSON, JSON Lines and Parquet.
+
+Writes the same synthetic scrape dataset in every format, then times a
+selective query that reads two columns of the rows matching two filters.
+Parquet only reads the projected columns and skips row groups whose
+statistics rule them out; CSV and JSON have to parse the whole file; JSON Lines
+streams it in batches rather than holding it all in memory.
+
+Usage: python benchmarks/bench_dataset_formats.py [rows]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import enhanced_server_pure as server_module
+from enhanced_server_pure import create_dataset, query_dataset
+
+DEFAULT_ROWS = 200_000
+FORMATS = ["csv", "json", "jsonl", "parquet"]
+COLUMNS = ["url", "fetched_at"]
+
+
+def scrape_records(rows: int):
+    """Records shaped like batch_url_extract output, ordered by fetch time"""
+
+    return [
+        {
+            "url": f"https://host{i % 50}.example/articles/{i}",
+            "title": f"Article number {i} about web data",
+            "content": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8,
+            "status": "error" if i % 17 == 0 else "success",
+            "article_length": 400 + i % 5000,
+            "fetched_at": 1_700_000_000 + i,
+        }
+        for i in range(rows)
+    ]
+
+
+def timed_query(name: str, filters) -> tuple:
+    start = time.perf_counter()
+    result = query_dataset(name, columns=COLUMNS, filters=filters, limit=1000)
+    elapsed = time.perf_counter() - start
+    assert result["status"] == "success", result
+    return elapsed, result["data"]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_ROWS
+    server_module.CONFIG["datasets_dir"] = tempfile.mkdtemp(prefix="bench_datasets_")
+    records = scrape_records(rows)
+    # The last 1% of the crawl: a range the Parquet reader can locate by statistics
+    filters = [
+        ["fetched_at", ">=", 1_700_000_000 + rows * 99 // 100],
+        ["status", "==", "success"],
+    ]
+
+    print(f"{rows} records, query: {len(COLUMNS)} columns, 2 filters, limit 1000")
+    print(f"{'format':>8} {'size':>10} {'write':>9} {'query':>10}")
+    expected = None
+    for format_type in FORMATS:
+        start = time.perf_counter()
+        created = create_dataset("scrape", records, format_type)
+        write_time = time.perf_counter() - start
+        assert created["status"] == "success", created
+
+        name = f"scrape.{format_type}"
+        size = os.path.getsize(os.path.join(server_module.CONFIG["datasets_dir"], name))
+        elapsed, data = timed_query(name, filters)
+
+        if expected is None:
+            expected = data
+        assert data == expected, f"{format_type} returned different rows"
+        print(
+            f"{format_type:>8} {size / 1024 / 1024:>8.1f}MB {write_time:>8.2f}s "
+            f"{elapsed * 1000:>8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
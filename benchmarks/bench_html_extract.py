@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for HTML extraction over the saved fixtures in benchmarks/fixtures.
+
+Compares the single-pass lxml pipeline (extract_page / parse_bing_results)
+with the previous BeautifulSoup "html.parser" implementation, which ran one
+traversal per selector. Both must produce the same title, content and
+metadata for every fixture.
+
+Usage: python benchmarks/bench_html_extract.py [repeats]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+
+from enhanced_server_pure import extract_page, parse_bing_results
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def legacy_extract_page(content: str, url: str):
+    """Previous unlock_web_content extraction, kept as the benchmark baseline"""
+
+    soup = BeautifulSoup(content, "html.parser")
+    for script in soup(
+        ["script", "style", "nav", "footer", "header", "aside", "form", "noscript"]
+    ):
+        script.decompose()
+
+    result = {
+        "url": url,
+        "title": (
+            soup.title.string.strip() if soup.title and soup.title.string else "No title"
+        ),
+        "raw_html": None,
+        "status": "success",
+    }
+
+    main_content = None
+    for selector in [
+        "main", "article", "[role='main']", ".content", ".main-content",
+        ".post-content", ".entry-content", ".article-content", ".page-content",
+        "#content", "#main", ".container .row .col",
+    ]:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+    if not main_content:
+        max_text_length = 0
+        for div in soup.find_all("div"):
+            div_text = div.get_text(strip=True)
+            if len(div_text) > max_text_length:
+                max_text_length = len(div_text)
+                main_content = div
+    if not main_content:
+        main_content = soup.find("body") or soup
+
+    content_text = re.sub(r"\s+", " ", main_content.get_text(separator=" ", strip=True))
+    result["content"] = content_text.strip()
+    result["meta"] = {
+        "description": "",
+        "keywords": "",
+        "author": "",
+        "published_date": "",
+        "article_length": len(content_text),
+    }
+
+    meta_desc = (
+        soup.find("meta", attrs={"name": "description"})
+        or soup.find("meta", attrs={"property": "og:description"})
+        or soup.find("meta", attrs={"name": "twitter:description"})
+    )
+    if meta_desc:
+        result["meta"]["description"] = meta_desc.get("content", "").strip()
+    meta_keywords = soup.find("meta", attrs={"name": "keywords"})
+    if meta_keywords:
+        result["meta"]["keywords"] = meta_keywords.get("content", "").strip()
+
+    for selector in [
+        'meta[name="author"]', 'meta[name="article:author"]',
+        'meta[property="article:author"]', ".author", ".byline", ".post-author",
+        '[rel="author"]',
+    ]:
+        author_elem = soup.select_one(selector)
+        if author_elem:
+            if author_elem.name == "meta":
+                result["meta"]["author"] = author_elem.get("content", "").strip()
+            else:
+                result["meta"]["author"] = author_elem.get_text(strip=True)
+            break
+
+    for selector in [
+        'meta[property="article:published_time"]',
+        'meta[name="article:published_time"]', 'meta[name="pubdate"]',
+        "time[datetime]", ".date", ".published", ".post-date",
+    ]:
+        date_elem = soup.select_one(selector)
+        if date_elem:
+            if date_elem.name == "meta":
+                result["meta"]["published_date"] = date_elem.get("content", "").strip()
+            elif date_elem.name == "time":
+                result["meta"]["published_date"] = date_elem.get("datetime", "").strip()
+            else:
+                result["meta"]["published_date"] = date_elem.get_text(strip=True)
+            break
+
+    return result
+
+
+def legacy_parse_bing_results(content: str, num_results: int):
+    """Previous search_bing parsing, kept as the benchmark baseline"""
+
+    soup = BeautifulSoup(content, "html.parser")
+    results = []
+    result_containers = soup.find_all("li", class_="b_algo")
+    if not result_containers:
+        result_containers = soup.find_all("div", class_="b_algo")
+    for result_div in result_containers[:num_results]:
+        title_link = result_div.find("h2")
+        if title_link:
+            title_link = title_link.find("a")
+        snippet_div = result_div.find("p") or result_div.find("div", class_="b_caption")
+        if not title_link:
+            title_link = result_div.find("a", href=True)
+        if not snippet_div:
+            snippet_div = result_div.find("span") or result_div.find("div")
+        if title_link and title_link.get("href"):
+            title = title_link.get_text(strip=True)
+            url = title_link.get("href", "")
+            snippet = snippet_div.get_text(strip=True) if snippet_div else ""
+            if url.startswith("http") and "bing.com" not in url and len(title) > 3:
+                results.append({"title": title, "url": url, "snippet": snippet})
+    return results
+
+
+def best_time(func, *args, repeats: int) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print(f"best of {repeats} runs per fixture")
+    print(f"{'fixture':<22} {'size':>8} {'bs4':>10} {'lxml':>10} {'speedup':>9}")
+
+    total_legacy = total_new = 0.0
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        with open(os.path.join(FIXTURES_DIR, filename), encoding="utf-8") as f:
+            content = f.read()
+
+        if filename.startswith("bing_"):
+            legacy, new = legacy_parse_bing_results, parse_bing_results
+            args = (content, 50)
+        else:
+            legacy, new = legacy_extract_page, extract_page
+            args = (content, filename)
+
+        assert new(*args) == legacy(*args), f"{filename}: output differs from baseline"
+
+        legacy_time = best_time(legacy, *args, repeats=repeats)
+        new_time = best_time(new, *args, repeats=repeats)
+        total_legacy += legacy_time
+        total_new += new_time
+        print(
+            f"{filename:<22} {len(content) // 1024:>6}KB {legacy_time * 1000:>8.1f}ms "
+            f"{new_time * 1000:>8.1f}ms {legacy_time / new_time:>8.1f}x"
+        )
+
+    print(
+        f"{'total':<22} {'':>8} {total_legacy * 1000:>8.1f}ms "
+        f"{total_new * 1000:>8.1f}ms {total_legacy / total_new:>8.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
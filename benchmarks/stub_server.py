@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Local stub HTTP server used by the offline benchmarks and tests.
+
+Each server runs on 127.0.0.1 with an ephemeral port in a background thread,
+so several instances can stand in for several distinct hosts.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+DEFAULT_PAGE = (
+    "<html><head><title>Stub page</title>"
+    '<meta name="description" content="Local stub page"></head>'
+    "<body><nav>Menu</nav><article><h1>Stub article</h1>"
+    "<p>"
+    + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40
+    + "</p></article><footer>Footer</footer></body></html>"
+)
+
+
+def send_response(
+    handler: BaseHTTPRequestHandler,
+    status: int = 200,
+    body: str | bytes = DEFAULT_PAGE,
+    headers: Optional[Dict[str, str]] = None,
+) -> None:
+    """Write a complete response to the client"""
+
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    headers = {"Content-Type": "text/html; charset=utf-8", **(headers or {})}
+
+    handler.send_response(status)
+    for key, value in headers.items():
+        handler.send_header(key, value)
+    handler.send_header("Content-Length", str(len(body)))
+    handler.end_headers()
+    if handler.command != "HEAD":
+        handler.wfile.write(body)
+
+
+class StubServer:
+    """Threaded HTTP server answering GET requests from a table of routes.
+
+    ``routes`` maps a request path (without query string) to a callable that
+    receives the request handler and writes the response. Unknown paths get
+    ``DEFAULT_PAGE`` after ``latency`` seconds.
+    """
+
+    def __init__(
+        self,
+        routes: Optional[Dict[str, Callable[[BaseHTTPRequestHandler], None]]] = None,
+        latency: float = 0.0,
+    ):
+        self.routes = routes or {}
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.request_count += 1
+                route = stub.routes.get(self.path.split("?", 1)[0])
+                try:
+                    if route is not None:
+                        route(self)
+                    else:
+                        if stub.latency:
+                            time.sleep(stub.latency)
+                        send_response(self)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def url(self, path: str = "/") -> str:
+        return self.base_url + path
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
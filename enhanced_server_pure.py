@@ -14,6 +14,7 @@ This module provides a comprehensive MCP server that includes:
 """
 
 import asyncio
+import ast
 import os
 import sys
 import json
@@ -24,6 +25,20 @@ from typing import Any, Dict, List, Optional
 from urllib.parse import urljoin, urlparse
 import time
 import random
+import hashlib
+import codecs
+import gzip
+import io
+import itertools
+import multiprocessing
+import threading
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode
 
 # Core MCP imports
 from mcp.server.models import InitializationOptions
@@ -33,8 +48,9 @@ import mcp.server.stdio
 
 # Web and automation imports
 import aiohttp
-import requests
-from bs4 import BeautifulSoup
+import httpx
+import lxml.html
+from lxml import etree
 from fake_useragent import UserAgent
 import pandas as pd
 import numpy as np
@@ -47,11 +63,47 @@ try:
     from selenium.webdriver.chrome.options import Options as ChromeOptions
     from selenium.webdriver.support.ui import WebDriverWait
     from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
 
     SELENIUM_AVAILABLE = True
 except ImportError:
     SELENIUM_AVAILABLE = False
 
+# HTTP/2 support for the shared HTTP client (optional)
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Columnar (Parquet) dataset storage (optional)
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as pa_dataset
+    import pyarrow.parquet as pq
+
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# zstd compression for JSON Lines datasets (optional)
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Advisory locks serializing dataset writers across processes (POSIX only)
+try:
+    import fcntl
+
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
 # Create the server instance
 server = Server("Pure Enhanced MCP Server")
 
@@ -60,7 +112,105 @@ CONFIG = {
     "user_agent": UserAgent(),
     "default_timeout": 30,
     "max_retries": 3,
+    # Retry policies per tool; missing keys fall back to "default"
+    "retry_policies": {
+        "default": {"base_delay": 0.5, "max_delay": 8.0, "deadline": 60.0},
+        "web_unlocker": {},
+        "batch_url_extract": {"max_attempts": 2, "deadline": 45.0},
+        "web_search": {"max_attempts": 2, "max_delay": 2.0, "deadline": 15.0},
+    },
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "max_connections_per_host": 8,
+    "keepalive_expiry": 30,
+    "http2": True,
+    "batch_concurrency": 10,
+    "batch_per_host_concurrency": 2,
+    "per_host_delay": 1.0,
+    "max_extractions": 3,
+    "extraction_time_budget": 20,
     "datasets_dir": os.path.join(os.path.dirname(__file__), "datasets"),
+    # Smaller row groups let Parquet filters skip more of the file
+    "parquet_row_group_size": 64 * 1024,
+    "parquet_compression": "zstd",
+    # Loaded DataFrames kept in memory between queries; 0 disables the cache
+    "dataset_cache_bytes": 256 * 1024 * 1024,
+    # Text columns with at most this share of distinct values become categoricals
+    "dataset_category_ratio": 0.5,
+    # Rows per batch when ingesting into SQLite or streaming a CSV query
+    "dataset_chunk_rows": 50_000,
+    # CSV files at least this large are queried in chunks instead of loaded whole
+    "dataset_stream_min_bytes": 64 * 1024 * 1024,
+    # Lines parsed per batch when querying a JSON Lines dataset
+    "jsonl_batch_lines": 5000,
+    # Records buffered by a tool's dataset sink before they are written out
+    "sink_batch_records": 100,
+    "cache_enabled": True,
+    "cache_dir": os.path.join(os.path.dirname(__file__), "cache"),
+    "cache_memory_entries": 256,
+    "cache_memory_bytes": 64 * 1024 * 1024,
+    "cache_disk_bytes": 512 * 1024 * 1024,
+    "cache_default_ttl": 3600,
+    "cache_max_ttl": 24 * 3600,
+    "serp_cache_ttl": 600,
+    "serp_stale_ttl": 3600,
+    "serp_cache_entries": 512,
+    "serp_fetch_count": 20,
+    "max_body_bytes": 5 * 1024 * 1024,
+    "search_extract_max_bytes": 1024 * 1024,
+    "max_download_seconds": 60,
+    "allowed_content_types": [
+        "text/html",
+        "application/xhtml+xml",
+        "application/xml",
+        "text/xml",
+        "text/plain",
+    ],
+    "breaker_window": 60,
+    "breaker_min_requests": 5,
+    "breaker_failure_rate": 0.5,
+    "breaker_open_seconds": 30,
+    "browser_pool_size": 2,
+    "browser_max_uses": 50,
+    "browser_idle_timeout": 300,
+    "browser_checkout_timeout": 60,
+    "browser_workers": 4,
+    "browser_session_timeout": 120,
+    "browser_wait_timeout": 10,
+    # Characters of extracted text per URL carried in batch progress notifications
+    "browser_progress_text_chars": 500,
+    # Named load profiles for browser tools; "full" loads everything
+    "browser_load_profiles": {
+        "full": {},
+        "lightweight": {
+            "block_images": True,
+            "block_media": True,
+            "block_fonts": True,
+            "page_load_strategy": "eager",
+            "disable_extensions": True,
+        },
+        "text_only": {
+            "block_images": True,
+            "block_media": True,
+            "block_fonts": True,
+            "page_load_strategy": "none",
+            "disable_extensions": True,
+            "disable_javascript": True,
+        },
+    },
+    # Tiered fetch: render pages in the browser when plain HTTP is not enough
+    "render_fallback": True,
+    "render_min_text_chars": 200,
+    "render_host_ttl": 6 * 3600,
+    # How long a host where rendering did not help skips the browser tier
+    "render_static_ttl": 3600,
+    "render_timeout": 45,
+    "render_wait_timeout": 15,
+    "render_idle_ms": 500,
+    "render_load_profile": "lightweight",
+    "parse_executor": "process",
+    "parse_workers": min(os.cpu_count() or 1, 8),
+    "parse_inline_max_bytes": 32 * 1024,
 }
 
 # Ensure datasets directory exists
@@ -70,609 +220,4157 @@ os.makedirs(CONFIG["datasets_dir"], exist_ok=True)
 # === WEB UNLOCKER FUNCTIONS ===
 
 
-async def get_with_retries(
-    url: str, headers: Dict[str, str] = None, proxies: Dict[str, str] = None
-) -> str:
-    """Get web content with retries and different strategies"""
+def build_request_headers(referer: Optional[str] = None) -> Dict[str, str]:
+    """Build browser-like request headers with a random User-Agent"""
 
-    if headers is None:
-        headers = {
-            "User-Agent": CONFIG["user_agent"].random,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-        }
+    headers = {
+        "User-Agent": CONFIG["user_agent"].random,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+        "Accept-Encoding": "gzip, deflate",
+    }
+    if referer:
+        headers["Referer"] = referer
+    return headers
 
-    strategies = [
-        # Strategy 1: Direct request
-        lambda: requests.get(url, headers=headers, timeout=CONFIG["default_timeout"]),
-        # Strategy 2: With different user agent
-        lambda: requests.get(
-            url,
-            headers={**headers, "User-Agent": CONFIG["user_agent"].random},
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async HTTP client, creating it on first use"""
+
+    global _http_client, _http_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            http2=CONFIG["http2"] and HTTP2_AVAILABLE,
+            follow_redirects=True,
             timeout=CONFIG["default_timeout"],
-        ),
-        # Strategy 3: With session
-        lambda: requests.Session().get(
-            url, headers=headers, timeout=CONFIG["default_timeout"]
-        ),
-    ]
+            limits=httpx.Limits(
+                max_connections=CONFIG["max_connections"],
+                max_keepalive_connections=CONFIG["max_keepalive_connections"],
+                keepalive_expiry=CONFIG["keepalive_expiry"],
+            ),
+        )
+        _http_client_loop = loop
+        _host_semaphores.clear()
+    return _http_client
+
+
+def get_host_semaphore(url: str) -> asyncio.Semaphore:
+    """Return the semaphore limiting concurrent connections to the URL's host"""
+
+    host = urlparse(url).netloc.lower()
+    semaphore = _host_semaphores.get(host)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(CONFIG["max_connections_per_host"])
+        _host_semaphores[host] = semaphore
+    return semaphore
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client and release pooled connections"""
+
+    global _http_client, _http_client_loop
+
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+    _http_client_loop = None
+    _host_semaphores.clear()
+
+
+async def http_get(
+    url: str, headers: Dict[str, str] = None, params: Dict[str, Any] = None
+) -> httpx.Response:
+    """Issue a GET through the shared client, respecting the per-host limit"""
+
+    client = get_http_client()
+    async with get_host_semaphore(url):
+        response = await client.get(url, headers=headers, params=params)
+    if response.status_code != 304:
+        response.raise_for_status()
+    return response
+
+
+META_CHARSET_PATTERN = re.compile(
+    rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_.:-]+)""", re.IGNORECASE
+)
+
+
+def detect_charset(content_type: str, first_chunk: bytes) -> str:
+    """Pick a text encoding from the Content-Type header or the first body chunk"""
 
-    for i, strategy in enumerate(strategies):
+    candidates = []
+    _, _, params = content_type.partition(";")
+    for param in params.split(";"):
+        key, _, value = param.strip().partition("=")
+        if key.lower() == "charset" and value:
+            candidates.append(value.strip("\"' "))
+
+    if first_chunk.startswith(codecs.BOM_UTF8):
+        candidates.append("utf-8-sig")
+    elif first_chunk.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        candidates.append("utf-16")
+
+    match = META_CHARSET_PATTERN.search(first_chunk[:4096])
+    if match:
+        candidates.append(match.group(1).decode("ascii", "ignore"))
+
+    for candidate in candidates:
         try:
-            await asyncio.sleep(random.uniform(0.5, 2))  # Random delay
-            response = strategy()
-            response.raise_for_status()
-            return response.text
-        except Exception as e:
-            if i == len(strategies) - 1:
-                raise Exception(f"All strategies failed. Last error: {str(e)}")
+            return codecs.lookup(candidate).name
+        except LookupError:
             continue
+    return "utf-8"
 
-    raise Exception("Failed to fetch content")
 
+class DownloadedPage:
+    """A streamed response body together with the metadata callers need"""
 
-async def unlock_web_content(
-    url: str, extract_text: bool = True, bypass_cloudflare: bool = False
-) -> Dict[str, Any]:
-    """Unlock and extract content from web pages with improved content extraction"""
+    def __init__(
+        self, status_code: int, headers: httpx.Headers, text: str, truncated: bool
+    ):
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.truncated = truncated
 
-    try:
-        content = await get_with_retries(url)
-        soup = BeautifulSoup(content, "html.parser")
 
-        # Remove unwanted elements
-        for script in soup(
-            ["script", "style", "nav", "footer", "header", "aside", "form", "noscript"]
-        ):
-            script.decompose()
+async def stream_download(
+    url: str, headers: Dict[str, str] = None, max_bytes: int = None
+) -> DownloadedPage:
+    """Download a page incrementally, stopping at a size and time limit"""
 
-        result = {
-            "url": url,
-            "title": (
-                soup.title.string.strip()
-                if soup.title and soup.title.string
-                else "No title"
-            ),
-            "raw_html": content if not extract_text else None,
-            "status": "success",
+    if max_bytes is None:
+        max_bytes = CONFIG["max_body_bytes"]
+
+    client = get_http_client()
+    async with get_host_semaphore(url):
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return DownloadedPage(304, response.headers, "", False)
+            response.raise_for_status()
+
+            content_type = response.headers.get("content-type", "")
+            media_type = content_type.split(";", 1)[0].strip().lower()
+            if media_type and media_type not in CONFIG["allowed_content_types"]:
+                raise ValueError(f"Unsupported content type: {media_type}")
+
+            parts = []
+            received = 0
+            truncated = False
+            decoder = None
+            try:
+                async with asyncio.timeout(CONFIG["max_download_seconds"]):
+                    async for chunk in response.aiter_bytes():
+                        if decoder is None:
+                            encoding = detect_charset(content_type, chunk)
+                            decoder = codecs.getincrementaldecoder(encoding)(
+                                errors="replace"
+                            )
+                        if received + len(chunk) > max_bytes:
+                            chunk = chunk[: max_bytes - received]
+                            truncated = True
+                        received += len(chunk)
+                        parts.append(decoder.decode(chunk))
+                        if truncated:
+                            break
+            except TimeoutError:
+                if not received:
+                    raise TimeoutError(
+                        f"No data received within {CONFIG['max_download_seconds']}s"
+                    )
+                truncated = True
+
+            if decoder is not None:
+                parts.append(decoder.decode(b"", final=True))
+            return DownloadedPage(
+                response.status_code, response.headers, "".join(parts), truncated
+            )
+
+
+# === HTTP RESPONSE CACHE ===
+
+
+def normalize_url(url: str) -> str:
+    """Normalize a URL for use as a cache key"""
+
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    port = parsed.port
+    if port and not (scheme, port) in (("http", 80), ("https", 443)):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    path = parsed.path or "/"
+    return f"{scheme}://{host}{path}" + (f"?{query}" if query else "")
+
+
+def parse_cache_control(value: str) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a directive -> value mapping"""
+
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+def response_ttl(headers: Any) -> Optional[float]:
+    """Return how long a response may be served without revalidation"""
+
+    cache_control = parse_cache_control(headers.get("cache-control", ""))
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        ttl = 0.0
+    elif cache_control.get("s-maxage", "").isdigit():
+        ttl = float(cache_control["s-maxage"])
+    elif cache_control.get("max-age", "").isdigit():
+        ttl = float(cache_control["max-age"])
+    elif headers.get("expires"):
+        try:
+            ttl = parsedate_to_datetime(headers["expires"]).timestamp() - time.time()
+        except (TypeError, ValueError):
+            ttl = 0.0
+    else:
+        ttl = float(CONFIG["cache_default_ttl"])
+
+    ttl = min(max(ttl, 0.0), float(CONFIG["cache_max_ttl"]))
+    if ttl == 0 and not (headers.get("etag") or headers.get("last-modified")):
+        # Nothing to revalidate with, so storing it would never pay off
+        return None
+    return ttl
+
+
+class HTTPResponseCache:
+    """Two-tier (memory LRU and SQLite) cache of fetched page bodies keyed by normalized URL"""
+
+    def __init__(
+        self,
+        db_path: str,
+        memory_entries: int = 256,
+        memory_bytes: int = 64 * 1024 * 1024,
+        disk_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.db_path = db_path
+        self.memory_entries = memory_entries
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._memory_size = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._disk_size = 0
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "stores": 0,
+            "evictions": 0,
         }
 
-        if extract_text:
-            # Try multiple strategies to extract main content
-            main_content = None
-            content_text = ""
-
-            # Strategy 1: Look for common content containers
-            content_selectors = [
-                "main",
-                "article",
-                "[role='main']",
-                ".content",
-                ".main-content",
-                ".post-content",
-                ".entry-content",
-                ".article-content",
-                ".page-content",
-                "#content",
-                "#main",
-                ".container .row .col",  # Bootstrap-style layout
-            ]
-
-            for selector in content_selectors:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-
-            # Strategy 2: Find largest text block if no semantic container found
-            if not main_content:
-                text_divs = soup.find_all("div")
-                if text_divs:
-                    # Find div with most text content
-                    max_text_length = 0
-                    for div in text_divs:
-                        div_text = div.get_text(strip=True)
-                        if len(div_text) > max_text_length:
-                            max_text_length = len(div_text)
-                            main_content = div
-
-            # Strategy 3: Use body as fallback
-            if not main_content:
-                main_content = soup.find("body") or soup
-
-            if main_content:
-                # Clean up the content
-                content_text = main_content.get_text(separator=" ", strip=True)
-
-                # Clean up excessive whitespace
-                import re
-
-                content_text = re.sub(r"\s+", " ", content_text)
-                content_text = re.sub(r"\n\s*\n", "\n\n", content_text)
-
-                result["content"] = content_text.strip()
-            else:
-                result["content"] = "No content could be extracted"
-
-            # Extract metadata with improved parsing
-            result["meta"] = {
-                "description": "",
-                "keywords": "",
-                "author": "",
-                "published_date": "",
-                "article_length": len(content_text),
-            }
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS bodies (
+                    digest TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    size INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    digest TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS responses_accessed
+                    ON responses (accessed_at);
+                CREATE INDEX IF NOT EXISTS responses_digest
+                    ON responses (digest);
+                """
+            )
+            # Summed once here, then kept up to date as bodies come and go
+            self._disk_size = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM bodies"
+            ).fetchone()[0]
+        return self._db
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a URL, fresh or stale, or None"""
+
+        key = normalize_url(url)
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    async def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        """Async get(): the disk tier is read on a thread"""
+
+        key = normalize_url(url)
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+
+        entry = await run_blocking(self._read_disk, key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def put(self, url: str, body: str, headers: Any) -> bool:
+        """Store a 200 response body if its headers allow caching"""
+
+        key, entry = self._new_entry(url, body, headers)
+        if entry is None:
+            return False
+        self._remember(key, entry)
+        self._stored(self._write_disk(key, entry))
+        return True
+
+    async def store(self, url: str, body: str, headers: Any) -> bool:
+        """Async put(): hashing and the disk write run on a thread"""
+
+        key, entry = self._new_entry(url, body, headers)
+        if entry is None:
+            return False
+        self._remember(key, entry)
+        self._stored(await run_blocking(self._write_disk, key, entry))
+        return True
+
+    def refresh(self, url: str, headers: Any) -> None:
+        """Extend the lifetime of an entry after a 304 Not Modified"""
+
+        entry = self.get(url)
+        if entry is not None:
+            self._update_disk(normalize_url(url), self._refreshed(entry, headers))
+
+    async def revalidate(self, url: str, headers: Any) -> None:
+        """Async refresh(): the disk update runs on a thread"""
+
+        entry = await self.lookup(url)
+        if entry is not None:
+            await run_blocking(
+                self._update_disk, normalize_url(url), self._refreshed(entry, headers)
+            )
 
-            # Meta description
-            meta_desc = (
-                soup.find("meta", attrs={"name": "description"})
-                or soup.find("meta", attrs={"property": "og:description"})
-                or soup.find("meta", attrs={"name": "twitter:description"})
-            )
-            if meta_desc:
-                result["meta"]["description"] = meta_desc.get("content", "").strip()
-
-            # Meta keywords
-            meta_keywords = soup.find("meta", attrs={"name": "keywords"})
-            if meta_keywords:
-                result["meta"]["keywords"] = meta_keywords.get("content", "").strip()
-
-            # Author information
-            author_selectors = [
-                'meta[name="author"]',
-                'meta[name="article:author"]',
-                'meta[property="article:author"]',
-                ".author",
-                ".byline",
-                ".post-author",
-                '[rel="author"]',
-            ]
-
-            for selector in author_selectors:
-                author_elem = soup.select_one(selector)
-                if author_elem:
-                    if author_elem.name == "meta":
-                        result["meta"]["author"] = author_elem.get(
-                            "content", ""
-                        ).strip()
-                    else:
-                        result["meta"]["author"] = author_elem.get_text(strip=True)
-                    break
-
-            # Published date
-            date_selectors = [
-                'meta[property="article:published_time"]',
-                'meta[name="article:published_time"]',
-                'meta[name="pubdate"]',
-                "time[datetime]",
-                ".date",
-                ".published",
-                ".post-date",
-            ]
-
-            for selector in date_selectors:
-                date_elem = soup.select_one(selector)
-                if date_elem:
-                    if date_elem.name == "meta":
-                        result["meta"]["published_date"] = date_elem.get(
-                            "content", ""
-                        ).strip()
-                    elif date_elem.name == "time":
-                        result["meta"]["published_date"] = date_elem.get(
-                            "datetime", ""
-                        ).strip()
-                    else:
-                        result["meta"]["published_date"] = date_elem.get_text(
-                            strip=True
-                        )
-                    break
+    def clear(self) -> None:
+        """Drop every cached entry from both tiers"""
 
-        return result
+        self._memory.clear()
+        self._memory_size = 0
+        with self._db_lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.execute("DELETE FROM bodies")
+            self.db.commit()
+            self._disk_size = 0
 
-    except Exception as e:
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the size of both tiers"""
+
+        with self._db_lock:
+            disk_entries = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            disk_bytes = self._disk_size
+        lookups = self.counters["hits"] + self.counters["misses"]
         return {
-            "url": url,
-            "status": "error",
-            "error": f"Content extraction failed: {str(e)}",
-            "content": "",
-            "title": "",
-            "meta": {},
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": disk_entries,
+            "disk_bytes": disk_bytes,
         }
 
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _new_entry(self, url: str, body: str, headers: Any):
+        ttl = response_ttl(headers)
+        if ttl is None:
+            return None, None
+        return normalize_url(url), {
+            "body": body,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "expires_at": time.time() + ttl,
+        }
 
-# === SEARCH/SERP FUNCTIONS ===
+    @staticmethod
+    def _refreshed(entry: Dict[str, Any], headers: Any) -> Dict[str, Any]:
+        ttl = response_ttl(headers)
+        entry["expires_at"] = time.time() + (ttl or 0.0)
+        entry["etag"] = headers.get("etag") or entry["etag"]
+        entry["last_modified"] = headers.get("last-modified") or entry["last_modified"]
+        return entry
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_size -= len(previous["body"])
+
+        size = len(entry["body"])
+        if size > self.memory_bytes:
+            return
+        self._memory[key] = entry
+        self._memory_size += size
+
+        while len(self._memory) > self.memory_entries or (
+            self._memory_size > self.memory_bytes
+        ):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted["body"])
+
+    def _stored(self, evicted_keys: List[str]) -> None:
+        """Count a store and drop the entries the disk tier evicted for it"""
+
+        for key in evicted_keys:
+            evicted = self._memory.pop(key, None)
+            if evicted is not None:
+                self._memory_size -= len(evicted["body"])
+        self.counters["evictions"] += len(evicted_keys)
+        self.counters["stores"] += 1
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = self.db.execute(
+                "SELECT b.body, r.etag, r.last_modified, r.expires_at "
+                "FROM responses r JOIN bodies b ON b.digest = r.digest WHERE r.url = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            self.db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), key)
+            )
+            self.db.commit()
+        return {
+            "body": row[0],
+            "etag": row[1],
+            "last_modified": row[2],
+            "expires_at": row[3],
+        }
 
+    def _write_disk(self, key: str, entry: Dict[str, Any]) -> List[str]:
+        """Write an entry to SQLite and return the keys evicted to make room"""
+
+        encoded = entry["body"].encode("utf-8")
+        digest = hashlib.sha256(encoded).hexdigest()
+
+        with self._db_lock:
+            previous = self.db.execute(
+                "SELECT digest FROM responses WHERE url = ?", (key,)
+            ).fetchone()
+            inserted = self.db.execute(
+                "INSERT OR IGNORE INTO bodies (digest, body, size) VALUES (?, ?, ?)",
+                (digest, entry["body"], len(encoded)),
+            ).rowcount
+            self._disk_size += len(encoded) if inserted else 0
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(url, digest, etag, last_modified, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    digest,
+                    entry["etag"],
+                    entry["last_modified"],
+                    entry["expires_at"],
+                    time.time(),
+                ),
+            )
+            if previous is not None and previous[0] != digest:
+                self._drop_orphan_body(previous[0])
+            evicted = self._evict_disk()
+            self.db.commit()
+        return evicted
+
+    def _update_disk(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._db_lock:
+            self.db.execute(
+                "UPDATE responses SET etag = ?, last_modified = ?, expires_at = ? "
+                "WHERE url = ?",
+                (entry["etag"], entry["last_modified"], entry["expires_at"], key),
+            )
+            self.db.commit()
+
+    def _drop_orphan_body(self, digest: str) -> None:
+        """Delete a body no response points at any more, keeping the byte count"""
+
+        if self.db.execute(
+            "SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone():
+            return
+        row = self.db.execute("SELECT size FROM bodies WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            self.db.execute("DELETE FROM bodies WHERE digest = ?", (digest,))
+            self._disk_size -= row[0]
+
+    def _evict_disk(self) -> List[str]:
+        evicted = []
+        while self._disk_size > self.disk_bytes:
+            row = self.db.execute(
+                "SELECT url, digest FROM responses ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self.db.execute("DELETE FROM responses WHERE url = ?", (row[0],))
+            self._drop_orphan_body(row[1])
+            evicted.append(row[0])
+        return evicted
 
-async def search_bing(query: str, num_results: int = 10) -> List[Dict[str, str]]:
-    """Search using Bing with robust parsing"""
 
-    try:
-        headers = {
-            "User-Agent": CONFIG["user_agent"].random,
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Accept-Encoding": "gzip, deflate",
-            "Connection": "keep-alive",
-            "Referer": "https://www.bing.com/",
-        }
+_response_cache: Optional[HTTPResponseCache] = None
 
-        # Bing search URL
-        search_url = "https://www.bing.com/search"
-        params = {"q": query, "count": min(num_results, 50)}
 
-        response = requests.get(
-            search_url,
-            headers=headers,
-            params=params,
-            timeout=CONFIG["default_timeout"],
+def get_response_cache() -> Optional[HTTPResponseCache]:
+    """Return the shared response cache, or None when caching is disabled"""
+
+    global _response_cache
+
+    if not CONFIG["cache_enabled"]:
+        return None
+    if _response_cache is None:
+        _response_cache = HTTPResponseCache(
+            os.path.join(CONFIG["cache_dir"], "responses.sqlite3"),
+            memory_entries=CONFIG["cache_memory_entries"],
+            memory_bytes=CONFIG["cache_memory_bytes"],
+            disk_bytes=CONFIG["cache_disk_bytes"],
         )
-        response.raise_for_status()
+    return _response_cache
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        results = []
 
-        # Try multiple parsing strategies for Bing results
-        result_containers = []
+async def fetch_text(
+    url: str,
+    headers: Dict[str, str],
+    cached: Optional[Dict[str, Any]] = None,
+    max_bytes: int = None,
+) -> str:
+    """Fetch a page body, revalidating a stale cache entry when one exists"""
 
-        # Strategy 1: Main result containers
-        result_containers.extend(soup.find_all("li", class_="b_algo"))
+    cache = get_response_cache()
+    request_headers = dict(headers)
+    if cached is not None:
+        if cached.get("etag"):
+            request_headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            request_headers["If-Modified-Since"] = cached["last_modified"]
 
-        # Strategy 2: Alternative result containers
-        if not result_containers:
-            result_containers.extend(soup.find_all("div", class_="b_algo"))
+    page = await stream_download(url, headers=request_headers, max_bytes=max_bytes)
 
-        # Strategy 3: Generic result containers
-        if not result_containers:
-            result_containers.extend(
-                soup.find_all("div", class_=lambda x: x and "algo" in x.lower())
-            )
+    if page.status_code == 304 and cached is not None:
+        await cache.revalidate(url, page.headers)
+        cache.counters["revalidated"] += 1
+        return cached["body"]
 
-        # Parse search results with multiple fallback strategies
-        for result_div in result_containers[:num_results]:
-            try:
-                # Strategy 1: Standard Bing selectors
-                title_link = result_div.find("h2")
-                if title_link:
-                    title_link = title_link.find("a")
+    # Truncated bodies are never cached, so a later full read is not short-changed
+    if cache is not None and page.status_code == 200 and not page.truncated:
+        await cache.store(url, page.text, page.headers)
+    return page.text
+
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class HostCircuitBreaker:
+    """Per-host circuit breaker driven by the failure rate over a sliding window"""
+
+    MAX_TRACKED_HOSTS = 1024
 
-                snippet_div = result_div.find("p") or result_div.find(
-                    "div", class_="b_caption"
+    def __init__(self):
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+
+    def _host(self, url: str) -> Dict[str, Any]:
+        host = urlparse(url).netloc.lower()
+        state = self.hosts.get(host)
+        if state is None:
+            if len(self.hosts) >= self.MAX_TRACKED_HOSTS:
+                self._forget_idle_hosts()
+            state = {
+                "state": "closed",
+                "events": deque(),
+                "opened_at": 0.0,
+                "probe_in_flight": False,
+                "rejected": 0,
+                "last_error": None,
+            }
+            self.hosts[host] = state
+        return state
+
+    def _prune(self, state: Dict[str, Any], now: float) -> None:
+        events = state["events"]
+        while events and events[0][0] < now - CONFIG["breaker_window"]:
+            events.popleft()
+
+    def _forget_idle_hosts(self) -> None:
+        now = time.monotonic()
+        for host, state in list(self.hosts.items()):
+            self._prune(state, now)
+            if state["state"] == "closed" and not state["events"]:
+                del self.hosts[host]
+
+    def allow(self, url: str) -> bool:
+        """Return whether a request to the URL's host may go out now"""
+
+        state = self._host(url)
+        if state["state"] == "open":
+            if time.monotonic() - state["opened_at"] < CONFIG["breaker_open_seconds"]:
+                state["rejected"] += 1
+                return False
+            state["state"] = "half_open"
+        if state["state"] == "half_open":
+            if state["probe_in_flight"]:
+                state["rejected"] += 1
+                return False
+            state["probe_in_flight"] = True
+        return True
+
+    def record_success(self, url: str) -> None:
+        state = self._host(url)
+        state["probe_in_flight"] = False
+        if state["state"] != "closed":
+            state["state"] = "closed"
+            state["events"].clear()
+        now = time.monotonic()
+        state["events"].append((now, True))
+        self._prune(state, now)
+
+    def record_failure(self, url: str, error: Exception) -> None:
+        state = self._host(url)
+        state["probe_in_flight"] = False
+        state["last_error"] = str(error)[:200]
+        now = time.monotonic()
+        if state["state"] == "half_open":
+            state["state"] = "open"
+            state["opened_at"] = now
+            return
+
+        state["events"].append((now, False))
+        self._prune(state, now)
+        events = state["events"]
+        failures = sum(1 for _, ok in events if not ok)
+        if (
+            len(events) >= CONFIG["breaker_min_requests"]
+            and failures / len(events) >= CONFIG["breaker_failure_rate"]
+        ):
+            state["state"] = "open"
+            state["opened_at"] = now
+
+    def release(self, url: str) -> None:
+        """Free a half-open probe slot when the attempt ended without an outcome"""
+
+        self._host(url)["probe_in_flight"] = False
+
+    def status(self) -> Dict[str, Any]:
+        """Return the health of every tracked host"""
+
+        now = time.monotonic()
+        report = {}
+        for host, state in self.hosts.items():
+            self._prune(state, now)
+            events = state["events"]
+            failures = sum(1 for _, ok in events if not ok)
+            entry = {
+                "state": state["state"],
+                "requests_in_window": len(events),
+                "failure_rate": round(failures / len(events), 3) if events else 0.0,
+                "rejected": state["rejected"],
+                "last_error": state["last_error"],
+            }
+            if state["state"] == "open":
+                entry["probe_in_seconds"] = round(
+                    max(0.0, state["opened_at"] + CONFIG["breaker_open_seconds"] - now), 1
                 )
+            report[host] = entry
+        return report
 
-                # Strategy 2: Alternative selectors
-                if not title_link:
-                    title_link = result_div.find("a", href=True)
 
-                # Strategy 3: Generic fallbacks
-                if not snippet_div:
-                    snippet_div = result_div.find("span") or result_div.find("div")
+host_breaker = HostCircuitBreaker()
 
-                if title_link and title_link.get("href"):
-                    title = title_link.get_text(strip=True)
-                    url = title_link.get("href", "")
-                    snippet = snippet_div.get_text(strip=True) if snippet_div else ""
 
-                    # Clean and validate URL
-                    if url.startswith("http") and not "bing.com" in url:
-                        if title and len(title) > 3:  # Filter out very short titles
-                            results.append(
-                                {"title": title, "url": url, "snippet": snippet}
-                            )
+def get_retry_policy(tool: str = "default") -> Dict[str, Any]:
+    """Return the retry policy for a tool, filled in from the default policy"""
+
+    policies = CONFIG["retry_policies"]
+    return {
+        "max_attempts": CONFIG["max_retries"],
+        **policies.get("default", {}),
+        **policies.get(tool, {}),
+    }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convert a Retry-After header (seconds or HTTP date) into seconds"""
+
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_fetch_error(error: Exception) -> tuple:
+    """Decide whether a failed fetch is worth retrying"""
+
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        if status in RETRYABLE_STATUS_CODES or status >= 500:
+            return True, parse_retry_after(error.response.headers.get("retry-after"))
+        return False, None
+    if isinstance(
+        error,
+        (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError, TimeoutError),
+    ):
+        return True, None
+    return False, None
+
+
+async def get_with_retries(
+    url: str,
+    headers: Dict[str, str] = None,
+    proxies: Dict[str, str] = None,
+    max_bytes: int = None,
+    policy: Dict[str, Any] = None,
+) -> str:
+    """Get web content, retrying transient failures according to a retry policy"""
+
+    if headers is None:
+        headers = build_request_headers()
+    if policy is None:
+        policy = get_retry_policy()
+
+    cache = get_response_cache()
+    cached = await cache.lookup(url) if cache is not None else None
+    if cached is not None and cached["expires_at"] > time.time():
+        cache.counters["hits"] += 1
+        return cached["body"]
+    if cache is not None:
+        cache.counters["misses"] += 1
+
+    header_strategies = [
+        # Strategy 1: Caller's headers
+        lambda: headers,
+        # Strategy 2: With different user agent
+        lambda: {**headers, "User-Agent": CONFIG["user_agent"].random},
+        # Strategy 3: Fresh headers with a referer
+        lambda: build_request_headers(referer=url),
+    ]
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + policy["deadline"]
+    max_attempts = max(1, policy["max_attempts"])
+
+    for attempt in range(1, max_attempts + 1):
+        if not host_breaker.allow(url):
+            raise Exception(
+                f"Circuit open for {urlparse(url).netloc}: host is failing, "
+                f"not retrying for now"
+            )
+
+        request_headers = header_strategies[(attempt - 1) % len(header_strategies)]()
+        outcome_recorded = False
+        try:
+            async with asyncio.timeout(max(0.0, deadline - loop.time())):
+                body = await fetch_text(url, request_headers, cached, max_bytes)
+            host_breaker.record_success(url)
+            outcome_recorded = True
+            return body
+        except Exception as e:
+            retryable, retry_after = classify_fetch_error(e)
+            # Only failures that say something about the host's health count;
+            # a 404 or an unsupported content type means the host is up
+            if retryable:
+                host_breaker.record_failure(url, e)
+            else:
+                host_breaker.record_success(url)
+            outcome_recorded = True
+            if isinstance(e, TimeoutError) and loop.time() >= deadline:
+                raise Exception(
+                    f"Fetch exceeded its {policy['deadline']}s deadline "
+                    f"after {attempt} attempt(s)"
+                )
+            if not retryable or attempt == max_attempts:
+                raise Exception(f"Fetch failed after {attempt} attempt(s): {str(e)}")
+
+            backoff = min(policy["max_delay"], policy["base_delay"] * 2 ** (attempt - 1))
+            delay = random.uniform(0, backoff)
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            if loop.time() + delay >= deadline:
+                raise Exception(
+                    f"Fetch failed after {attempt} attempt(s), "
+                    f"no time left to retry: {str(e)}"
+                )
+            await asyncio.sleep(delay)
+        finally:
+            if not outcome_recorded:
+                host_breaker.release(url)
+
+    raise Exception("Failed to fetch content")
+
 
-            except Exception as e:
-                # Skip malformed results but continue processing
+# === HTML EXTRACTION FUNCTIONS ===
+
+# Elements dropped before any text is extracted
+UNWANTED_TAGS = {"script", "style", "nav", "footer", "header", "aside", "form", "noscript"}
+
+# Main content containers, in priority order:
+# main, article, [role=main], .content, .main-content, .post-content,
+# .entry-content, .article-content, .page-content, #content, #main,
+# and a Bootstrap-style ".container .row .col" layout
+CONTENT_CLASSES = [
+    "content",
+    "main-content",
+    "post-content",
+    "entry-content",
+    "article-content",
+    "page-content",
+]
+CONTENT_IDS = ["content", "main"]
+BOOTSTRAP_CONTENT_PRIORITY = 3 + len(CONTENT_CLASSES) + len(CONTENT_IDS)
+
+# Author and date sources, in priority order. Meta tags come first, then
+# elements matched by class (and rel="author" / time[datetime]).
+AUTHOR_META = [("name", "author"), ("name", "article:author"), ("property", "article:author")]
+AUTHOR_CLASSES = ["author", "byline", "post-author"]
+DATE_META = [
+    ("property", "article:published_time"),
+    ("name", "article:published_time"),
+    ("name", "pubdate"),
+]
+DATE_CLASSES = ["date", "published", "post-date"]
+DESCRIPTION_META = [
+    ("name", "description"),
+    ("property", "og:description"),
+    ("name", "twitter:description"),
+]
+
+
+# Class/id hints used by the content scorer
+NEGATIVE_CONTENT_HINTS = re.compile(
+    r"comment|meta|footer|footnote|sidebar|widget|related|share|social|sponsor|"
+    r"promo|advert|banner|menu|breadcrumb|pagination|popup|cookie",
+    re.IGNORECASE,
+)
+POSITIVE_CONTENT_HINTS = re.compile(
+    r"article|body|content|entry|main|page|post|text|blog|story", re.IGNORECASE
+)
+CONTENT_BLOCK_TAGS = {"div", "section", "td"}
+
+
+def parse_html(content: str) -> etree._Element:
+    """Parse an HTML document with lxml, tolerating encoding declarations"""
+
+    # huge_tree lifts libxml2's 256-level nesting limit, which would
+    # otherwise silently drop the content of deeply nested pages
+    parser = lxml.html.HTMLParser(encoding="utf-8", huge_tree=True)
+    return lxml.html.document_fromstring(content.encode("utf-8"), parser=parser)
+
+
+def element_text(element: etree._Element, separator: str = "") -> str:
+    """Join the stripped text fragments of an element, like BeautifulSoup's get_text(strip=True)"""
+
+    return separator.join(
+        fragment.strip() for fragment in element.itertext() if fragment.strip()
+    )
+
+
+def has_ancestor_class(element: etree._Element, *classes: str) -> bool:
+    """Check for a chain of ancestors carrying ``classes``, innermost first"""
+
+    remaining = list(classes)
+    for ancestor in element.iterancestors():
+        if remaining[0] in ancestor.get("class", "").split():
+            remaining.pop(0)
+            if not remaining:
+                return True
+    return False
+
+
+def score_content_blocks(elements: List[tuple]) -> Optional[etree._Element]:
+    """Pick the block most likely to hold the main text of a page"""
+
+    text_length: Dict[etree._Element, int] = {}
+    link_length: Dict[etree._Element, int] = {}
+    useful_length: Dict[etree._Element, float] = {}
+    candidates = []
+
+    for element, depth in reversed(elements):
+        own = len((element.text or "").strip())
+        total = useful = own
+        links = 0
+        for child in element:
+            tail = len((child.tail or "").strip())
+            if child not in text_length:
+                total += tail
+                useful += tail
                 continue
+            total += text_length[child] + tail
+            links += link_length[child]
+            useful += tail
+            child_hints = f"{child.get('class', '')} {child.get('id', '')}"
+            link_heavy = text_length[child] and (
+                link_length[child] / text_length[child] > 0.5
+            )
+            if not link_heavy and not NEGATIVE_CONTENT_HINTS.search(child_hints):
+                useful += useful_length[child]
 
-        # If no results found with main strategy, try backup extraction
-        if not results:
-            links = soup.find_all("a", href=True)
-            for link in links[:num_results]:
-                href = link.get("href", "")
-                if href.startswith("http") and not any(
-                    domain in href
-                    for domain in ["bing.com", "microsoft.com", "msn.com"]
-                ):
-                    title = link.get_text(strip=True)
-                    if title and len(title) > 5:  # Filter out very short titles
-                        results.append({"title": title, "url": href, "snippet": ""})
+        if element.tag == "a":
+            links = total
+        text_length[element] = total
+        link_length[element] = links
+        useful_length[element] = useful
 
-        return results
+        if element.tag in CONTENT_BLOCK_TAGS and useful:
+            hints = f"{element.get('class', '')} {element.get('id', '')}"
+            weight = 1.0
+            if POSITIVE_CONTENT_HINTS.search(hints):
+                weight *= 1.25
+            if NEGATIVE_CONTENT_HINTS.search(hints):
+                weight *= 0.5
+            link_density = links / total if total else 0.0
+            candidates.append((useful * weight * (1 - link_density), depth, element))
 
-    except Exception as e:
-        return [{"error": f"Search failed: {str(e)}"}]
+    if not candidates:
+        return None
 
+    return max(candidates, key=lambda c: (c[0], c[1]))[2]
 
-async def search_and_extract(
-    query: str, num_results: int = 5, extract_content: bool = False
-) -> Dict[str, Any]:
-    """Search and optionally extract content from results with improved error handling"""
 
-    search_results = await search_bing(query, num_results)
+def extract_page(content: str, url: str, extract_text: bool = True) -> Dict[str, Any]:
+    """Extract title, main text and metadata from an HTML document"""
 
-    result = {
-        "query": query,
-        "results": search_results,
-        "extracted_content": [],
-        "status": "success",
-    }
+    try:
+        root = parse_html(content)
+    except (etree.ParserError, ValueError):
+        root = None
+
+    title = None
+    meta = {}
+    content_candidates: Dict[int, etree._Element] = {}
+    author_candidates: Dict[int, etree._Element] = {}
+    date_candidates: Dict[int, etree._Element] = {}
+    visited = []
+    removed = []
+
+    stack = [(root, 0)] if root is not None else []
+    while stack:
+        element, depth = stack.pop()
+        tag = element.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions carry no visible text
+            removed.append(element)
+            continue
+        tag = tag.lower()
+        if tag in UNWANTED_TAGS:
+            removed.append(element)
+            continue
 
-    if extract_content and search_results and not search_results[0].get("error"):
-        # Extract content from top results with better error handling
-        extraction_count = 0
-        for i, search_result in enumerate(search_results):
-            if extraction_count >= 3:  # Limit to 3 extractions max
-                break
+        if tag == "title":
+            if title is None:
+                title = element.text if len(element) == 0 else ""
+        elif tag == "meta":
+            for attr in ("name", "property"):
+                key = (attr, element.get(attr))
+                if key[1] is not None and key not in meta:
+                    meta[key] = element
+
+        visited.append((element, depth))
+        classes = element.get("class", "").split()
+        if tag == "main":
+            content_candidates.setdefault(0, element)
+        elif tag == "article":
+            content_candidates.setdefault(1, element)
+        if element.get("role") == "main":
+            content_candidates.setdefault(2, element)
+        for i, name in enumerate(CONTENT_CLASSES):
+            if name in classes:
+                content_candidates.setdefault(3 + i, element)
+        for i, name in enumerate(CONTENT_IDS):
+            if element.get("id") == name:
+                content_candidates.setdefault(3 + len(CONTENT_CLASSES) + i, element)
+        if (
+            "col" in classes
+            and BOOTSTRAP_CONTENT_PRIORITY not in content_candidates
+            and has_ancestor_class(element, "row", "container")
+        ):
+            content_candidates[BOOTSTRAP_CONTENT_PRIORITY] = element
 
-            if "url" in search_result and search_result["url"]:
-                try:
-                    content = await unlock_web_content(
-                        search_result["url"], extract_text=True
-                    )
+        for i, name in enumerate(AUTHOR_CLASSES):
+            if name in classes:
+                author_candidates.setdefault(i, element)
+        if element.get("rel") == "author":
+            author_candidates.setdefault(len(AUTHOR_CLASSES), element)
 
-                    if content.get("status") == "success":
-                        # Get more content - increase from 2000 to 5000 chars
-                        content_text = content.get("content", "")
-                        if len(content_text) > 5000:
-                            content_text = content_text[:5000] + "..."
-
-                        result["extracted_content"].append(
-                            {
-                                "index": i,
-                                "url": search_result["url"],
-                                "title": search_result["title"],
-                                "snippet": search_result.get("snippet", ""),
-                                "content": content_text,
-                                "meta": content.get("meta", {}),
-                                "status": "success",
-                            }
-                        )
-                        extraction_count += 1
-                    else:
-                        result["extracted_content"].append(
-                            {
-                                "index": i,
-                                "url": search_result["url"],
-                                "title": search_result["title"],
-                                "status": "error",
-                                "error": content.get(
-                                    "error", "Failed to extract content"
-                                ),
-                            }
-                        )
+        if tag == "time" and element.get("datetime") is not None:
+            date_candidates.setdefault(0, element)
+        for i, name in enumerate(DATE_CLASSES):
+            if name in classes:
+                date_candidates.setdefault(1 + i, element)
 
-                except Exception as e:
-                    result["extracted_content"].append(
-                        {
-                            "index": i,
-                            "url": search_result["url"],
-                            "title": search_result["title"],
-                            "status": "error",
-                            "error": str(e),
-                        }
-                    )
+        # Push children in reverse so they are visited in document order
+        stack.extend((child, depth + 1) for child in reversed(element))
 
-                # Add delay between extractions to be respectful
-                await asyncio.sleep(1)
+    for element in removed:
+        if element.getparent() is not None:
+            element.drop_tree()
 
-    # Add summary statistics
-    result["summary"] = {
-        "search_results_count": len([r for r in search_results if not r.get("error")]),
-        "content_extractions_attempted": len(result["extracted_content"]),
-        "content_extractions_successful": len(
-            [e for e in result["extracted_content"] if e.get("status") == "success"]
+    # raw_html is filled in by the caller, so results returned from a worker
+    # process do not carry the whole document back through pickling
+    result = {
+        "url": url,
+        "title": title.strip() if title and title.strip() else "No title",
+        "raw_html": None,
+        "status": "success",
+    }
+
+    if not extract_text:
+        return result
+
+    # Strategy 1: semantic content container, by priority
+    main_content = content_candidates[min(content_candidates)] if content_candidates else None
+
+    # Strategy 2: Score text blocks if no semantic container found
+    if main_content is None:
+        main_content = score_content_blocks(visited)
+
+    # Strategy 3: Use body as fallback
+    if main_content is None and root is not None:
+        main_content = root.find("body")
+        if main_content is None:
+            main_content = root
+
+    content_text = ""
+    if main_content is not None:
+        content_text = re.sub(r"\s+", " ", element_text(main_content, " "))
+        result["content"] = content_text.strip()
+    else:
+        result["content"] = "No content could be extracted"
+
+    def meta_content(key) -> str:
+        element = meta.get(key)
+        return element.get("content", "").strip() if element is not None else ""
+
+    description = next(
+        (meta[key] for key in DESCRIPTION_META if key in meta), None
+    )
+    result["meta"] = {
+        "description": (
+            description.get("content", "").strip() if description is not None else ""
         ),
+        "keywords": meta_content(("name", "keywords")),
+        "author": "",
+        "published_date": "",
+        "article_length": len(content_text),
     }
 
+    author_meta = next((key for key in AUTHOR_META if key in meta), None)
+    if author_meta is not None:
+        result["meta"]["author"] = meta_content(author_meta)
+    elif author_candidates:
+        result["meta"]["author"] = element_text(author_candidates[min(author_candidates)])
+
+    date_meta = next((key for key in DATE_META if key in meta), None)
+    if date_meta is not None:
+        result["meta"]["published_date"] = meta_content(date_meta)
+    elif date_candidates:
+        date_element = date_candidates[min(date_candidates)]
+        if date_element.tag == "time":
+            result["meta"]["published_date"] = date_element.get("datetime", "").strip()
+        else:
+            result["meta"]["published_date"] = element_text(date_element)
+
     return result
 
 
-# === BATCH PROCESSING FUNCTIONS ===
+def parse_bing_results(content: str, num_results: int) -> List[Dict[str, str]]:
+    """Parse a Bing results page into title/url/snippet records"""
+
+    try:
+        root = parse_html(content)
+    except (etree.ParserError, ValueError):
+        return []
 
+    def class_list(element) -> List[str]:
+        return element.get("class", "").split()
 
-async def batch_url_extract(
-    urls: List[str], extract_text: bool = True
-) -> List[Dict[str, Any]]:
-    """Extract content from multiple URLs in batch"""
+    def first(element, tag: str, predicate=None):
+        for candidate in element.iter(tag):
+            if candidate is not element and (predicate is None or predicate(candidate)):
+                return candidate
+        return None
 
     results = []
-    for url in urls:
-        try:
-            content = await unlock_web_content(url, extract_text)
-            results.append(content)
-            # Small delay between requests
-            await asyncio.sleep(random.uniform(1, 3))
-        except Exception as e:
-            results.append({"url": url, "status": "error", "error": str(e)})
+
+    # Strategy 1: Main result containers
+    result_containers = [el for el in root.iter("li") if "b_algo" in class_list(el)]
+
+    # Strategy 2: Alternative result containers
+    if not result_containers:
+        result_containers = [el for el in root.iter("div") if "b_algo" in class_list(el)]
+
+    # Strategy 3: Generic result containers
+    if not result_containers:
+        result_containers = [
+            el for el in root.iter("div") if "algo" in el.get("class", "").lower()
+        ]
+
+    # Parse search results with multiple fallback strategies
+    for result_div in result_containers[:num_results]:
+        # Strategy 1: Standard Bing selectors
+        title_link = first(result_div, "h2")
+        if title_link is not None:
+            title_link = first(title_link, "a")
+
+        snippet_div = first(result_div, "p")
+        if snippet_div is None:
+            snippet_div = first(result_div, "div", lambda el: "b_caption" in class_list(el))
+
+        # Strategy 2: Alternative selectors
+        if title_link is None:
+            title_link = first(result_div, "a", lambda el: el.get("href") is not None)
+
+        # Strategy 3: Generic fallbacks
+        if snippet_div is None:
+            snippet_div = first(result_div, "span")
+            if snippet_div is None:
+                snippet_div = first(result_div, "div")
+
+        if title_link is not None and title_link.get("href"):
+            title = element_text(title_link)
+            url = title_link.get("href", "")
+            snippet = element_text(snippet_div) if snippet_div is not None else ""
+
+            # Clean and validate URL
+            if url.startswith("http") and not "bing.com" in url:
+                if title and len(title) > 3:  # Filter out very short titles
+                    results.append({"title": title, "url": url, "snippet": snippet})
+
+    # If no results found with main strategy, try backup extraction
+    if not results:
+        links = [link for link in root.iter("a") if link.get("href") is not None]
+        for link in links[:num_results]:
+            href = link.get("href", "")
+            if href.startswith("http") and not any(
+                domain in href for domain in ["bing.com", "microsoft.com", "msn.com"]
+            ):
+                title = element_text(link)
+                if title and len(title) > 5:  # Filter out very short titles
+                    results.append({"title": title, "url": href, "snippet": ""})
 
     return results
 
 
-# === BROWSER AUTOMATION FUNCTIONS ===
+_parse_executor: Optional[Executor] = None
 
 
-def create_browser_driver(headless: bool = True) -> Optional[webdriver.Chrome]:
-    """Create a Chrome WebDriver instance"""
+def get_parse_executor() -> Executor:
+    """Return the shared HTML parsing pool, creating it on first use"""
 
-    if not SELENIUM_AVAILABLE:
-        raise Exception(
-            "Selenium not available. Install selenium package for browser automation."
-        )
+    global _parse_executor
+
+    if _parse_executor is None:
+        workers = max(1, CONFIG["parse_workers"])
+        if CONFIG["parse_executor"] == "process":
+            _parse_executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _parse_executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="html-parser"
+            )
+    return _parse_executor
+
+
+def warm_parse_executor() -> List[Any]:
+    """Start every parsing worker ahead of the first large page"""
+
+    executor = get_parse_executor()
+    if not isinstance(executor, ProcessPoolExecutor):
+        return []
+    return [
+        executor.submit(extract_page, "<html></html>", "about:blank")
+        for _ in range(max(1, CONFIG["parse_workers"]))
+    ]
+
+
+def shutdown_parse_executor() -> None:
+    """Stop the parsing pool's workers"""
+
+    global _parse_executor
+
+    if _parse_executor is not None:
+        _parse_executor.shutdown(wait=False, cancel_futures=True)
+        _parse_executor = None
+
+
+async def run_parser(func, content: str, *args) -> Any:
+    """Run a parsing function on the parse pool, or inline for small documents"""
+
+    if len(content) < CONFIG["parse_inline_max_bytes"]:
+        return func(content, *args)
 
+    loop = asyncio.get_running_loop()
     try:
-        options = ChromeOptions()
-        if headless:
-            options.add_argument("--headless")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument(f'--user-agent={CONFIG["user_agent"].random}')
+        return await loop.run_in_executor(get_parse_executor(), func, content, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool next time
+        shutdown_parse_executor()
+        return await asyncio.to_thread(func, content, *args)
+
+
+# Markers of interstitial bot-check pages that only a real browser gets past
+CHALLENGE_MARKERS = [
+    "cf-browser-verification",
+    "cf_chl_opt",
+    "/cdn-cgi/challenge-platform/",
+    "<title>just a moment...</title>",
+    "checking your browser before accessing",
+    "ddos-guard",
+    "captcha-delivery.com",
+]
+
+
+def looks_like_challenge(content: str) -> bool:
+    """Return whether an HTML document is a bot-check interstitial"""
+
+    head = content[:64 * 1024].lower()
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def is_challenge_error(error: BaseException) -> bool:
+    """Return whether a fetch failed because the host served a bot challenge"""
+
+    while error is not None:
+        if isinstance(error, httpx.HTTPStatusError):
+            response = error.response
+            if response.headers.get("cf-mitigated") == "challenge":
+                return True
+            return response.status_code in (403, 503) and "cloudflare" in (
+                response.headers.get("server", "").lower()
+            )
+        error = error.__cause__ or error.__context__
+    return False
 
-        driver = webdriver.Chrome(options=options)
-        driver.set_page_load_timeout(CONFIG["default_timeout"])
-        return driver
 
-    except Exception as e:
-        raise Exception(f"Failed to create browser driver: {str(e)}")
+class RenderDecisionCache:
+    """Remember, per host, which fetch tier serves its content"""
+
+    MAX_TRACKED_HOSTS = 4096
+
+    def __init__(self):
+        self.hosts: "OrderedDict[str, tuple]" = OrderedDict()
+        self.counters = {"static": 0, "rendered": 0, "render_failed": 0, "render_skipped": 0}
+
+    def decision(self, url: str) -> Optional[str]:
+        """The remembered tier for the URL's host, or None if unknown or expired"""
+
+        host = urlparse(url).netloc.lower()
+        entry = self.hosts.get(host)
+        if entry is None:
+            return None
+        if entry[1] <= time.time():
+            del self.hosts[host]
+            return None
+        return entry[0]
+
+    def needs_render(self, url: str) -> bool:
+        return self.decision(url) == "render"
+
+    def render_useless(self, url: str) -> bool:
+        return self.decision(url) == "static"
+
+    def remember(self, url: str, decision: str = "render") -> None:
+        host = urlparse(url).netloc.lower()
+        ttl = CONFIG["render_host_ttl" if decision == "render" else "render_static_ttl"]
+        self.hosts[host] = (decision, time.time() + ttl)
+        self.hosts.move_to_end(host)
+        while len(self.hosts) > self.MAX_TRACKED_HOSTS:
+            self.hosts.popitem(last=False)
+
+    def forget(self, url: str) -> None:
+        self.hosts.pop(urlparse(url).netloc.lower(), None)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        live = {host: entry[0] for host, entry in self.hosts.items() if entry[1] > now}
+        return {
+            **self.counters,
+            "render_hosts": sorted(h for h, d in live.items() if d == "render"),
+            "static_hosts": sorted(h for h, d in live.items() if d == "static"),
+        }
+
+
+render_decisions = RenderDecisionCache()
+
+
+async def render_and_extract(url: str, extract_text: bool) -> Dict[str, Any]:
+    """Render a page in a pooled headless browser and extract it like a fetched one"""
+
+    page = await render_page(url)
+    if page.get("status") != "success":
+        render_decisions.counters["render_failed"] += 1
+        return page
+
+    result = await run_parser(extract_page, page["html"], url, extract_text)
+    result["fetch_mode"] = "browser"
+    result["final_url"] = page["final_url"]
+    if not extract_text:
+        result["raw_html"] = page["html"]
+    return result
+
+
+async def unlock_web_content(
+    url: str,
+    extract_text: bool = True,
+    bypass_cloudflare: bool = False,
+    max_bytes: int = None,
+    retry_policy: Dict[str, Any] = None,
+    render_fallback: bool = None,
+) -> Dict[str, Any]:
+    """Unlock and extract content from web pages, rendering in a browser when plain HTTP falls short"""
+
+    if retry_policy is None:
+        retry_policy = get_retry_policy("web_unlocker")
+    if render_fallback is None:
+        render_fallback = CONFIG["render_fallback"]
+    can_render = render_fallback and SELENIUM_AVAILABLE
+
+    if can_render and (bypass_cloudflare or render_decisions.needs_render(url)):
+        rendered = await render_and_extract(url, extract_text)
+        if rendered.get("status") == "success":
+            render_decisions.counters["rendered"] += 1
+            return rendered
+        # The browser tier failed; fall back to a plain fetch for a while
+        render_decisions.remember(url, "static")
+        can_render = False
+    elif can_render and render_decisions.render_useless(url):
+        render_decisions.counters["render_skipped"] += 1
+        can_render = False
+
+    try:
+        content = await get_with_retries(url, max_bytes=max_bytes, policy=retry_policy)
+        result = await run_parser(extract_page, content, url, extract_text)
+        result["fetch_mode"] = "static"
+        if not extract_text:
+            result["raw_html"] = content
+        challenged = looks_like_challenge(content)
+        too_short = (
+            extract_text and len(result.get("content", "")) < CONFIG["render_min_text_chars"]
+        )
+        if not can_render or not (challenged or too_short):
+            render_decisions.counters["static"] += 1
+            return result
+
+    except Exception as e:
+        result = {
+            "url": url,
+            "status": "error",
+            "error": f"Content extraction failed: {str(e)}",
+            "content": "",
+            "title": "",
+            "meta": {},
+        }
+        if not (can_render and is_challenge_error(e)):
+            return result
+        challenged = True
+
+    rendered = await render_and_extract(url, extract_text)
+    if rendered.get("status") == "success" and (
+        challenged or len(rendered.get("content", "")) > len(result.get("content", ""))
+    ):
+        render_decisions.remember(url)
+        render_decisions.counters["rendered"] += 1
+        return rendered
+    render_decisions.remember(url, "static")
+    render_decisions.counters["static"] += 1
+    return result
+
+
+# === SEARCH/SERP FUNCTIONS ===
+
+
+# Search operators written in upper case; in lower case they are plain words
+QUERY_OPERATOR_WORDS = {"OR", "AND", "NOT"}
+QUERY_OPERATOR_CHARS = set('"():|*')
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache entry"""
+
+    words = query.split()
+    plain = not any(
+        word in QUERY_OPERATOR_WORDS
+        or word[0] in "-+"
+        or QUERY_OPERATOR_CHARS.intersection(word)
+        for word in words
+    )
+    words = [word if word in QUERY_OPERATOR_WORDS else word.lower() for word in words]
+    return " ".join(sorted(words) if plain else words)
+
+
+class SERPCache:
+    """In-memory LRU of search results keyed by normalized query"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    def get(self, query: str, num_results: int) -> Optional[Dict[str, Any]]:
+        """Return a cached entry that covers ``num_results``, or None"""
+
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is None or entry["count"] < num_results:
+            return None
+        if time.time() - entry["stored_at"] > (
+            CONFIG["serp_cache_ttl"] + CONFIG["serp_stale_ttl"]
+        ):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["stored_at"] <= CONFIG["serp_cache_ttl"]
+
+    def put(self, query: str, count: int, results: List[Dict[str, str]]) -> None:
+        key = normalize_query(query)
+        self._entries[key] = {"count": count, "results": results, "stored_at": time.time()}
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["stale_hits"] + self.counters["misses"]
+        served = self.counters["hits"] + self.counters["stale_hits"]
+        return {
+            **self.counters,
+            "hit_rate": round(served / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+serp_cache = SERPCache(CONFIG["serp_cache_entries"])
+_serp_refreshes: Dict[str, asyncio.Task] = {}
+
+
+async def refresh_serp_entry(query: str, count: int) -> None:
+    """Re-run a search in the background and replace its cached entry"""
+
+    try:
+        results = await fetch_bing_results(query, count)
+        if results and not results[0].get("error"):
+            serp_cache.put(query, count, results)
+            serp_cache.counters["refreshes"] += 1
+    finally:
+        _serp_refreshes.pop(normalize_query(query), None)
+
+
+async def search_bing(query: str, num_results: int = 10) -> List[Dict[str, str]]:
+    """Search using Bing, serving repeated queries from the SERP cache"""
+
+    entry = serp_cache.get(query, num_results)
+    if entry is not None:
+        if serp_cache.is_fresh(entry):
+            serp_cache.counters["hits"] += 1
+        else:
+            # Serve the stale page now and refresh it without blocking the caller
+            serp_cache.counters["stale_hits"] += 1
+            key = normalize_query(query)
+            if key not in _serp_refreshes:
+                _serp_refreshes[key] = asyncio.create_task(
+                    refresh_serp_entry(query, entry["count"])
+                )
+        return [dict(r) for r in entry["results"][:num_results]]
+
+    serp_cache.counters["misses"] += 1
+    count = max(num_results, CONFIG["serp_fetch_count"])
+    results = await fetch_bing_results(query, count)
+    if results and not results[0].get("error"):
+        serp_cache.put(query, count, results)
+    return [dict(r) for r in results[:num_results]]
+
+
+async def fetch_bing_results(query: str, num_results: int = 10) -> List[Dict[str, str]]:
+    """Search using Bing with robust parsing"""
+
+    try:
+        headers = build_request_headers(referer="https://www.bing.com/")
+
+        # Bing search URL
+        search_url = "https://www.bing.com/search"
+        params = {"q": query, "count": min(num_results, 50)}
+
+        response = await http_get(search_url, headers=headers, params=params)
+
+        return await run_parser(parse_bing_results, response.text, num_results)
+
+    except Exception as e:
+        return [{"error": f"Search failed: {str(e)}"}]
+
+
+async def extract_first_successes(
+    search_results: List[Dict[str, str]], max_successes: int, time_budget: float
+) -> Dict[str, Any]:
+    """Extract content from search results concurrently until enough succeed"""
+
+    semaphore = asyncio.Semaphore(CONFIG["batch_concurrency"])
+
+    async def extract(index: int, search_result: Dict[str, str]) -> Dict[str, Any]:
+        try:
+            async with semaphore:
+                # Only the first 5000 characters are kept, so there is no
+                # point in downloading more than the start of each page
+                content = await unlock_web_content(
+                    search_result["url"],
+                    extract_text=True,
+                    max_bytes=CONFIG["search_extract_max_bytes"],
+                    retry_policy=get_retry_policy("web_search"),
+                    # A browser render would not fit the extraction time budget
+                    render_fallback=False,
+                )
+
+            if content.get("status") == "success":
+                # Get more content - increase from 2000 to 5000 chars
+                content_text = content.get("content", "")
+                if len(content_text) > 5000:
+                    content_text = content_text[:5000] + "..."
+
+                return {
+                    "index": index,
+                    "url": search_result["url"],
+                    "title": search_result["title"],
+                    "snippet": search_result.get("snippet", ""),
+                    "content": content_text,
+                    "meta": content.get("meta", {}),
+                    "status": "success",
+                }
+
+            return {
+                "index": index,
+                "url": search_result["url"],
+                "title": search_result["title"],
+                "status": "error",
+                "error": content.get("error", "Failed to extract content"),
+            }
+
+        except Exception as e:
+            return {
+                "index": index,
+                "url": search_result["url"],
+                "title": search_result["title"],
+                "status": "error",
+                "error": str(e),
+            }
+
+    pending = {
+        asyncio.create_task(extract(i, search_result))
+        for i, search_result in enumerate(search_results)
+        if search_result.get("url")
+    }
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + time_budget
+    extracted = []
+    successes = 0
+
+    try:
+        while pending and successes < max_successes:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in sorted(done, key=lambda t: t.result()["index"]):
+                entry = task.result()
+                if entry["status"] == "success":
+                    if successes >= max_successes:
+                        continue
+                    successes += 1
+                extracted.append(entry)
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    extracted.sort(key=lambda e: e["index"])
+    return {
+        "extracted_content": extracted,
+        "cancelled": len(pending),
+        "timed_out": successes < max_successes and loop.time() >= deadline,
+    }
+
+
+async def search_and_extract(
+    query: str,
+    num_results: int = 5,
+    extract_content: bool = False,
+    time_budget: float = None,
+    sink: Any = None,
+) -> Dict[str, Any]:
+    """Search and optionally extract content from results with improved error handling"""
+
+    dataset_sink = DatasetSink(sink) if sink else None
+    if time_budget is None:
+        time_budget = CONFIG["extraction_time_budget"]
+
+    search_results = await search_bing(query, num_results)
+
+    result = {
+        "query": query,
+        "results": search_results,
+        "extracted_content": [],
+        "status": "success",
+    }
+
+    cancelled = 0
+    timed_out = False
+    if extract_content and search_results and not search_results[0].get("error"):
+        extraction = await extract_first_successes(
+            search_results, CONFIG["max_extractions"], time_budget
+        )
+        result["extracted_content"] = extraction["extracted_content"]
+        cancelled = extraction["cancelled"]
+        timed_out = extraction["timed_out"]
+
+    # Add summary statistics
+    result["summary"] = {
+        "search_results_count": len([r for r in search_results if not r.get("error")]),
+        "content_extractions_attempted": len(result["extracted_content"]),
+        "content_extractions_successful": len(
+            [e for e in result["extracted_content"] if e.get("status") == "success"]
+        ),
+        "content_extractions_cancelled": cancelled,
+        "extraction_timed_out": timed_out,
+    }
+
+    if dataset_sink is not None:
+        for record in search_records(query, search_results, result["extracted_content"]):
+            await dataset_sink.add(record)
+        result["sink"] = await dataset_sink.close()
+        del result["results"], result["extracted_content"]
+
+    return result
+
+
+def search_records(
+    query: str,
+    search_results: List[Dict[str, str]],
+    extracted_content: List[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Flatten search results and their extractions into one record per result"""
+
+    extractions = {extraction["index"]: extraction for extraction in extracted_content}
+    records = []
+    for index, search_result in enumerate(search_results):
+        if search_result.get("error"):
+            continue
+        record = {"query": query, "rank": index + 1, **search_result}
+        extraction = extractions.get(index)
+        if extraction is not None:
+            record["content"] = extraction.get("content")
+            record["extraction_status"] = extraction["status"]
+            if "error" in extraction:
+                record["extraction_error"] = extraction["error"]
+        records.append(record)
+    return records
+
+
+# === BATCH PROCESSING FUNCTIONS ===
+
+
+async def report_progress(progress: float, total: float, message: str) -> None:
+    """Send an MCP progress notification if the current tool call asked for them"""
+
+    try:
+        context = server.request_context
+    except LookupError:
+        return
+    token = context.meta.progressToken if context.meta is not None else None
+    if token is None:
+        return
+    try:
+        await context.session.send_progress_notification(
+            token, progress, total, message, related_request_id=context.request_id
+        )
+    except Exception:
+        # Progress is best effort; a closed stream must not fail the batch
+        pass
+
+
+async def run_bounded(
+    urls: List[str],
+    worker,
+    max_concurrency: int = None,
+    per_host_concurrency: int = None,
+    per_host_delay: float = None,
+) -> List[Any]:
+    """Run ``worker(url)`` for every URL concurrently and return results in input order"""
+
+    if max_concurrency is None:
+        max_concurrency = CONFIG["batch_concurrency"]
+    if per_host_concurrency is None:
+        per_host_concurrency = CONFIG["batch_per_host_concurrency"]
+    if per_host_delay is None:
+        per_host_delay = CONFIG["per_host_delay"]
+
+    loop = asyncio.get_running_loop()
+    global_semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    host_semaphores: Dict[str, asyncio.Semaphore] = {}
+    host_slots: Dict[str, asyncio.Lock] = {}
+    next_start: Dict[str, float] = {}
+
+    async def run_one(url: str) -> Any:
+        host = urlparse(url).netloc.lower()
+        if host not in host_semaphores:
+            host_semaphores[host] = asyncio.Semaphore(max(1, per_host_concurrency))
+            host_slots[host] = asyncio.Lock()
+
+        async with host_semaphores[host]:
+            async with global_semaphore:
+                # Space actual starts, so requests queued on the global limit don't bunch up
+                async with host_slots[host]:
+                    wait = next_start.get(host, 0.0) - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    next_start[host] = loop.time() + per_host_delay
+                return await worker(url)
+
+    return await asyncio.gather(*(run_one(url) for url in urls))
+
+
+async def batch_url_extract(
+    urls: List[str],
+    extract_text: bool = True,
+    max_concurrency: int = None,
+    sink: Any = None,
+    render_fallback: bool = False,
+) -> Any:
+    """Extract content from multiple URLs concurrently, preserving input order"""
+
+    dataset_sink = DatasetSink(sink) if sink else None
+
+    async def extract(url: str) -> Dict[str, Any]:
+        try:
+            result = await unlock_web_content(
+                url,
+                extract_text,
+                retry_policy=get_retry_policy("batch_url_extract"),
+                render_fallback=render_fallback,
+            )
+        except Exception as e:
+            result = {"url": url, "status": "error", "error": str(e)}
+        if dataset_sink is not None:
+            await dataset_sink.add(result)
+            return {"status": result.get("status")}
+        return result
+
+    results = await run_bounded(urls, extract, max_concurrency=max_concurrency)
+    if dataset_sink is None:
+        return results
+
+    succeeded = sum(1 for result in results if result.get("status") == "success")
+    return {
+        "sink": await dataset_sink.close(),
+        "summary": {
+            "total_urls": len(urls),
+            "succeeded": succeeded,
+            "failed": len(urls) - succeeded,
+        },
+    }
+
+
+# === BROWSER AUTOMATION FUNCTIONS ===
+
+
+DEFAULT_LOAD_PROFILE = {
+    "block_images": False,
+    "block_media": False,
+    "block_fonts": False,
+    "blocked_domains": [],
+    "page_load_strategy": "normal",
+    "disable_extensions": False,
+    "disable_javascript": False,
+}
+
+FONT_URL_PATTERNS = ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"]
+MEDIA_URL_PATTERNS = [
+    "*.mp4", "*.webm", "*.m4v", "*.mov", "*.avi",
+    "*.mp3", "*.m4a", "*.ogg", "*.wav", "*.flac",
+]
+
+
+def resolve_load_profile(load_profile: Any = None) -> Dict[str, Any]:
+    """Expand a load profile name or partial dict into a complete profile"""
+
+    if load_profile is None:
+        load_profile = "full"
+    if isinstance(load_profile, str):
+        load_profile = {"preset": load_profile}
+
+    presets = CONFIG["browser_load_profiles"]
+    preset_name = load_profile.get("preset", "full")
+    if preset_name not in presets:
+        raise ValueError(f"Unknown load profile: {preset_name}")
+
+    profile = {
+        **DEFAULT_LOAD_PROFILE,
+        **presets[preset_name],
+        **{k: v for k, v in load_profile.items() if k != "preset"},
+    }
+    if profile["page_load_strategy"] not in ("normal", "eager", "none"):
+        raise ValueError(f"Invalid page_load_strategy: {profile['page_load_strategy']}")
+    return profile
+
+
+def browser_launch_key(headless: bool, profile: Dict[str, Any]) -> tuple:
+    """Identify the launch options a driver needs; drivers are pooled per key"""
+
+    return (
+        headless,
+        profile["block_images"],
+        profile["page_load_strategy"],
+        profile["disable_extensions"],
+        profile["disable_javascript"],
+    )
+
+
+def blocked_url_patterns(profile: Dict[str, Any]) -> List[str]:
+    """URL patterns to block at runtime through the DevTools protocol"""
+
+    patterns = []
+    if profile["block_fonts"]:
+        patterns.extend(FONT_URL_PATTERNS)
+    if profile["block_media"]:
+        patterns.extend(MEDIA_URL_PATTERNS)
+    for domain in profile["blocked_domains"]:
+        patterns.extend([f"*://{domain}/*", f"*://*.{domain}/*"])
+    return patterns
+
+
+def build_chrome_options(headless: bool, profile: Dict[str, Any]) -> "ChromeOptions":
+    """Translate the launch-time parts of a load profile into Chrome options"""
+
+    options = ChromeOptions()
+    if headless:
+        options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument(f'--user-agent={CONFIG["user_agent"].random}')
+    options.page_load_strategy = profile["page_load_strategy"]
+    if profile["disable_extensions"]:
+        options.add_argument("--disable-extensions")
+    prefs = {}
+    if profile["block_images"]:
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        prefs["profile.managed_default_content_settings.images"] = 2
+    if profile["disable_javascript"]:
+        prefs["profile.managed_default_content_settings.javascript"] = 2
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+    return options
+
+
+def create_browser_driver(
+    headless: bool = True, load_profile: Dict[str, Any] = None
+) -> Optional["webdriver.Chrome"]:
+    """Create a Chrome WebDriver instance"""
+
+    if not SELENIUM_AVAILABLE:
+        raise Exception(
+            "Selenium not available. Install selenium package for browser automation."
+        )
+
+    try:
+        options = build_chrome_options(headless, resolve_load_profile(load_profile))
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(CONFIG["default_timeout"])
+        return driver
+
+    except Exception as e:
+        raise Exception(f"Failed to create browser driver: {str(e)}")
+
+
+def apply_runtime_blocking(driver, profile: Dict[str, Any]) -> None:
+    """Block fonts, media and listed domains for the coming session"""
+
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd(
+        "Network.setBlockedURLs", {"urls": blocked_url_patterns(profile)}
+    )
+
+
+def url_origin(url: str) -> Optional[str]:
+    """``scheme://host[:port]`` of an http(s) URL, or None for other URLs"""
+
+    parsed = urlparse(url or "")
+    if parsed.scheme not in ("http", "https") or not parsed.netloc:
+        return None
+    return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+
+class BrowserPool:
+    """Pool of warm WebDriver sessions shared by browser tools"""
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_uses: int = 50,
+        idle_timeout: float = 300,
+        driver_factory=None,
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.driver_factory = driver_factory or (
+            lambda headless, profile: create_browser_driver(headless, profile)
+        )
+        self._condition = threading.Condition()
+        self._idle: Dict[Any, List[Dict[str, Any]]] = {}
+        self._live = 0
+        self._closed = False
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+        self.counters = {
+            "created": 0,
+            "reused": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "reaped": 0,
+        }
+
+    def checkout(
+        self,
+        headless: bool = True,
+        timeout: float = None,
+        load_profile: Dict[str, Any] = None,
+    ) -> Dict[str, Any]:
+        """Borrow a driver, waiting up to ``timeout`` seconds for a free slot"""
+
+        profile = resolve_load_profile(load_profile)
+        key = browser_launch_key(headless, profile)
+        deadline = time.monotonic() + (
+            CONFIG["browser_checkout_timeout"] if timeout is None else timeout
+        )
+        while True:
+            to_quit = []
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise Exception("Browser pool is shut down")
+                    to_quit.extend(self._take_expired())
+                    idle = self._idle.get(key)
+                    if idle:
+                        entry = idle.pop()
+                        create = False
+                        break
+                    if self._live < self.size:
+                        self._live += 1
+                        create = True
+                        break
+                    # Pool is full: make room by retiring an idle driver of another kind
+                    other = next((entries for entries in self._idle.values() if entries), None)
+                    if other:
+                        to_quit.append(other.pop(0))
+                        self._live -= 1
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("No browser became available in time")
+                    self._condition.wait(remaining)
+
+            for stale in to_quit:
+                self._quit(stale)
+
+            if create:
+                try:
+                    driver = self.driver_factory(headless, profile)
+                except Exception:
+                    with self._condition:
+                        self._live -= 1
+                        self._condition.notify()
+                    raise
+                self.counters["created"] += 1
+                self._start_reaper()
+                return {
+                    "driver": driver,
+                    "key": key,
+                    "uses": 0,
+                    "last_used": time.monotonic(),
+                    "origins": set(),
+                }
+
+            if self._is_alive(entry["driver"]):
+                self.counters["reused"] += 1
+                return entry
+            self.counters["discarded"] += 1
+            self._discard(entry)
+
+    def checkin(self, entry: Dict[str, Any], broken: bool = False) -> None:
+        """Return a driver, resetting it for the next session or retiring it"""
+
+        entry["uses"] += 1
+        if broken or self._closed:
+            self.counters["discarded"] += 1
+            self._discard(entry)
+            return
+        if entry["uses"] >= self.max_uses:
+            self.counters["recycled"] += 1
+            self._discard(entry)
+            return
+        if not self._reset(entry):
+            self.counters["discarded"] += 1
+            self._discard(entry)
+            return
+
+        entry["last_used"] = time.monotonic()
+        with self._condition:
+            self._idle.setdefault(entry["key"], []).append(entry)
+            self._condition.notify()
+
+    def reap_idle(self) -> None:
+        """Quit drivers that have been idle longer than ``idle_timeout``"""
+
+        with self._condition:
+            expired = self._take_expired()
+        for entry in expired:
+            self._quit(entry)
+
+    def shutdown(self) -> None:
+        """Quit every idle driver; drivers still checked out are quit on return"""
+
+        with self._condition:
+            self._closed = True
+            entries = [entry for idle in self._idle.values() for entry in idle]
+            self._idle.clear()
+            self._live -= len(entries)
+            self._condition.notify_all()
+        self._stop_reaper.set()
+        for entry in entries:
+            self._quit(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            idle = sum(len(entries) for entries in self._idle.values())
+            return {
+                **self.counters,
+                "size": self.size,
+                "live": self._live,
+                "idle": idle,
+                "in_use": self._live - idle,
+            }
+
+    def _take_expired(self) -> List[Dict[str, Any]]:
+        # Caller holds the condition lock; the caller quits the returned drivers
+        now = time.monotonic()
+        expired = []
+        for key, entries in self._idle.items():
+            keep = []
+            for entry in entries:
+                if now - entry["last_used"] > self.idle_timeout:
+                    expired.append(entry)
+                else:
+                    keep.append(entry)
+            self._idle[key] = keep
+        self._live -= len(expired)
+        self.counters["reaped"] += len(expired)
+        return expired
+
+    def _start_reaper(self) -> None:
+        with self._condition:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(
+                target=self._reap_loop, name="browser-pool-reaper", daemon=True
+            )
+        self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        interval = max(1.0, self.idle_timeout / 2)
+        while not self._stop_reaper.wait(interval):
+            self.reap_idle()
+
+    def _is_alive(self, driver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def record_origin(self, entry: Dict[str, Any], url: str = None) -> None:
+        """Note an origin a checked-out driver visited, so checkin can wipe it"""
+
+        try:
+            origin = url_origin(url if url is not None else entry["driver"].current_url)
+        except Exception:
+            return
+        if origin is not None:
+            entry.setdefault("origins", set()).add(origin)
+
+    def _reset(self, entry: Dict[str, Any]) -> bool:
+        """Clear cookies, storage and cache so the next session starts clean"""
+
+        driver = entry["driver"]
+        self.record_origin(entry)
+        try:
+            driver.execute_script(
+                "try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}"
+            )
+            if hasattr(driver, "execute_cdp_cmd"):
+                for origin in sorted(entry.get("origins", ())):
+                    driver.execute_cdp_cmd(
+                        "Storage.clearDataForOrigin",
+                        {"origin": origin, "storageTypes": "all"},
+                    )
+                driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+                driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+            else:
+                driver.delete_all_cookies()
+            driver.get("about:blank")
+            entry["origins"] = set()
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, entry: Dict[str, Any]) -> None:
+        try:
+            entry["driver"].quit()
+        except Exception:
+            pass
+
+    def _discard(self, entry: Dict[str, Any]) -> None:
+        """Quit a checked-out driver and free its slot"""
+
+        self._quit(entry)
+        with self._condition:
+            self._live -= 1
+            self._condition.notify()
+
+
+browser_pool = BrowserPool(
+    size=CONFIG["browser_pool_size"],
+    max_uses=CONFIG["browser_max_uses"],
+    idle_timeout=CONFIG["browser_idle_timeout"],
+)
+
+
+class BrowserSessionCancelled(Exception):
+    """Raised inside a browser session when its caller gave up on it"""
+
+
+# Counts fetch/XHR requests in flight and lifts the resource timing buffer
+# limit (250 entries by default, after which the resource count freezes).
+# Idempotent, so it can run both at document start and before each poll.
+NETWORK_TRACKER_SCRIPT = """
+(() => {
+  if (window.__inflightRequests !== undefined) return;
+  window.__inflightRequests = 0;
+  try { performance.setResourceTimingBufferSize(1000000); } catch (e) {}
+  const done = () => {
+    window.__inflightRequests = Math.max(0, window.__inflightRequests - 1);
+  };
+  if (window.fetch) {
+    const fetch = window.fetch;
+    window.fetch = function (...args) {
+      window.__inflightRequests++;
+      return fetch.apply(this, args).finally(done);
+    };
+  }
+  const send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function (...args) {
+    window.__inflightRequests++;
+    this.addEventListener("loadend", done, { once: true });
+    return send.apply(this, args);
+  };
+})();
+"""
+
+
+def install_network_tracker(entry: Dict[str, Any]) -> None:
+    """Run NETWORK_TRACKER_SCRIPT at the start of every document the driver loads"""
+
+    driver = entry["driver"]
+    if entry.get("network_tracker") or not hasattr(driver, "execute_cdp_cmd"):
+        return
+    driver.execute_cdp_cmd(
+        "Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER_SCRIPT}
+    )
+    entry["network_tracker"] = True
+
+
+def network_idle(idle_seconds: float):
+    """Wait condition: page loaded and no new or pending requests for ``idle_seconds``"""
+
+    state = {"count": None, "since": 0.0}
+
+    def condition(driver) -> bool:
+        ready_state, resource_count, inflight = driver.execute_script(
+            NETWORK_TRACKER_SCRIPT
+            + "return [document.readyState, "
+            "performance.getEntriesByType('resource').length, "
+            "window.__inflightRequests];"
+        )
+        now = time.monotonic()
+        if (
+            ready_state != "complete"
+            or inflight
+            or resource_count != state["count"]
+        ):
+            state["count"] = resource_count
+            state["since"] = now
+            return False
+        return now - state["since"] >= idle_seconds
+
+    return condition
+
+
+def wait_for_condition(
+    driver, action: Dict[str, Any], cancel_event: threading.Event
+) -> str:
+    """Block until a wait_for_* action's condition holds, polling every 100 ms"""
+
+    action_type = action.get("type", "")
+    timeout = action.get("timeout", CONFIG["browser_wait_timeout"])
+    selector = action.get("selector", "body")
+
+    if action_type == "wait_for_selector":
+        locate = (
+            EC.presence_of_element_located
+            if action.get("state") == "present"
+            else EC.visibility_of_element_located
+        )
+        condition = locate((By.CSS_SELECTOR, selector))
+        description = f"selector {selector}"
+    elif action_type == "wait_for_clickable":
+        condition = EC.element_to_be_clickable((By.CSS_SELECTOR, selector))
+        description = f"clickable {selector}"
+    elif action_type == "wait_for_network_idle":
+        idle_ms = action.get("idle_ms", 500)
+        condition = network_idle(idle_ms / 1000)
+        description = f"network idle for {idle_ms} ms"
+    elif action_type == "wait_for_url_change":
+        if action.get("contains"):
+            condition = EC.url_contains(action["contains"])
+            description = f"URL containing {action['contains']}"
+        else:
+            condition = EC.url_changes(driver.current_url)
+            description = "URL change"
+    elif action_type == "wait_for_text":
+        text = action.get("text", "")
+        condition = EC.text_to_be_present_in_element((By.CSS_SELECTOR, selector), text)
+        description = f"text '{text}' in {selector}"
+    else:
+        raise ValueError(f"Unknown wait action: {action_type}")
+
+    def until_ready(driver):
+        if cancel_event.is_set():
+            raise BrowserSessionCancelled("Browser session was cancelled")
+        return condition(driver)
+
+    start = time.monotonic()
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=0.1).until(until_ready)
+    except TimeoutException:
+        raise Exception(f"Timed out after {timeout}s waiting for {description}")
+    return f"Waited for {description} ({time.monotonic() - start:.2f}s)"
+
+
+def run_browser_session(
+    url: str,
+    actions: List[Dict[str, Any]],
+    headless: bool,
+    cancel_event: threading.Event,
+    load_profile: Any = None,
+) -> Dict[str, Any]:
+    """Run a browser action script synchronously on a pooled driver"""
+
+    entry = None
+    try:
+        profile = resolve_load_profile(load_profile)
+        entry = browser_pool.checkout(headless=headless, load_profile=profile)
+        driver = entry["driver"]
+        if cancel_event.is_set():
+            raise BrowserSessionCancelled("Browser session was cancelled")
+        apply_runtime_blocking(driver, profile)
+        install_network_tracker(entry)
+        browser_pool.record_origin(entry, url)
+        driver.get(url)
+        browser_pool.record_origin(entry)
+
+        results = {
+            "url": url,
+            "actions_performed": [],
+            "final_url": url,
+            "page_title": "",
+            "status": "success",
+        }
+
+        for action in actions:
+            if cancel_event.is_set():
+                raise BrowserSessionCancelled("Browser session was cancelled")
+            action_type = action.get("type", "")
+
+            if action_type == "click":
+                selector = action.get("selector", "")
+                element = driver.find_element(By.CSS_SELECTOR, selector)
+                element.click()
+                results["actions_performed"].append(f"Clicked: {selector}")
+
+            elif action_type == "input":
+                selector = action.get("selector", "")
+                text = action.get("text", "")
+                element = driver.find_element(By.CSS_SELECTOR, selector)
+                element.clear()
+                element.send_keys(text)
+                results["actions_performed"].append(
+                    f"Input text '{text}' to: {selector}"
+                )
+
+            elif action_type == "wait":
+                seconds = action.get("seconds", 1)
+                if cancel_event.wait(seconds):
+                    raise BrowserSessionCancelled("Browser session was cancelled")
+                results["actions_performed"].append(f"Waited: {seconds} seconds")
+
+            elif action_type.startswith("wait_for_"):
+                results["actions_performed"].append(
+                    wait_for_condition(driver, action, cancel_event)
+                )
+
+            elif action_type == "scroll":
+                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+                results["actions_performed"].append("Scrolled to bottom")
+
+            elif action_type == "screenshot":
+                screenshot_path = action.get("path", "screenshot.png")
+                driver.save_screenshot(screenshot_path)
+                results["actions_performed"].append(
+                    f"Screenshot saved: {screenshot_path}"
+                )
+
+            elif action_type == "extract_text":
+                selector = action.get("selector", "body")
+                elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                extracted_text = [elem.text for elem in elements]
+                results["extracted_text"] = extracted_text
+                results["actions_performed"].append(f"Extracted text from: {selector}")
+
+            # Clicks and inputs may have navigated to another origin
+            browser_pool.record_origin(entry)
+
+        results["final_url"] = driver.current_url
+        results["page_title"] = driver.title
+
+        return results
+
+    except Exception as e:
+        return {"url": url, "status": "error", "error": str(e)}
+    finally:
+        if entry is not None:
+            browser_pool.checkin(entry)
+
+
+_browser_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_browser_executor() -> ThreadPoolExecutor:
+    """Return the thread pool that browser sessions run on"""
+
+    global _browser_executor
+
+    if _browser_executor is None:
+        _browser_executor = ThreadPoolExecutor(
+            max_workers=max(1, CONFIG["browser_workers"]),
+            thread_name_prefix="browser-session",
+        )
+    return _browser_executor
+
+
+def render_page_source(
+    url: str, cancel_event: threading.Event, load_profile: Any = None
+) -> Dict[str, Any]:
+    """Load a page on a pooled headless driver and return its rendered HTML"""
+
+    entry = None
+    try:
+        profile = resolve_load_profile(load_profile)
+        entry = browser_pool.checkout(headless=True, load_profile=profile)
+        driver = entry["driver"]
+        if cancel_event.is_set():
+            raise BrowserSessionCancelled("Browser session was cancelled")
+        apply_runtime_blocking(driver, profile)
+        install_network_tracker(entry)
+        browser_pool.record_origin(entry, url)
+        driver.get(url)
+
+        idle = network_idle(CONFIG["render_idle_ms"] / 1000)
+
+        def rendered(driver) -> bool:
+            if cancel_event.is_set():
+                raise BrowserSessionCancelled("Browser session was cancelled")
+            return idle(driver) and not looks_like_challenge(driver.page_source)
+
+        try:
+            WebDriverWait(driver, CONFIG["render_wait_timeout"], poll_frequency=0.1).until(
+                rendered
+            )
+        except TimeoutException:
+            pass
+
+        return {
+            "url": url,
+            "status": "success",
+            "final_url": driver.current_url,
+            "html": driver.page_source,
+        }
+
+    except Exception as e:
+        return {"url": url, "status": "error", "error": str(e)}
+    finally:
+        if entry is not None:
+            browser_pool.checkin(entry)
+
+
+async def run_in_browser_thread(
+    session, url: str, timeout: float, **kwargs
+) -> Dict[str, Any]:
+    """Run a synchronous browser session on the browser executor with a deadline"""
+
+    cancel_event = threading.Event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(
+        get_browser_executor(),
+        functools.partial(session, url, cancel_event=cancel_event, **kwargs),
+    )
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        cancel_event.set()
+        return {
+            "url": url,
+            "status": "error",
+            "error": f"Browser session exceeded its {timeout}s deadline",
+        }
+    except asyncio.CancelledError:
+        cancel_event.set()
+        raise
+
+
+async def automate_browser_task(
+    url: str,
+    actions: List[Dict[str, Any]],
+    headless: bool = True,
+    timeout: float = None,
+    load_profile: Any = None,
+) -> Dict[str, Any]:
+    """Perform automated browser tasks without blocking the event loop"""
+
+    if not SELENIUM_AVAILABLE:
+        return {"error": "Browser automation requires Selenium package"}
+
+    if timeout is None:
+        timeout = CONFIG["browser_session_timeout"]
+
+    return await run_in_browser_thread(
+        run_browser_session,
+        url,
+        timeout,
+        actions=actions,
+        headless=headless,
+        load_profile=load_profile,
+    )
+
+
+async def render_page(url: str, timeout: float = None) -> Dict[str, Any]:
+    """Render a page in the browser pool using CONFIG["render_load_profile"]"""
+
+    if not SELENIUM_AVAILABLE:
+        return {"url": url, "status": "error", "error": "Rendering requires Selenium package"}
+
+    if timeout is None:
+        timeout = CONFIG["render_timeout"]
+
+    return await run_in_browser_thread(
+        render_page_source, url, timeout, load_profile=CONFIG["render_load_profile"]
+    )
+
+
+def number_screenshot_paths(
+    actions: List[Dict[str, Any]], index: int
+) -> List[Dict[str, Any]]:
+    """Give each URL of a batch its own screenshot files by suffixing the index"""
+
+    numbered = []
+    for action in actions:
+        if action.get("type") == "screenshot":
+            root, ext = os.path.splitext(action.get("path", "screenshot.png"))
+            action = {**action, "path": f"{root}_{index}{ext}"}
+        numbered.append(action)
+    return numbered
+
+
+def progress_result_message(index: int, result: Dict[str, Any]) -> str:
+    """JSON summary of one URL's result, streamed in its progress notification"""
+
+    message = {"index": index, "url": result.get("url"), "status": result.get("status", "error")}
+    for field in ("final_url", "page_title", "error"):
+        if result.get(field):
+            message[field] = result[field]
+    if "extracted_text" in result:
+        budget = CONFIG["browser_progress_text_chars"]
+        texts = []
+        for text in result["extracted_text"]:
+            if budget <= 0:
+                break
+            texts.append(text[:budget])
+            budget -= len(texts[-1])
+        message["extracted_text"] = texts
+        message["truncated"] = texts != result["extracted_text"]
+    return json.dumps(message, ensure_ascii=False)
+
+
+async def batch_browser_automation(
+    urls: List[str],
+    actions: List[Dict[str, Any]],
+    headless: bool = True,
+    max_concurrency: int = None,
+    timeout: float = None,
+    load_profile: Any = None,
+    sink: Any = None,
+) -> Dict[str, Any]:
+    """Run one action script against many URLs on the shared browser pool"""
+
+    if not SELENIUM_AVAILABLE:
+        return {"error": "Browser automation requires Selenium package"}
+    dataset_sink = DatasetSink(sink) if sink else None
+
+    if max_concurrency is None:
+        max_concurrency = CONFIG["browser_pool_size"]
+    max_concurrency = max(
+        1, min(max_concurrency, browser_pool.size, CONFIG["browser_workers"])
+    )
+    indexes = {}
+    for index, url in enumerate(urls):
+        indexes.setdefault(url, []).append(index)
+    done = 0
+
+    async def session(url: str) -> Dict[str, Any]:
+        nonlocal done
+        index = indexes[url].pop(0)
+        result = await automate_browser_task(
+            url,
+            number_screenshot_paths(actions, index),
+            headless,
+            timeout,
+            load_profile,
+        )
+        done += 1
+        await report_progress(done, len(urls), progress_result_message(index, result))
+        if dataset_sink is not None:
+            await dataset_sink.add(result)
+            return {"status": result.get("status")}
+        return result
+
+    start = time.time()
+    results = await run_bounded(urls, session, max_concurrency=max_concurrency)
+    succeeded = sum(1 for result in results if result.get("status") == "success")
+    summary = {
+        "total_urls": len(urls),
+        "succeeded": succeeded,
+        "failed": len(urls) - succeeded,
+        "max_concurrency": max_concurrency,
+        "elapsed_seconds": round(time.time() - start, 2),
+    }
+
+    if dataset_sink is not None:
+        return {"sink": await dataset_sink.close(), "summary": summary}
+    return {"results": results, "summary": summary}
+
+
+# === DATASET FUNCTIONS ===
+
+
+def list_datasets() -> List[Dict[str, Any]]:
+    """List available datasets"""
+
+    datasets = []
+    datasets_dir = CONFIG["datasets_dir"]
+
+    for filename in os.listdir(datasets_dir):
+        filepath = os.path.join(datasets_dir, filename)
+        # Hidden files are writers' lock and temporary files
+        if os.path.isfile(filepath) and not filename.startswith("."):
+            format_type, compression = dataset_format(filename)
+            file_size = os.path.getsize(filepath)
+
+            datasets.append(
+                {
+                    "name": filename,
+                    "path": filepath,
+                    "type": f".{format_type}",
+                    "compression": compression,
+                    "size_bytes": file_size,
+                    "size_mb": round(file_size / (1024 * 1024), 2),
+                }
+            )
+
+    return datasets
+
+
+# Compressed file suffixes, supported for JSON Lines datasets
+DATASET_COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+
+
+def dataset_format(name: str) -> tuple:
+    """Return ``(format, compression)`` for a dataset file name"""
+
+    stem, ext = os.path.splitext(name.lower())
+    compression = DATASET_COMPRESSION_SUFFIXES.get(ext)
+    if compression is not None:
+        stem, ext = os.path.splitext(stem)
+    return ext.lstrip("."), compression
+
+
+def open_jsonl(path: str, mode: str = "r", compression: Optional[str] = None):
+    """Open a JSON Lines file as text, through gzip or zstd when compressed"""
+
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if compression == "zstd":
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd-compressed datasets require the zstandard package")
+        if mode == "r":
+            stream = zstandard.ZstdDecompressor().stream_reader(
+                open(path, "rb"), read_across_frames=True, closefd=True
+            )
+        else:
+            stream = zstandard.ZstdCompressor().stream_writer(
+                open(path, mode + "b"), closefd=True
+            )
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_jsonl(
+    path: str,
+    records: List[Any],
+    compression: Optional[str] = None,
+    append: bool = False,
+) -> int:
+    """Write records to a JSON Lines file, one compact JSON document per line"""
+
+    with open_jsonl(path, "a" if append else "w", compression) as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    return len(records)
+
+
+def iter_jsonl_batches(
+    path: str, compression: Optional[str] = None, start_line: int = 0
+):
+    """Yield ``(line_numbers, records)`` batches from a JSON Lines file"""
+
+    batch_lines = max(1, CONFIG["jsonl_batch_lines"])
+    numbers: List[int] = []
+    records: List[Any] = []
+    with open_jsonl(path, "r", compression) as f:
+        for number, line in enumerate(itertools.islice(f, start_line, None), start_line):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {number + 1}: {e.msg}")
+            numbers.append(number)
+            if len(records) >= batch_lines:
+                yield numbers, records
+                numbers, records = [], []
+    if records:
+        yield numbers, records
+
+
+# Ways create_dataset can write to an existing dataset
+DATASET_WRITE_MODES = ("overwrite", "append", "upsert")
+
+# Process-local fallback for dataset_lock where fcntl is unavailable
+_dataset_locks: Dict[str, threading.Lock] = {}
+_dataset_locks_guard = threading.Lock()
+
+
+def dataset_temp_path(path: str) -> str:
+    """Hidden sibling file a dataset is written to before replacing ``path``"""
+
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, f".{filename}.tmp")
+
+
+@contextmanager
+def dataset_lock(path: str):
+    """Hold the exclusive writer lock of the dataset at ``path``"""
+
+    if not FCNTL_AVAILABLE:
+        with _dataset_locks_guard:
+            lock = _dataset_locks.setdefault(os.path.abspath(path), threading.Lock())
+        with lock:
+            yield
+        return
+
+    directory, filename = os.path.split(path)
+    with open(os.path.join(directory, f".{filename}.lock"), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def atomic_output(path: str):
+    """Yield a temporary path that replaces ``path`` once the block succeeds"""
+
+    tmp_path = dataset_temp_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def append_csv(path: str, records: List[Dict[str, Any]]) -> None:
+    """Append records to a CSV dataset, in the column order of its header"""
+
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        with atomic_output(path) as tmp_path:
+            pd.DataFrame(records).to_csv(tmp_path, index=False)
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    frame = pd.DataFrame(records)
+    unknown = [column for column in frame.columns if column not in header]
+    if unknown:
+        raise ValueError(
+            f"Columns not in the CSV header: {unknown}; "
+            "overwrite the dataset or use jsonl or sqlite to add columns"
+        )
+    text = frame.reindex(columns=header).to_csv(index=False, header=False)
+
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) not in (b"\n", b"\r"):
+            text = "\n" + text
+    # One write, so a failure cannot leave half a batch behind
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def check_write_mode(format_type: str, mode: str, key: Any = None) -> List[str]:
+    """Validate a create_dataset write mode and return its key columns as a list"""
+
+    if mode not in DATASET_WRITE_MODES:
+        raise ValueError(f"Unsupported mode: {mode}")
+    key = [key] if isinstance(key, str) else list(key or [])
+    if mode == "append" and format_type.lower() not in ("csv", "jsonl", "sqlite"):
+        raise ValueError("Append mode supports csv, jsonl and sqlite datasets")
+    if mode == "upsert":
+        if format_type.lower() != "sqlite":
+            raise ValueError("Upsert mode requires a sqlite dataset")
+        if not key:
+            raise ValueError("Upsert mode requires key columns")
+    return key
+
+
+def create_dataset(
+    name: str,
+    data: List[Dict[str, Any]],
+    format_type: str = "csv",
+    compression: str = None,
+    mode: str = "overwrite",
+    key: List[str] = None,
+) -> Dict[str, Any]:
+    """Create a new dataset, or add records to an existing one"""
+
+    try:
+        filename = f"{name}.{format_type}"
+        if compression:
+            if format_type.lower() != "jsonl":
+                raise ValueError("Compression is only supported for jsonl datasets")
+            suffixes = {v: k for k, v in DATASET_COMPRESSION_SUFFIXES.items()}
+            if compression not in suffixes:
+                raise ValueError(f"Unsupported compression: {compression}")
+            filename += suffixes[compression]
+        filepath = os.path.join(CONFIG["datasets_dir"], filename)
+
+        key = check_write_mode(format_type, mode, key)
+
+        written: Dict[str, Any] = {}
+        with dataset_lock(filepath):
+            if mode != "overwrite":
+                if format_type.lower() == "csv":
+                    append_csv(filepath, data)
+                elif format_type.lower() == "jsonl":
+                    write_jsonl(filepath, data, compression, append=True)
+                else:
+                    written = merge_sqlite_records(filepath, data, key)
+            elif format_type.lower() == "sqlite":
+                write_sqlite_dataset(filepath, [data])
+            else:
+                with atomic_output(filepath) as tmp_path:
+                    if format_type.lower() == "csv":
+                        df = pd.DataFrame(data)
+                        df.to_csv(tmp_path, index=False)
+                    elif format_type.lower() == "json":
+                        with open(tmp_path, "w") as f:
+                            json.dump(data, f, indent=2)
+                    elif format_type.lower() == "parquet":
+                        if not PYARROW_AVAILABLE:
+                            raise ValueError("Parquet datasets require the pyarrow package")
+                        pq.write_table(
+                            pa.Table.from_pylist(data),
+                            tmp_path,
+                            row_group_size=CONFIG["parquet_row_group_size"],
+                            compression=CONFIG["parquet_compression"],
+                        )
+                    elif format_type.lower() == "jsonl":
+                        write_jsonl(tmp_path, data, compression)
+                    else:
+                        raise ValueError(f"Unsupported format: {format_type}")
+
+        return {
+            "status": "success",
+            "name": name,
+            "path": filepath,
+            "format": format_type,
+            "mode": mode,
+            "records": len(data),
+            **written,
+        }
+
+    except Exception as e:
+        return {"status": "error", "error": str(e)}
+
+
+async def run_blocking(func, *args) -> Any:
+    """Run a blocking call on the default thread pool, off the event loop"""
+
+    return await asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(func, *args)
+    )
+
+
+class DatasetSink:
+    """Write a tool's records into a dataset instead of returning them"""
+
+    def __init__(self, spec: Any):
+        if isinstance(spec, str):
+            spec = {"name": spec}
+        self.name = spec.get("name")
+        if not self.name:
+            raise ValueError("A dataset sink needs a name")
+        self.format = spec.get("format", "jsonl")
+        if self.format not in ("csv", "json", "jsonl", "parquet", "sqlite"):
+            raise ValueError(f"Unsupported format: {self.format}")
+        self.compression = spec.get("compression")
+        self.mode = spec.get("mode", "append")
+        self.key = check_write_mode(self.format, self.mode, spec.get("key"))
+        self.streamed = self.format in ("jsonl", "sqlite")
+        self.pending: List[Dict[str, Any]] = []
+        self.written = 0
+        self.path = None
+        self.error = None
+        self._lock = asyncio.Lock()
+
+    async def add(self, record: Dict[str, Any]) -> None:
+        self.pending.append(record)
+        if self.streamed and len(self.pending) >= CONFIG["sink_batch_records"]:
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Write the buffered records off the event loop, in arrival order"""
+
+        async with self._lock:
+            records, self.pending = self.pending, []
+            if not records or self.error is not None:
+                return
+            mode = self.mode
+            if mode == "overwrite" and self.path is not None:
+                mode = "append"
+            result = await run_blocking(
+                create_dataset,
+                self.name,
+                records,
+                self.format,
+                self.compression,
+                mode,
+                self.key,
+            )
+            if result["status"] == "success":
+                self.written += len(records)
+                self.path = result["path"]
+            else:
+                # Later records are dropped rather than written out of order
+                self.error = result["error"]
+
+    async def close(self) -> Dict[str, Any]:
+        """Write what is left and describe the dataset written to"""
+
+        await self.flush()
+        summary = {
+            "name": os.path.basename(self.path) if self.path else None,
+            "format": self.format,
+            "mode": self.mode,
+            "records_written": self.written,
+        }
+        if self.error is not None:
+            summary["error"] = self.error
+        return summary
+
+
+def downcast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink a DataFrame's memory footprint without changing its values"""
+
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_integer_dtype(series.dtype):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif len(series) and (
+            pd.api.types.is_object_dtype(series.dtype)
+            or pd.api.types.is_string_dtype(series.dtype)
+        ):
+            try:
+                distinct = series.nunique(dropna=False)
+            except TypeError:
+                # Unhashable values (lists, dicts) cannot be categories
+                continue
+            if distinct <= len(series) * CONFIG["dataset_category_ratio"]:
+                df[column] = series.astype("category")
+    return df
+
+
+class DataFrameCache:
+    """LRU of loaded datasets, bounded by their total in-memory size"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, path: str, loader) -> pd.DataFrame:
+        """Return the cached frame for ``path``, calling ``loader(path)`` on a miss"""
+
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if entry["version"] == version:
+                    self._entries.move_to_end(path)
+                    self.counters["hits"] += 1
+                    return entry["frame"]
+                self.counters["invalidations"] += 1
+                self._remove(path)
+            self.counters["misses"] += 1
+
+        frame = downcast_frame(loader(path))
+        size = int(frame.memory_usage(deep=True).sum())
+        if size <= self.max_bytes:
+            with self._lock:
+                self._remove(path)
+                self._entries[path] = {"version": version, "frame": frame, "bytes": size}
+                self.current_bytes += size
+                while self.current_bytes > self.max_bytes:
+                    oldest = next(iter(self._entries))
+                    self._remove(oldest)
+                    self.counters["evictions"] += 1
+        return frame
+
+    def _remove(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.current_bytes -= entry["bytes"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": len(self._entries),
+            "memory_bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+dataset_cache = DataFrameCache(CONFIG["dataset_cache_bytes"])
+
+
+def load_csv(path: str, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    """Load a CSV dataset, through the DataFrame cache when it is enabled"""
+
+    if CONFIG["dataset_cache_bytes"] > 0:
+        return dataset_cache.get(path, pd.read_csv)
+    return pd.read_csv(path, usecols=usecols)
+
+
+FILTER_OPERATORS = ["==", "!=", "<", "<=", ">", ">=", "in", "not in"]
+
+
+def validate_filters(filters: Optional[List[Any]]) -> List[tuple]:
+    """Check ``[column, operator, value]`` filters and return them as tuples"""
+
+    checked = []
+    for item in filters or []:
+        if not isinstance(item, (list, tuple)) or len(item) != 3:
+            raise ValueError(f"Filter must be [column, operator, value]: {item!r}")
+        column, op, value = item
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if op in ("in", "not in") and not isinstance(value, (list, tuple)):
+            raise ValueError(f"Filter operator '{op}' needs a list value")
+        checked.append((column, op, value))
+    return checked
+
+
+def comparable_series(series: pd.Series, op: str) -> pd.Series:
+    """Return ``series`` in a form that supports the comparison ``op``"""
+
+    if isinstance(series.dtype, pd.CategoricalDtype) and op in ("<", "<=", ">", ">="):
+        # Unordered categoricals only support equality comparisons
+        return series.astype(series.cat.categories.dtype)
+    return series
+
+
+def needed_columns(
+    columns: List[str], filters: List[tuple], sort: List[tuple], where: Optional[tuple]
+) -> List[str]:
+    """Columns a query must read: the selected ones plus those it filters or sorts on"""
+
+    return list(
+        dict.fromkeys(
+            list(columns)
+            + [f[0] for f in filters]
+            + [c for c, _ in sort]
+            + (where_columns(where) if where else [])
+        )
+    )
+
+
+def apply_filters(df: pd.DataFrame, filters: List[tuple]) -> pd.DataFrame:
+    """Keep the rows matching every filter, using vectorized column comparisons"""
+
+    if not filters:
+        return df
+
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in filters:
+        if column not in df.columns:
+            raise ValueError(f"Unknown column in filter: {column}")
+        series = comparable_series(df[column], op)
+        if op == "in":
+            mask &= series.isin(value)
+        elif op == "not in":
+            mask &= ~series.isin(value)
+        elif op == "==":
+            mask &= series == value
+        elif op == "!=":
+            mask &= series != value
+        elif op == "<":
+            mask &= series < value
+        elif op == "<=":
+            mask &= series <= value
+        elif op == ">":
+            mask &= series > value
+        else:
+            mask &= series >= value
+    return df[mask]
+
+
+# Functions allowed in where expressions, with the number of arguments after the column
+WHERE_FUNCTIONS = {
+    "contains": 1,
+    "icontains": 1,
+    "startswith": 1,
+    "endswith": 1,
+    "matches": 1,
+    "isnull": 0,
+    "notnull": 0,
+}
+WHERE_COMPARISONS = {
+    ast.Eq: "==",
+    ast.NotEq: "!=",
+    ast.Lt: "<",
+    ast.LtE: "<=",
+    ast.Gt: ">",
+    ast.GtE: ">=",
+}
+# The comparison seen from the other side, for "500 < words"
+WHERE_FLIPPED = {"==": "==", "!=": "!=", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+WHERE_MAX_LENGTH = 2000
+
+
+def parse_where(expression: str) -> tuple:
+    """Parse a where expression into a small predicate tree"""
+
+    if len(expression) > WHERE_MAX_LENGTH:
+        raise ValueError(f"Where expression is longer than {WHERE_MAX_LENGTH} characters")
+    try:
+        tree = ast.parse(expression.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid where expression: {e.msg}")
+    return where_node(tree.body)
+
+
+def where_column(node: ast.AST) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "col"
+        and len(node.args) == 1
+        and not node.keywords
+        and isinstance(node.args[0], ast.Constant)
+        and isinstance(node.args[0].value, str)
+    ):
+        return node.args[0].value
+    raise ValueError(f"Expected a column name, got: {ast.unparse(node)}")
+
+
+def where_value(node: ast.AST) -> Any:
+    if isinstance(node, (ast.Constant, ast.List, ast.Tuple, ast.UnaryOp)):
+        try:
+            value = ast.literal_eval(node)
+        except ValueError:
+            pass
+        else:
+            return list(value) if isinstance(value, tuple) else value
+    raise ValueError(f"Expected a literal value, got: {ast.unparse(node)}")
+
+
+def where_node(node: ast.AST) -> tuple:
+    """Translate one node of a parsed where expression"""
+
+    if isinstance(node, ast.BoolOp):
+        kind = "and" if isinstance(node.op, ast.And) else "or"
+        return (kind, [where_node(value) for value in node.values])
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return ("not", where_node(node.operand))
+
+    if isinstance(node, ast.Compare):
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.In, ast.NotIn)):
+                values = where_value(right)
+                if not isinstance(values, list):
+                    raise ValueError("'in' needs a list of values")
+                parts.append(("in", where_column(left), values, isinstance(op, ast.NotIn)))
+            elif type(op) in WHERE_COMPARISONS:
+                symbol = WHERE_COMPARISONS[type(op)]
+                if isinstance(left, (ast.Name, ast.Call)):
+                    parts.append(("cmp", where_column(left), symbol, where_value(right)))
+                else:
+                    flipped = WHERE_FLIPPED[symbol]
+                    parts.append(("cmp", where_column(right), flipped, where_value(left)))
+            else:
+                raise ValueError(f"Unsupported comparison: {ast.unparse(node)}")
+            left = right
+        return parts[0] if len(parts) == 1 else ("and", parts)
+
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+        name = node.func.id
+        if name not in WHERE_FUNCTIONS:
+            raise ValueError(f"Unknown function in where expression: {name}")
+        if node.keywords or len(node.args) != 1 + WHERE_FUNCTIONS[name]:
+            raise ValueError(
+                f"{name}() takes a column and {WHERE_FUNCTIONS[name]} value argument(s)"
+            )
+        argument = where_value(node.args[1]) if WHERE_FUNCTIONS[name] else None
+        if argument is not None and not isinstance(argument, str):
+            raise ValueError(f"{name}() needs a string argument")
+        if name == "matches":
+            try:
+                re.compile(argument)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression in matches(): {e}")
+        return ("func", name, where_column(node.args[0]), argument)
+
+    raise ValueError(f"Unsupported where expression: {ast.unparse(node)}")
+
+
+def where_columns(node: tuple) -> List[str]:
+    """Columns referenced by a predicate tree, in order of appearance"""
+
+    if node[0] in ("and", "or"):
+        return list(dict.fromkeys(c for child in node[1] for c in where_columns(child)))
+    if node[0] == "not":
+        return where_columns(node[1])
+    return [node[2] if node[0] == "func" else node[1]]
+
+
+def where_mask(df: pd.DataFrame, node: tuple) -> pd.Series:
+    """Evaluate a predicate tree as a vectorized mask with SQL null semantics"""
+
+    kind = node[0]
+    if kind in ("and", "or"):
+        masks = [where_mask(df, child) for child in node[1]]
+        result = masks[0]
+        for mask in masks[1:]:
+            result = (result & mask) if kind == "and" else (result | mask)
+        return result
+    if kind == "not":
+        return ~where_mask(df, node[1])
+
+    column = node[2] if kind == "func" else node[1]
+    if column not in df.columns:
+        raise ValueError(f"Unknown column in where expression: {column}")
+    series = df[column]
+
+    if kind == "func":
+        name, argument = node[1], node[3]
+        if name == "isnull":
+            return series.isna().astype("boolean")
+        if name == "notnull":
+            return series.notna().astype("boolean")
+        text = series.astype(str)
+        if name == "contains":
+            mask = text.str.contains(argument, regex=False)
+        elif name == "icontains":
+            mask = text.str.contains(argument, case=False, regex=False)
+        elif name == "startswith":
+            mask = text.str.startswith(argument)
+        elif name == "endswith":
+            mask = text.str.endswith(argument)
+        else:
+            # Python's re, like the SQLite REGEXP function; pandas' own
+            # regex matching may hand patterns to a different engine
+            pattern = re.compile(argument)
+            mask = text.map(lambda value: pattern.search(value) is not None)
+    elif kind == "in":
+        mask = series.isin(node[2])
+        if node[3]:
+            mask = ~mask
+    else:
+        op, value = node[2], node[3]
+        series = comparable_series(series, op)
+        if op == "==":
+            mask = series == value
+        elif op == "!=":
+            mask = series != value
+        elif op == "<":
+            mask = series < value
+        elif op == "<=":
+            mask = series <= value
+        elif op == ">":
+            mask = series > value
+        else:
+            mask = series >= value
+
+    mask = mask.astype("boolean")
+    mask[series.isna().to_numpy()] = pd.NA
+    return mask
+
+
+def apply_where(df: pd.DataFrame, node: Optional[tuple]) -> pd.DataFrame:
+    """Keep the rows for which a predicate tree is true"""
+
+    if node is None:
+        return df
+    return df[where_mask(df, node).fillna(False).to_numpy(dtype=bool)]
+
+
+def where_sql(node: tuple) -> tuple:
+    """Translate a predicate tree into an SQLite condition and its parameters"""
+
+    kind = node[0]
+    if kind in ("and", "or"):
+        parts = [where_sql(child) for child in node[1]]
+        joiner = " AND " if kind == "and" else " OR "
+        return (
+            "(" + joiner.join(sql for sql, _ in parts) + ")",
+            [param for _, params in parts for param in params],
+        )
+    if kind == "not":
+        sql, params = where_sql(node[1])
+        return f"(NOT {sql})", params
+
+    if kind == "func":
+        name, column, argument = node[1], quote_identifier(node[2]), node[3]
+        if name == "isnull":
+            return f"({column} IS NULL)", []
+        if name == "notnull":
+            return f"({column} IS NOT NULL)", []
+        if name == "contains":
+            return f"(instr({column}, ?) > 0)", [argument]
+        if name == "icontains":
+            return f"(instr(lower({column}), lower(?)) > 0)", [argument]
+        if name == "startswith":
+            return f"(substr({column}, 1, length(?)) = ?)", [argument, argument]
+        if name == "endswith":
+            return f"(substr({column}, -length(?)) = ?)", [argument, argument]
+        return f"({column} REGEXP ?)", [argument]
+
+    column = quote_identifier(node[1])
+    if kind == "in":
+        placeholders = ", ".join("?" * len(node[2]))
+        negation = "NOT " if node[3] else ""
+        return (
+            f"({column} {negation}IN ({placeholders}))",
+            [sqlite_value(v) for v in node[2]],
+        )
+    op = "=" if node[2] == "==" else node[2]
+    return f"({column} {op} ?)", [sqlite_value(node[3])]
+
+
+def sqlite_regexp(pattern: str, value: Any) -> Optional[bool]:
+    """REGEXP implementation registered on SQLite connections"""
+
+    if value is None:
+        return None
+    return re.search(pattern, str(value)) is not None
+
+
+def uses_regex(node: tuple) -> bool:
+    """Whether a predicate tree contains a ``matches`` call"""
+
+    kind = node[0]
+    if kind in ("and", "or"):
+        return any(uses_regex(child) for child in node[1])
+    if kind == "not":
+        return uses_regex(node[1])
+    return kind == "func" and node[1] == "matches"
+
+
+def split_where(node: tuple) -> tuple:
+    """Split a predicate tree into ``(pushed, residual)`` parts for Parquet"""
+
+    def combine(children: List[tuple]) -> Optional[tuple]:
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else ("and", children)
+
+    if node[0] == "and":
+        return (
+            combine([child for child in node[1] if not uses_regex(child)]),
+            combine([child for child in node[1] if uses_regex(child)]),
+        )
+    return (None, node) if uses_regex(node) else (node, None)
+
+
+def where_arrow(node: tuple):
+    """Translate a predicate tree into a pyarrow dataset filter expression"""
+
+    kind = node[0]
+    if kind in ("and", "or"):
+        expressions = [where_arrow(child) for child in node[1]]
+        result = expressions[0]
+        for expression in expressions[1:]:
+            result = (result & expression) if kind == "and" else (result | expression)
+        return result
+    if kind == "not":
+        return ~where_arrow(node[1])
+
+    if kind == "func":
+        name, field, argument = node[1], pc.field(node[2]), node[3]
+        if name == "isnull":
+            return field.is_null()
+        if name == "notnull":
+            return field.is_valid()
+        text = field.cast(pa.string())
+        if name == "contains":
+            return pc.match_substring(text, pattern=argument)
+        if name == "icontains":
+            return pc.match_substring(text, pattern=argument, ignore_case=True)
+        if name == "startswith":
+            return pc.starts_with(text, pattern=argument)
+        if name == "endswith":
+            return pc.ends_with(text, pattern=argument)
+        raise ValueError("matches() is evaluated after reading, not pushed down")
+
+    field = pc.field(node[1])
+    if kind == "in":
+        expression = field.isin(node[2])
+        # isin is false for nulls; keep them unknown for "not in" as well
+        return (~expression & field.is_valid()) if node[3] else expression
+    op, value = node[2], node[3]
+    if op == "==":
+        return field == value
+    if op == "!=":
+        return field != value
+    if op == "<":
+        return field < value
+    if op == "<=":
+        return field <= value
+    if op == ">":
+        return field > value
+    return field >= value
+
+
+def text_match_mask(df: pd.DataFrame, query: str) -> pd.Series:
+    """Rows where any column contains ``query``, case-insensitively"""
+
+    return (
+        df.astype(str)
+        .apply(lambda x: x.str.contains(query, case=False, na=False))
+        .any(axis=1)
+    )
+
+
+def parse_order_by(order_by: Optional[List[str]]) -> List[tuple]:
+    """Turn ``["col", "-other"]`` into ``[("col", True), ("other", False)]``"""
+
+    sort = []
+    for item in order_by or []:
+        if not isinstance(item, str) or not item.lstrip("-"):
+            raise ValueError(f"Invalid order_by entry: {item!r}")
+        if item.startswith("-"):
+            sort.append((item[1:], False))
+        else:
+            sort.append((item, True))
+    return sort
+
+
+def sort_frame(df: pd.DataFrame, sort: List[tuple]) -> pd.DataFrame:
+    if not sort:
+        return df
+    for column, _ in sort:
+        if column not in df.columns:
+            raise ValueError(f"Unknown column in order_by: {column}")
+    return df.sort_values(
+        by=[column for column, _ in sort],
+        ascending=[ascending for _, ascending in sort],
+        kind="stable",
+    )
+
+
+def page_info(offset: int, returned: int, limit: int) -> Dict[str, Any]:
+    """Pagination fields for a query result; next_offset is None on the last page"""
+
+    return {
+        "offset": offset,
+        "next_offset": offset + returned if limit and returned == limit else None,
+    }
+
+
+def query_parquet(
+    filepath: str,
+    query: Optional[str],
+    limit: int,
+    offset: int,
+    columns: Optional[List[str]],
+    filters: List[tuple],
+    sort: List[tuple],
+    where: Optional[tuple] = None,
+) -> Dict[str, Any]:
+    """Query a Parquet dataset, reading only the needed columns and row groups"""
+
+    dataset = pa_dataset.dataset(filepath, format="parquet")
+    for column in where_columns(where) if where else []:
+        if column not in dataset.schema.names:
+            raise ValueError(f"Unknown column in where expression: {column}")
+    expression = pq.filters_to_expression(filters) if filters else None
+    pushed, residual = split_where(where) if where else (None, None)
+    if pushed:
+        condition = where_arrow(pushed)
+        expression = condition if expression is None else expression & condition
+
+    if query or sort or residual:
+        read_columns = None
+        if columns and not query:
+            read_columns = needed_columns(columns, [], sort, residual)
+        table = dataset.to_table(columns=read_columns, filter=expression)
+        if query or residual:
+            frame = table.to_pandas()
+            mask = np.ones(len(frame), dtype=bool)
+            if residual:
+                mask &= where_mask(frame, residual).fillna(False).to_numpy(dtype=bool)
+            if query:
+                mask &= text_match_mask(frame, query).to_numpy(dtype=bool)
+            table = table.filter(pa.array(mask))
+        if sort:
+            table = table.sort_by(
+                [(column, "ascending" if asc else "descending") for column, asc in sort]
+            )
+        table = table.slice(offset, limit)
+        if columns:
+            table = table.select(list(columns))
+    else:
+        table = dataset.head(offset + limit, columns=columns, filter=expression)
+        table = table.slice(offset, limit)
+
+    return {
+        "columns": table.column_names,
+        "rows": table.num_rows,
+        "data": table.to_pylist(),
+    }
+
+
+def query_csv_stream(
+    filepath: str,
+    query: Optional[str],
+    limit: int,
+    offset: int,
+    cursor: int,
+    columns: Optional[List[str]],
+    filters: List[tuple],
+    sort: List[tuple],
+    where: Optional[tuple] = None,
+) -> pd.DataFrame:
+    """Query a CSV file chunk by chunk, holding at most one chunk in memory"""
+
+    header = pd.read_csv(filepath, nrows=0).columns.tolist()
+    for column in needed_columns(columns or [], filters, sort, where):
+        if column not in header:
+            raise ValueError(f"Unknown column: {column}")
+
+    usecols = None
+    if columns and not query:
+        usecols = needed_columns(columns, filters, sort, where)
+    options = {"chunksize": CONFIG["dataset_chunk_rows"], "usecols": usecols}
+    if cursor:
+        # Skip the header and the rows before the cursor without parsing them
+        options.update(header=None, names=header, skiprows=cursor + 1)
+
+    wanted = offset + limit
+    kept = []
+    kept_rows = 0
+    best = None
+    row = cursor
+    with pd.read_csv(filepath, **options) as reader:
+        for chunk in reader:
+            chunk.index = pd.RangeIndex(row, row + len(chunk))
+            row += len(chunk)
+            matched = apply_where(apply_filters(chunk, filters), where)
+            if query:
+                matched = matched[text_match_mask(matched, query)]
+
+            if sort:
+                if best is not None:
+                    matched = pd.concat([best, matched])
+                best = sort_frame(matched, sort).head(wanted)
+                continue
+
+            kept.append(matched.head(wanted - kept_rows))
+            kept_rows += len(kept[-1])
+            if kept_rows >= wanted:
+                break
+
+    if sort:
+        result = best if best is not None else pd.DataFrame(columns=usecols or header)
+    else:
+        result = pd.concat(kept) if kept else pd.DataFrame(columns=usecols or header)
+    result = result.iloc[offset : offset + limit]
+    if columns:
+        result = result[list(columns)]
+    return result
+
+
+def csv_cursor(df: pd.DataFrame, limit: int, sort: List[tuple]) -> Optional[int]:
+    """Row number to resume after a full, unsorted CSV page, else None"""
+
+    if sort or not limit or len(df) < limit:
+        return None
+    return int(df.index[-1]) + 1
+
+
+# SQLite datasets keep their records in one table plus an optional FTS5 index
+SQLITE_TABLE = "records"
+SQLITE_FTS_TABLE = "records_fts"
+# Hidden INTEGER PRIMARY KEY, so row ids stay stable for the full-text index
+SQLITE_ROW_ID = "_row_id"
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sqlite_value(value: Any) -> Any:
+    """Convert a record value to something SQLite stores natively"""
+
+    if value is None or isinstance(value, (str, int, bytes)):
+        return value
+    if isinstance(value, float):
+        return None if value != value else value
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, ensure_ascii=False, default=str)
+    if isinstance(value, np.generic):
+        return sqlite_value(value.item())
+    return str(value)
+
+
+def sqlite_columns(db: sqlite3.Connection) -> List[str]:
+    """Data columns of a SQLite dataset, without the hidden row id"""
+
+    return [
+        row[1]
+        for row in db.execute(f"PRAGMA table_info({SQLITE_TABLE})")
+        if row[1] != SQLITE_ROW_ID
+    ]
+
+
+def has_fts_index(db: sqlite3.Connection) -> bool:
+    return (
+        db.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (SQLITE_FTS_TABLE,)
+        ).fetchone()
+        is not None
+    )
+
+
+def build_sqlite_indexes(
+    db: sqlite3.Connection,
+    index_columns: Optional[List[str]] = None,
+    fts_columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Create column indexes and (re)build the FTS5 index of a SQLite dataset"""
+
+    columns = sqlite_columns(db)
+    for column in list(index_columns or []) + list(fts_columns or []):
+        if column not in columns:
+            raise ValueError(f"Unknown column: {column}")
+
+    for column in index_columns or []:
+        index_name = quote_identifier(f"{SQLITE_TABLE}_{column}_idx")
+        db.execute(
+            f"CREATE INDEX IF NOT EXISTS {index_name} "
+            f"ON {SQLITE_TABLE} ({quote_identifier(column)})"
+        )
+
+    built_fts = []
+    if fts_columns:
+        for trigger in ("ai", "ad", "au"):
+            db.execute(f"DROP TRIGGER IF EXISTS {SQLITE_TABLE}_{trigger}")
+        db.execute(f"DROP TABLE IF EXISTS {SQLITE_FTS_TABLE}")
+        names = ", ".join(quote_identifier(c) for c in fts_columns)
+        new_values = ", ".join(f"new.{quote_identifier(c)}" for c in fts_columns)
+        old_values = ", ".join(f"old.{quote_identifier(c)}" for c in fts_columns)
+        try:
+            db.execute(
+                f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5({names}, "
+                f"content='{SQLITE_TABLE}', content_rowid='{SQLITE_ROW_ID}')"
+            )
+        except sqlite3.OperationalError:
+            # SQLite compiled without FTS5; text queries fall back to LIKE
+            fts_columns = []
+        else:
+            db.execute(
+                f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES('rebuild')"
+            )
+            db.executescript(
+                f"""
+                CREATE TRIGGER {SQLITE_TABLE}_ai AFTER INSERT ON {SQLITE_TABLE} BEGIN
+                    INSERT INTO {SQLITE_FTS_TABLE}(rowid, {names})
+                    VALUES (new.{SQLITE_ROW_ID}, {new_values});
+                END;
+                CREATE TRIGGER {SQLITE_TABLE}_ad AFTER DELETE ON {SQLITE_TABLE} BEGIN
+                    INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {names})
+                    VALUES ('delete', old.{SQLITE_ROW_ID}, {old_values});
+                END;
+                CREATE TRIGGER {SQLITE_TABLE}_au AFTER UPDATE ON {SQLITE_TABLE} BEGIN
+                    INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {names})
+                    VALUES ('delete', old.{SQLITE_ROW_ID}, {old_values});
+                    INSERT INTO {SQLITE_FTS_TABLE}(rowid, {names})
+                    VALUES (new.{SQLITE_ROW_ID}, {new_values});
+                END;
+                """
+            )
+            built_fts = list(fts_columns)
+
+    return {"indexed_columns": list(index_columns or []), "fts_columns": built_fts}
+
+
+def write_sqlite_dataset(
+    path: str,
+    batches,
+    index_columns: Optional[List[str]] = None,
+    fts_columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Write batches of records into a new SQLite dataset, replacing ``path``"""
+
+    tmp_path = dataset_temp_path(path)
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    db = sqlite3.connect(tmp_path)
+    try:
+        columns: List[str] = []
+        text_columns: Dict[str, None] = {}
+        insert_sql = None
+        records = 0
+        for batch in batches:
+            for column in dict.fromkeys(key for record in batch for key in record):
+                if column in columns:
+                    continue
+                if not columns:
+                    db.execute(
+                        f"CREATE TABLE {SQLITE_TABLE} ("
+                        f"{SQLITE_ROW_ID} INTEGER PRIMARY KEY, {quote_identifier(column)})"
+                    )
+                else:
+                    db.execute(
+                        f"ALTER TABLE {SQLITE_TABLE} ADD COLUMN {quote_identifier(column)}"
+                    )
+                columns.append(column)
+                insert_sql = None
+            if not batch:
+                continue
+            if insert_sql is None:
+                insert_sql = (
+                    f"INSERT INTO {SQLITE_TABLE} "
+                    f"({', '.join(quote_identifier(c) for c in columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})"
+                )
+            for record in batch:
+                for column, value in record.items():
+                    if isinstance(value, str):
+                        text_columns.setdefault(column)
+            db.executemany(
+                insert_sql,
+                ([sqlite_value(record.get(c)) for c in columns] for record in batch),
+            )
+            records += len(batch)
+
+        if not columns:
+            raise ValueError("Cannot create a SQLite dataset without any records")
+        if fts_columns is None:
+            fts_columns = list(text_columns)
+        built = build_sqlite_indexes(db, index_columns, fts_columns)
+        db.commit()
+    finally:
+        db.close()
 
+    os.replace(tmp_path, path)
+    return {"records": records, "columns": columns, **built}
 
-async def automate_browser_task(
-    url: str, actions: List[Dict[str, Any]], headless: bool = True
+
+def merge_sqlite_records(
+    path: str,
+    records: List[Dict[str, Any]],
+    key: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
-    """Perform automated browser tasks"""
+    """Insert records into a SQLite dataset, or upsert them by ``key``"""
+
+    if key:
+        latest: Dict[tuple, Dict[str, Any]] = {}
+        for number, record in enumerate(records):
+            if any(record.get(column) is None for column in key):
+                raise ValueError(f"Record {number} has no value for key {key}")
+            identity = tuple(sqlite_value(record[column]) for column in key)
+            latest[identity] = {**latest.get(identity, {}), **record}
+        records = list(latest.values())
+
+    created = not os.path.exists(path)
+    if created:
+        write_sqlite_dataset(path, [records])
+
+    db = sqlite3.connect(path)
+    try:
+        with db:
+            columns = sqlite_columns(db)
+            for column in dict.fromkeys(k for record in records for k in record):
+                if column not in columns:
+                    db.execute(
+                        f"ALTER TABLE {SQLITE_TABLE} ADD COLUMN {quote_identifier(column)}"
+                    )
+                    columns.append(column)
+
+            if key:
+                index_name = quote_identifier(f"{SQLITE_TABLE}_{'_'.join(key)}_key")
+                key_columns = ", ".join(quote_identifier(c) for c in key)
+                db.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} "
+                    f"ON {SQLITE_TABLE} ({key_columns})"
+                )
+            if created:
+                return {"inserted": len(records), "updated": 0}
+
+            # Records are written grouped by the columns they carry, so an
+            # upsert never touches a column its record left out
+            groups: Dict[tuple, List[Dict[str, Any]]] = {}
+            for record in records:
+                groups.setdefault(tuple(record), []).append(record)
+
+            count_sql = f"SELECT COUNT(*) FROM {SQLITE_TABLE}"
+            before = db.execute(count_sql).fetchone()[0]
+            for group_columns, group in groups.items():
+                sql = (
+                    f"INSERT INTO {SQLITE_TABLE} "
+                    f"({', '.join(quote_identifier(c) for c in group_columns)}) "
+                    f"VALUES ({', '.join('?' * len(group_columns))})"
+                )
+                if key:
+                    updates = [
+                        f"{quote_identifier(c)} = excluded.{quote_identifier(c)}"
+                        for c in group_columns
+                        if c not in key
+                    ]
+                    sql += f" ON CONFLICT ({key_columns}) "
+                    sql += f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+                db.executemany(
+                    sql,
+                    ([sqlite_value(record[c]) for c in group_columns] for record in group),
+                )
+            inserted = db.execute(count_sql).fetchone()[0] - before
+    finally:
+        db.close()
 
-    if not SELENIUM_AVAILABLE:
-        return {"error": "Browser automation requires Selenium package"}
+    return {"inserted": inserted, "updated": len(records) - inserted}
 
-    driver = None
-    try:
-        driver = create_browser_driver(headless=headless)
-        driver.get(url)
 
-        results = {
-            "url": url,
-            "actions_performed": [],
-            "final_url": url,
-            "page_title": "",
-            "status": "success",
-        }
+def fts_phrase(query: str) -> str:
+    """Quote a text query as an FTS5 phrase whose last word may be a prefix"""
 
-        for action in actions:
-            action_type = action.get("type", "")
+    return '"' + query.replace('"', '""') + '" *'
 
-            if action_type == "click":
-                selector = action.get("selector", "")
-                element = driver.find_element(By.CSS_SELECTOR, selector)
-                element.click()
-                results["actions_performed"].append(f"Clicked: {selector}")
 
-            elif action_type == "input":
-                selector = action.get("selector", "")
-                text = action.get("text", "")
-                element = driver.find_element(By.CSS_SELECTOR, selector)
-                element.clear()
-                element.send_keys(text)
-                results["actions_performed"].append(
-                    f"Input text '{text}' to: {selector}"
+def query_sqlite(
+    filepath: str,
+    query: Optional[str],
+    limit: int,
+    offset: int,
+    columns: Optional[List[str]],
+    filters: List[tuple],
+    sort: List[tuple],
+    where: Optional[tuple] = None,
+) -> Dict[str, Any]:
+    """Query a SQLite dataset with a single parameterized SELECT"""
+
+    db = sqlite3.connect(f"file:{filepath}?mode=ro", uri=True)
+    try:
+        table_columns = sqlite_columns(db)
+        for column in needed_columns(columns or [], filters, sort, where):
+            if column not in table_columns:
+                raise ValueError(f"Unknown column: {column}")
+
+        selected = list(columns) if columns else table_columns
+        conditions = []
+        params: List[Any] = []
+        for column, op, value in filters:
+            if op in ("in", "not in"):
+                placeholders = ", ".join("?" * len(value))
+                conditions.append(f"{quote_identifier(column)} {op.upper()} ({placeholders})")
+                params.extend(sqlite_value(v) for v in value)
+            else:
+                sql_op = "=" if op == "==" else op
+                conditions.append(f"{quote_identifier(column)} {sql_op} ?")
+                params.append(sqlite_value(value))
+        if where:
+            db.create_function("regexp", 2, sqlite_regexp, deterministic=True)
+            condition, condition_params = where_sql(where)
+            conditions.append(condition)
+            params.extend(condition_params)
+
+        if query and has_fts_index(db):
+            conditions.append(
+                f"{SQLITE_ROW_ID} IN (SELECT rowid FROM {SQLITE_FTS_TABLE} "
+                f"WHERE {SQLITE_FTS_TABLE} MATCH ?)"
+            )
+            params.append(fts_phrase(query))
+        elif query:
+            pattern = "%" + re.sub(r"([%_\\])", r"\\\1", query) + "%"
+            conditions.append(
+                "("
+                + " OR ".join(
+                    f"CAST({quote_identifier(c)} AS TEXT) LIKE ? ESCAPE '\\'"
+                    for c in table_columns
                 )
+                + ")"
+            )
+            params.extend([pattern] * len(table_columns))
+
+        sql = f"SELECT {', '.join(quote_identifier(c) for c in selected)} FROM {SQLITE_TABLE}"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if sort:
+            sql += " ORDER BY " + ", ".join(
+                f"{quote_identifier(c)} {'ASC' if asc else 'DESC'}" for c, asc in sort
+            )
+        else:
+            sql += f" ORDER BY {SQLITE_ROW_ID}"
+        sql += " LIMIT ? OFFSET ?"
 
-            elif action_type == "wait":
-                seconds = action.get("seconds", 1)
-                time.sleep(seconds)
-                results["actions_performed"].append(f"Waited: {seconds} seconds")
+        rows = db.execute(sql, params + [limit, offset]).fetchall()
+    finally:
+        db.close()
 
-            elif action_type == "scroll":
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                results["actions_performed"].append("Scrolled to bottom")
+    return {
+        "columns": selected,
+        "rows": len(rows),
+        "data": [dict(zip(selected, row)) for row in rows],
+    }
 
-            elif action_type == "screenshot":
-                screenshot_path = action.get("path", "screenshot.png")
-                driver.save_screenshot(screenshot_path)
-                results["actions_performed"].append(
-                    f"Screenshot saved: {screenshot_path}"
-                )
 
-            elif action_type == "extract_text":
-                selector = action.get("selector", "body")
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                extracted_text = [elem.text for elem in elements]
-                results["extracted_text"] = extracted_text
-                results["actions_performed"].append(f"Extracted text from: {selector}")
+def iter_dataset_batches(filepath: str):
+    """Yield the records of a CSV, JSON, JSON Lines or Parquet dataset in batches"""
+
+    format_type, compression = dataset_format(filepath)
+    file_ext = f".{format_type}"
+    chunk_rows = CONFIG["dataset_chunk_rows"]
+
+    if compression is not None and file_ext != ".jsonl":
+        raise ValueError(f"Compressed {format_type} datasets are not supported")
+
+    if file_ext == ".jsonl":
+        for _, records in iter_jsonl_batches(filepath, compression):
+            if not all(isinstance(record, dict) for record in records):
+                raise ValueError("Only JSON Lines datasets of objects can be indexed")
+            yield records
+    elif file_ext == ".csv":
+        for chunk in pd.read_csv(filepath, chunksize=chunk_rows):
+            yield chunk.to_dict("records")
+    elif file_ext == ".parquet":
+        if not PYARROW_AVAILABLE:
+            raise ValueError("Parquet datasets require the pyarrow package")
+        for batch in pq.ParquetFile(filepath).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pylist()
+    elif file_ext == ".json":
+        with open(filepath, "r") as f:
+            data = json.load(f)
+        if not isinstance(data, list) or not all(isinstance(r, dict) for r in data):
+            raise ValueError("Only JSON datasets holding a list of objects can be indexed")
+        for start in range(0, len(data), chunk_rows):
+            yield data[start : start + chunk_rows]
+    else:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+
+
+def index_dataset(
+    name: str,
+    index_columns: List[str] = None,
+    fts_columns: List[str] = None,
+) -> Dict[str, Any]:
+    """Build a queryable SQLite copy of a dataset, or add indexes to one"""
 
-        results["final_url"] = driver.current_url
-        results["page_title"] = driver.title
+    try:
+        filepath = os.path.join(CONFIG["datasets_dir"], name)
+        if not os.path.exists(filepath):
+            return {"status": "error", "error": "Dataset not found"}
 
-        return results
+        format_type, compression = dataset_format(name)
+        stem = os.path.splitext(name)[0]
+        if compression is not None:
+            stem = os.path.splitext(stem)[0]
+        if format_type == "sqlite":
+            with dataset_lock(filepath):
+                db = sqlite3.connect(filepath)
+                try:
+                    built = build_sqlite_indexes(db, index_columns, fts_columns)
+                    db.commit()
+                    records = db.execute(
+                        f"SELECT COUNT(*) FROM {SQLITE_TABLE}"
+                    ).fetchone()[0]
+                finally:
+                    db.close()
+            return {"status": "success", "name": name, "records": records, **built}
+
+        target = f"{stem}.sqlite"
+        target_path = os.path.join(CONFIG["datasets_dir"], target)
+        with dataset_lock(target_path):
+            written = write_sqlite_dataset(
+                target_path,
+                iter_dataset_batches(filepath),
+                index_columns,
+                fts_columns,
+            )
+        return {"status": "success", "name": target, "source": name, **written}
 
     except Exception as e:
-        return {"url": url, "status": "error", "error": str(e)}
-    finally:
-        if driver:
-            driver.quit()
+        return {"status": "error", "error": str(e)}
 
 
-# === DATASET FUNCTIONS ===
+def record_contains(record: Any, needle: str) -> bool:
+    """Whether any value of a record contains ``needle`` (already lowercased)"""
 
+    if isinstance(record, dict):
+        return any(needle in str(value).lower() for value in record.values())
+    return needle in str(record).lower()
 
-def list_datasets() -> List[Dict[str, Any]]:
-    """List available datasets"""
 
-    datasets = []
-    datasets_dir = CONFIG["datasets_dir"]
+def record_frame(records: List[Dict[str, Any]], columns: List[str]) -> pd.DataFrame:
+    """DataFrame of schemaless records; keys a record lacks read as null"""
 
-    for filename in os.listdir(datasets_dir):
-        filepath = os.path.join(datasets_dir, filename)
-        if os.path.isfile(filepath):
-            file_ext = os.path.splitext(filename)[1].lower()
-            file_size = os.path.getsize(filepath)
+    frame = pd.DataFrame(records)
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        frame = frame.reindex(columns=list(frame.columns) + missing)
+    return frame
 
-            datasets.append(
-                {
-                    "name": filename,
-                    "path": filepath,
-                    "type": file_ext,
-                    "size_bytes": file_size,
-                    "size_mb": round(file_size / (1024 * 1024), 2),
-                }
-            )
 
-    return datasets
+def match_records(
+    records: List[Any],
+    query: Optional[str],
+    filters: List[tuple],
+    where: Optional[tuple],
+) -> List[int]:
+    """Indexes of the JSON records that pass the filters, where and text query"""
 
+    indexes = list(range(len(records)))
+    if filters or where:
+        objects = [i for i in indexes if isinstance(records[i], dict)]
+        frame = record_frame(
+            [records[i] for i in objects], needed_columns([], filters, [], where)
+        )
+        matched = apply_where(apply_filters(frame, filters), where)
+        indexes = [objects[i] for i in matched.index]
+    if query:
+        needle = query.lower()
+        indexes = [i for i in indexes if record_contains(records[i], needle)]
+    return indexes
 
-def create_dataset(
-    name: str, data: List[Dict[str, Any]], format_type: str = "csv"
-) -> Dict[str, Any]:
-    """Create a new dataset"""
 
-    try:
-        filepath = os.path.join(CONFIG["datasets_dir"], f"{name}.{format_type}")
-
-        if format_type.lower() == "csv":
-            df = pd.DataFrame(data)
-            df.to_csv(filepath, index=False)
-        elif format_type.lower() == "json":
-            with open(filepath, "w") as f:
-                json.dump(data, f, indent=2)
-        else:
-            raise ValueError(f"Unsupported format: {format_type}")
+def sort_records(records: List[Any], sort: List[tuple]) -> List[Dict[str, Any]]:
+    """Object records ordered by ``sort``; other records are dropped"""
 
-        return {
-            "status": "success",
-            "name": name,
-            "path": filepath,
-            "format": format_type,
-            "records": len(data),
-        }
+    objects = [record for record in records if isinstance(record, dict)]
+    if not sort or not objects:
+        return objects
+    frame = record_frame(objects, [column for column, _ in sort])
+    return [objects[i] for i in sort_frame(frame, sort).index]
 
-    except Exception as e:
-        return {"status": "error", "error": str(e)}
+
+def project_records(records: List[Any], columns: Optional[List[str]]) -> List[Any]:
+    if not columns:
+        return records
+    return [
+        {key: record.get(key) for key in columns}
+        for record in records
+        if isinstance(record, dict)
+    ]
 
 
-def query_dataset(name: str, query: str = None, limit: int = 100) -> Dict[str, Any]:
-    """Query a dataset"""
+def query_jsonl(
+    filepath: str,
+    compression: Optional[str],
+    query: Optional[str],
+    limit: int,
+    offset: int,
+    cursor: int,
+    columns: Optional[List[str]],
+    filters: List[tuple],
+    sort: List[tuple],
+    where: Optional[tuple] = None,
+) -> Dict[str, Any]:
+    """Query a JSON Lines dataset batch by batch, without loading it whole"""
+
+    wanted = offset + limit
+    kept: List[tuple] = []
+    best: List[Dict[str, Any]] = []
+    for numbers, records in iter_jsonl_batches(filepath, compression, cursor):
+        indexes = match_records(records, query, filters, where)
+        if sort:
+            best = sort_records(best + [records[i] for i in indexes], sort)[:wanted]
+            continue
+        kept.extend((numbers[i], records[i]) for i in indexes[: wanted - len(kept)])
+        if len(kept) >= wanted:
+            break
+
+    next_cursor = None
+    if sort:
+        page = best[offset : offset + limit]
+    else:
+        lines = kept[offset : offset + limit]
+        page = [record for _, record in lines]
+        if limit and len(lines) == limit:
+            next_cursor = lines[-1][0] + 1
+
+    page = project_records(page, columns)
+    return {"rows": len(page), "data": page, "next_cursor": next_cursor}
+
+
+def query_dataset(
+    name: str,
+    query: str = None,
+    limit: int = 100,
+    columns: List[str] = None,
+    filters: List[Any] = None,
+    order_by: List[str] = None,
+    offset: int = 0,
+    cursor: int = None,
+    where: str = None,
+) -> Dict[str, Any]:
+    """Query a dataset with filters, a where expression, text search and pagination"""
 
     try:
         filepath = os.path.join(CONFIG["datasets_dir"], name)
         if not os.path.exists(filepath):
             return {"status": "error", "error": "Dataset not found"}
 
-        file_ext = os.path.splitext(name)[1].lower()
+        format_type, compression = dataset_format(name)
+        file_ext = f".{format_type}"
+        if compression is not None and file_ext != ".jsonl":
+            return {"status": "error", "error": "Unsupported file format"}
+        filters = validate_filters(filters)
+        sort = parse_order_by(order_by)
+        where_tree = parse_where(where) if where else None
+        offset = max(0, offset or 0)
 
         if file_ext == ".csv":
-            df = pd.read_csv(filepath)
-
-            # Apply simple filtering if query provided
-            if query:
-                # Simple text search across all columns
-                mask = (
-                    df.astype(str)
-                    .apply(lambda x: x.str.contains(query, case=False, na=False))
-                    .any(axis=1)
+            cursor = max(0, cursor or 0)
+            if os.path.getsize(filepath) >= CONFIG["dataset_stream_min_bytes"]:
+                df = query_csv_stream(
+                    filepath, query, limit, offset, cursor, columns, filters, sort, where_tree
                 )
-                df = df[mask]
-
-            # Limit results
-            df = df.head(limit)
+            else:
+                usecols = None
+                if columns and not query:
+                    usecols = needed_columns(columns, filters, sort, where_tree)
+                df = load_csv(filepath, usecols)
+                if cursor:
+                    df = df.iloc[cursor:]
+                df = apply_where(apply_filters(df, filters), where_tree)
+
+                # Apply simple filtering if query provided
+                if query:
+                    # Simple text search across all columns
+                    df = df[text_match_mask(df, query)]
+
+                df = sort_frame(df, sort)
+                # Limit results
+                df = df.iloc[offset : offset + limit]
+                if columns:
+                    df = df[list(columns)]
 
             return {
                 "status": "success",
@@ -680,29 +4378,76 @@ def query_dataset(name: str, query: str = None, limit: int = 100) -> Dict[str, A
                 "columns": df.columns.tolist(),
                 "rows": len(df),
                 "data": df.to_dict("records"),
+                **page_info(offset, len(df), limit),
+                "next_cursor": csv_cursor(df, limit, sort),
+            }
+
+        elif file_ext == ".parquet":
+            if not PYARROW_AVAILABLE:
+                return {
+                    "status": "error",
+                    "error": "Parquet datasets require the pyarrow package",
+                }
+            result = query_parquet(
+                filepath, query, limit, offset, columns, filters, sort, where_tree
+            )
+            return {
+                "status": "success",
+                "name": name,
+                "type": "parquet",
+                **result,
+                **page_info(offset, result["rows"], limit),
+            }
+
+        elif file_ext == ".sqlite":
+            result = query_sqlite(
+                filepath, query, limit, offset, columns, filters, sort, where_tree
+            )
+            return {
+                "status": "success",
+                "name": name,
+                "type": "sqlite",
+                **result,
+                **page_info(offset, result["rows"], limit),
+            }
+
+        elif file_ext == ".jsonl":
+            result = query_jsonl(
+                filepath,
+                compression,
+                query,
+                limit,
+                offset,
+                max(0, cursor or 0),
+                columns,
+                filters,
+                sort,
+                where_tree,
+            )
+            return {
+                "status": "success",
+                "name": name,
+                "type": "jsonl",
+                **result,
+                **page_info(offset, result["rows"], limit),
             }
 
         elif file_ext == ".json":
             with open(filepath, "r") as f:
                 data = json.load(f)
 
-            # Simple filtering for JSON
-            if query and isinstance(data, list):
-                filtered_data = []
-                for item in data:
-                    if isinstance(item, dict):
-                        if any(
-                            query.lower() in str(value).lower()
-                            for value in item.values()
-                        ):
-                            filtered_data.append(item)
-                    elif query.lower() in str(item).lower():
-                        filtered_data.append(item)
-                data = filtered_data
-
-            # Limit results
             if isinstance(data, list):
-                data = data[:limit]
+                data = [data[i] for i in match_records(data, query, filters, where_tree)]
+                if sort:
+                    data = sort_records(data, sort)
+                data = project_records(data[offset : offset + limit], columns)
+                return {
+                    "status": "success",
+                    "name": name,
+                    "type": "json",
+                    "data": data,
+                    **page_info(offset, len(data), limit),
+                }
 
             return {"status": "success", "name": name, "type": "json", "data": data}
 
@@ -713,9 +4458,134 @@ def query_dataset(name: str, query: str = None, limit: int = 100) -> Dict[str, A
         return {"status": "error", "error": str(e)}
 
 
+# === SERVER STATUS FUNCTIONS ===
+
+
+def get_server_status() -> Dict[str, Any]:
+    """Collect cache statistics and other runtime health information"""
+
+    cache = get_response_cache()
+    return {
+        "http_cache": cache.stats() if cache is not None else {"enabled": False},
+        "serp_cache": serp_cache.stats(),
+        "host_health": host_breaker.status(),
+        "browser_pool": browser_pool.stats(),
+        "fetch_tiers": render_decisions.stats(),
+        "dataset_cache": dataset_cache.stats(),
+    }
+
+
 # === MCP SERVER TOOL DEFINITIONS ===
 
 
+# Shared by the single and batch browser automation tools
+BROWSER_ACTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "type": {
+            "type": "string",
+            "enum": [
+                "click",
+                "input",
+                "wait",
+                "wait_for_selector",
+                "wait_for_clickable",
+                "wait_for_network_idle",
+                "wait_for_url_change",
+                "wait_for_text",
+                "scroll",
+                "screenshot",
+                "extract_text",
+            ],
+            "description": "Type of action to perform. Prefer wait_for_* actions over fixed waits: they finish as soon as the page is ready.",
+        },
+        "selector": {
+            "type": "string",
+            "description": "CSS selector for click/input/extract_text/wait_for_selector/wait_for_clickable/wait_for_text actions",
+        },
+        "text": {
+            "type": "string",
+            "description": "Text to input (for input actions) or to wait for (for wait_for_text)",
+        },
+        "seconds": {
+            "type": "number",
+            "description": "Seconds to wait (for wait actions)",
+        },
+        "timeout": {
+            "type": "number",
+            "description": "Maximum seconds to wait (for wait_for_* actions, default: 10)",
+        },
+        "state": {
+            "type": "string",
+            "enum": ["visible", "present"],
+            "description": "Element state to wait for (for wait_for_selector, default: visible)",
+        },
+        "contains": {
+            "type": "string",
+            "description": "Substring the new URL must contain (for wait_for_url_change)",
+        },
+        "idle_ms": {
+            "type": "integer",
+            "description": "Milliseconds without new network requests (for wait_for_network_idle, default: 500)",
+        },
+        "path": {
+            "type": "string",
+            "description": "File path for screenshot (for screenshot actions)",
+        },
+    },
+}
+
+LOAD_PROFILE_SCHEMA = {
+    "description": "What the browser loads: a preset name ('full', 'lightweight', 'text_only') or an object with optional 'preset', 'block_images', 'block_media', 'block_fonts', 'blocked_domains', 'page_load_strategy' (normal/eager/none), 'disable_extensions' and 'disable_javascript'. Use 'lightweight' for text extraction (default: full)",
+    "anyOf": [
+        {"type": "string"},
+        {
+            "type": "object",
+            "properties": {
+                "preset": {"type": "string"},
+                "block_images": {"type": "boolean"},
+                "block_media": {"type": "boolean"},
+                "block_fonts": {"type": "boolean"},
+                "blocked_domains": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                },
+                "page_load_strategy": {
+                    "type": "string",
+                    "enum": ["normal", "eager", "none"],
+                },
+                "disable_extensions": {"type": "boolean"},
+                "disable_javascript": {"type": "boolean"},
+            },
+        },
+    ],
+}
+
+SINK_SCHEMA = {
+    "description": "Write the results into a dataset on the server instead of returning them; only a summary comes back. A dataset name, or an object with 'name' and optional 'format' (jsonl, sqlite, csv, json, parquet; default jsonl), 'compression', 'mode' (append, overwrite, upsert; default append) and 'key', as for create_dataset",
+    "anyOf": [
+        {"type": "string"},
+        {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string"},
+                "format": {
+                    "type": "string",
+                    "enum": ["csv", "json", "jsonl", "parquet", "sqlite"],
+                },
+                "compression": {"type": "string", "enum": ["gzip", "zstd"]},
+                "mode": {
+                    "type": "string",
+                    "enum": ["overwrite", "append", "upsert"],
+                },
+                "key": {"type": "array", "items": {"type": "string"}},
+            },
+            "required": ["name"],
+        },
+    ],
+}
+
+
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     """List available tools"""
@@ -738,7 +4608,7 @@ async def handle_list_tools() -> list[types.Tool]:
                     },
                     "bypass_cloudflare": {
                         "type": "boolean",
-                        "description": "Whether to attempt Cloudflare bypass (default: false)",
+                        "description": "Render the page in a headless browser right away instead of trying plain HTTP first; useful for Cloudflare-protected sites (default: false)",
                         "default": False,
                     },
                 },
@@ -762,6 +4632,17 @@ async def handle_list_tools() -> list[types.Tool]:
                         "description": "Whether to extract clean text content (default: true)",
                         "default": True,
                     },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": "Maximum number of URLs fetched at the same time (default: 10)",
+                        "default": 10,
+                    },
+                    "render_fallback": {
+                        "type": "boolean",
+                        "description": "Render pages whose static HTML has too little text or is a bot challenge in a headless browser; slow, since browsers are few (default: false)",
+                        "default": False,
+                    },
+                    "sink": SINK_SCHEMA,
                 },
                 "required": ["urls"],
             },
@@ -787,6 +4668,12 @@ async def handle_list_tools() -> list[types.Tool]:
                         "description": "Whether to extract content from top results (default: false)",
                         "default": False,
                     },
+                    "time_budget": {
+                        "type": "number",
+                        "description": "Maximum seconds to spend extracting content (default: 20)",
+                        "default": 20,
+                    },
+                    "sink": SINK_SCHEMA,
                 },
                 "required": ["query"],
             },
@@ -805,49 +4692,60 @@ async def handle_list_tools() -> list[types.Tool]:
                     "actions": {
                         "type": "array",
                         "description": "List of actions to perform",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "type": {
-                                    "type": "string",
-                                    "enum": [
-                                        "click",
-                                        "input",
-                                        "wait",
-                                        "scroll",
-                                        "screenshot",
-                                        "extract_text",
-                                    ],
-                                    "description": "Type of action to perform",
-                                },
-                                "selector": {
-                                    "type": "string",
-                                    "description": "CSS selector for click/input/extract_text actions",
-                                },
-                                "text": {
-                                    "type": "string",
-                                    "description": "Text to input (for input actions)",
-                                },
-                                "seconds": {
-                                    "type": "number",
-                                    "description": "Seconds to wait (for wait actions)",
-                                },
-                                "path": {
-                                    "type": "string",
-                                    "description": "File path for screenshot (for screenshot actions)",
-                                },
-                            },
-                        },
+                        "items": BROWSER_ACTION_SCHEMA,
                     },
                     "headless": {
                         "type": "boolean",
                         "description": "Whether to run browser in headless mode (default: true)",
                         "default": True,
                     },
+                    "timeout": {
+                        "type": "number",
+                        "description": "Maximum seconds for the whole browser session (default: 120)",
+                        "default": 120,
+                    },
+                    "load_profile": LOAD_PROFILE_SCHEMA,
                 },
                 "required": ["url", "actions"],
             },
         ),
+        types.Tool(
+            name="batch_browser_automation",
+            description="Run the same browser action script against many URLs in parallel on pooled Chrome sessions. Returns per-URL results in input order and streams each URL's result (with truncated extracted text) as a progress notification when it finishes.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "urls": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "URLs to run the action script on",
+                    },
+                    "actions": {
+                        "type": "array",
+                        "description": "Actions to perform on every URL; screenshot paths get the URL's index appended",
+                        "items": BROWSER_ACTION_SCHEMA,
+                    },
+                    "headless": {
+                        "type": "boolean",
+                        "description": "Whether to run browser in headless mode (default: true)",
+                        "default": True,
+                    },
+                    "max_concurrency": {
+                        "type": "integer",
+                        "description": "Maximum number of browser sessions at once, capped by the browser pool size (default: pool size)",
+                        "minimum": 1,
+                    },
+                    "timeout": {
+                        "type": "number",
+                        "description": "Maximum seconds for each URL's session (default: 120)",
+                        "default": 120,
+                    },
+                    "load_profile": LOAD_PROFILE_SCHEMA,
+                    "sink": SINK_SCHEMA,
+                },
+                "required": ["urls", "actions"],
+            },
+        ),
         # Dataset Management
         types.Tool(
             name="list_datasets",
@@ -859,7 +4757,7 @@ async def handle_list_tools() -> list[types.Tool]:
         ),
         types.Tool(
             name="create_dataset",
-            description="Create a new dataset from provided data.",
+            description="Create a new dataset from provided data, or append or upsert records into an existing one.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -874,10 +4772,26 @@ async def handle_list_tools() -> list[types.Tool]:
                     },
                     "format": {
                         "type": "string",
-                        "enum": ["csv", "json"],
-                        "description": "Format to save the dataset (default: csv)",
+                        "enum": ["csv", "json", "jsonl", "parquet", "sqlite"],
+                        "description": "Format to save the dataset; parquet (needs pyarrow) is compressed and columnar, so queries read only the columns and row groups they need; sqlite gets a full-text index and supports indexed queries; jsonl (JSON Lines) is streamed when queried and can be compressed (default: csv)",
                         "default": "csv",
                     },
+                    "compression": {
+                        "type": "string",
+                        "enum": ["gzip", "zstd"],
+                        "description": "Compress a jsonl dataset, saved as .jsonl.gz or .jsonl.zst (zstd needs the zstandard package)",
+                    },
+                    "mode": {
+                        "type": "string",
+                        "enum": ["overwrite", "append", "upsert"],
+                        "description": "overwrite replaces the dataset; append adds only these records to a csv, jsonl or sqlite dataset (creating it if missing); upsert inserts into a sqlite dataset or replaces the rows with the same key (default: overwrite)",
+                        "default": "overwrite",
+                    },
+                    "key": {
+                        "type": "array",
+                        "description": "Columns identifying a record for upsert mode, e.g. [\"url\"]",
+                        "items": {"type": "string"},
+                    },
                 },
                 "required": ["name", "data"],
             },
@@ -901,10 +4815,77 @@ async def handle_list_tools() -> list[types.Tool]:
                         "description": "Maximum number of records to return (default: 100)",
                         "default": 100,
                     },
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Columns to return (default: all)",
+                    },
+                    "filters": {
+                        "type": "array",
+                        "description": "Conditions that must all hold, each [column, operator, value] with operator one of ==, !=, <, <=, >, >=, in, not in (value is a list for in/not in)",
+                        "items": {
+                            "type": "array",
+                            "minItems": 3,
+                            "maxItems": 3,
+                        },
+                    },
+                    "where": {
+                        "type": "string",
+                        "description": "Filter expression evaluated column-wise, e.g. 'status == \"success\" and 500 <= words < 5000 and not matches(url, \"/tag/\")'. Supports ==, !=, <, <=, >, >= (chained for ranges), in / not in [list], and, or, not, and the functions contains, icontains, startswith, endswith, matches (regex search in Python re syntax, identical on every format), isnull, notnull. Use col(\"name\") for column names that are not identifiers",
+                    },
+                    "order_by": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Columns to sort by; prefix a column with '-' for descending order",
+                    },
+                    "offset": {
+                        "type": "integer",
+                        "description": "Number of matching records to skip, for pagination; results include next_offset for the following page (default: 0)",
+                        "default": 0,
+                        "minimum": 0,
+                    },
+                    "cursor": {
+                        "type": "integer",
+                        "description": "CSV and JSON Lines only: resume after the previous page by passing its next_cursor; unlike offset, earlier rows are not scanned again",
+                        "minimum": 0,
+                    },
+                },
+                "required": ["name"],
+            },
+        ),
+        types.Tool(
+            name="index_dataset",
+            description="Build an indexed SQLite copy of a CSV, JSON, JSON Lines (.jsonl, optionally .gz or .zst compressed) or Parquet dataset (or add indexes to a SQLite dataset) so query_dataset can answer filters, ordering and text search on large datasets in milliseconds.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "name": {
+                        "type": "string",
+                        "description": "Name of the dataset file (including extension); the copy is saved as <name>.sqlite",
+                    },
+                    "index_columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Columns to create B-tree indexes on, for fast filters and ordering",
+                    },
+                    "fts_columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Columns to include in the full-text index used by text queries (default: all text columns when building a copy)",
+                    },
                 },
                 "required": ["name"],
             },
         ),
+        # Server Status
+        types.Tool(
+            name="server_status",
+            description="Report cache hit/miss statistics, per-host health (circuit breaker state) and other runtime information for the server.",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+            },
+        ),
     ]
 
 
@@ -926,24 +4907,51 @@ async def handle_call_tool(
         elif name == "batch_url_extract":
             urls = arguments.get("urls", [])
             extract_text = arguments.get("extract_text", True)
+            max_concurrency = arguments.get("max_concurrency")
+            sink = arguments.get("sink")
+            render_fallback = arguments.get("render_fallback", False)
 
-            result = await batch_url_extract(urls, extract_text)
+            result = await batch_url_extract(
+                urls, extract_text, max_concurrency, sink, render_fallback
+            )
             response = json.dumps(result, indent=2, ensure_ascii=False)
 
         elif name == "web_search":
             query = arguments.get("query", "")
             num_results = arguments.get("num_results", 10)
             extract_content = arguments.get("extract_content", False)
+            time_budget = arguments.get("time_budget")
+            sink = arguments.get("sink")
 
-            result = await search_and_extract(query, num_results, extract_content)
+            result = await search_and_extract(
+                query, num_results, extract_content, time_budget, sink
+            )
             response = json.dumps(result, indent=2, ensure_ascii=False)
 
         elif name == "browser_automation":
             url = arguments.get("url", "")
             actions = arguments.get("actions", [])
             headless = arguments.get("headless", True)
+            timeout = arguments.get("timeout")
+            load_profile = arguments.get("load_profile")
+
+            result = await automate_browser_task(
+                url, actions, headless, timeout, load_profile
+            )
+            response = json.dumps(result, indent=2, ensure_ascii=False)
+
+        elif name == "batch_browser_automation":
+            urls = arguments.get("urls", [])
+            actions = arguments.get("actions", [])
+            headless = arguments.get("headless", True)
+            max_concurrency = arguments.get("max_concurrency")
+            timeout = arguments.get("timeout")
+            load_profile = arguments.get("load_profile")
+            sink = arguments.get("sink")
 
-            result = await automate_browser_task(url, actions, headless)
+            result = await batch_browser_automation(
+                urls, actions, headless, max_concurrency, timeout, load_profile, sink
+            )
             response = json.dumps(result, indent=2, ensure_ascii=False)
 
         elif name == "list_datasets":
@@ -954,16 +4962,50 @@ async def handle_call_tool(
             name_arg = arguments.get("name", "")
             data = arguments.get("data", [])
             format_type = arguments.get("format", "csv")
+            compression = arguments.get("compression")
+            mode = arguments.get("mode", "overwrite")
+            key = arguments.get("key")
 
-            result = create_dataset(name_arg, data, format_type)
+            result = await run_blocking(
+                create_dataset, name_arg, data, format_type, compression, mode, key
+            )
             response = json.dumps(result, indent=2, ensure_ascii=False)
 
         elif name == "query_dataset":
             name_arg = arguments.get("name", "")
             query = arguments.get("query", "")
             limit = arguments.get("limit", 100)
+            columns = arguments.get("columns")
+            filters = arguments.get("filters")
+            order_by = arguments.get("order_by")
+            offset = arguments.get("offset", 0)
+            cursor = arguments.get("cursor")
+            where = arguments.get("where")
+
+            result = await run_blocking(
+                query_dataset,
+                name_arg,
+                query,
+                limit,
+                columns,
+                filters,
+                order_by,
+                offset,
+                cursor,
+                where,
+            )
+            response = json.dumps(result, indent=2, ensure_ascii=False)
+
+        elif name == "index_dataset":
+            name_arg = arguments.get("name", "")
+            index_columns = arguments.get("index_columns")
+            fts_columns = arguments.get("fts_columns")
+
+            result = await run_blocking(index_dataset, name_arg, index_columns, fts_columns)
+            response = json.dumps(result, indent=2, ensure_ascii=False)
 
-            result = query_dataset(name_arg, query, limit)
+        elif name == "server_status":
+            result = get_server_status()
             response = json.dumps(result, indent=2, ensure_ascii=False)
 
         else:
@@ -978,19 +5020,29 @@ async def handle_call_tool(
 
 async def main():
     """Main entry point"""
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="Pure Enhanced MCP Server",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    try:
+        warm_parse_executor()
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="Pure Enhanced MCP Server",
+                    server_version="0.1.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        await close_http_client()
+        shutdown_parse_executor()
+        browser_pool.shutdown()
+        if _browser_executor is not None:
+            _browser_executor.shutdown(wait=False, cancel_futures=True)
+        if _response_cache is not None:
+            _response_cache.close()
 
 
 if __name__ == "__main__":
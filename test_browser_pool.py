@@ -0,0 +1,685 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the browser pool and browser automation tools.
+
+A stub WebDriver stands in for Chrome, so no browser needs to be installed.
+Run with ``python test_browser_pool.py`` or ``python -m pytest test_browser_pool.py``.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import enhanced_server_pure as server_module
+from enhanced_server_pure import (
+    BrowserPool,
+    RenderDecisionCache,
+    automate_browser_task,
+    batch_browser_automation,
+    close_http_client,
+    blocked_url_patterns,
+    build_chrome_options,
+    resolve_load_profile,
+)
+from selenium.common.exceptions import NoSuchElementException
+from benchmarks.stub_server import StubServer, send_response
+
+
+class StubElement:
+    text = "Ready"
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+
+class StubDriver:
+    """Minimal stand-in for a Selenium WebDriver"""
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self.cookies = {"session": "abc"}
+        self.current_url = "about:blank"
+        self.title = ""
+        self.page_source = "<html><body></body></html>"
+        self.quit_called = False
+        self.crashed = False
+        self.scripts = []
+        self.created_at = time.monotonic()
+        self.element_appears_after = 0.0
+        self.resource_counts = []
+        self.inflight_requests = []
+
+    def __getattribute__(self, name):
+        if name == "current_url" and object.__getattribute__(self, "crashed"):
+            raise RuntimeError("chrome not reachable")
+        return object.__getattribute__(self, name)
+
+    def get(self, url):
+        if self.crashed:
+            raise RuntimeError("chrome not reachable")
+        self.current_url = url
+
+    def execute_script(self, script, *args):
+        if self.crashed:
+            raise RuntimeError("chrome not reachable")
+        self.scripts.append(script)
+        if "performance.getEntriesByType" in script:
+            count = self.resource_counts.pop(0) if self.resource_counts else 10
+            inflight = self.inflight_requests.pop(0) if self.inflight_requests else 0
+            return ["complete", count, inflight]
+        return None
+
+    def find_element(self, by, selector):
+        if time.monotonic() - self.created_at < self.element_appears_after:
+            raise NoSuchElementException(selector)
+        return StubElement()
+
+    def delete_all_cookies(self):
+        self.cookies.clear()
+
+    def find_elements(self, by, selector):
+        return [StubElement()]
+
+    def save_screenshot(self, path):
+        self.scripts.append(f"screenshot:{path}")
+
+    def quit(self):
+        self.quit_called = True
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def factory(headless, profile=None):
+        driver = StubDriver(headless)
+        driver.profile = profile
+        created.append(driver)
+        return driver
+
+    options = {"size": 2, "max_uses": 50, "idle_timeout": 300, **kwargs}
+    return BrowserPool(driver_factory=factory, **options), created
+
+
+def test_reuses_and_resets_drivers():
+    """A returned driver is wiped and handed out again instead of relaunching"""
+
+    pool, created = make_pool()
+    entry = pool.checkout()
+    entry["driver"].get("https://example.com")
+    pool.checkin(entry)
+
+    again = pool.checkout()
+    assert again["driver"] is created[0]
+    assert len(created) == 1
+    assert again["driver"].cookies == {}
+    assert again["driver"].current_url == "about:blank"
+    assert any("localStorage.clear" in script for script in again["driver"].scripts)
+    pool.checkin(again)
+    assert pool.stats()["reused"] == 1
+
+
+def test_reset_clears_storage_of_every_visited_origin():
+    """Storage is wiped for origins the session left, not just the open page"""
+
+    class CdpStubDriver(StubDriver):
+        def __init__(self, headless=True):
+            super().__init__(headless)
+            self.cdp_commands = []
+
+        def execute_cdp_cmd(self, command, params):
+            self.cdp_commands.append((command, params))
+
+        def find_element(self, by, selector):
+            driver = self
+
+            class NavigatingElement(StubElement):
+                def click(self):
+                    driver.current_url = "https://checkout.example/pay"
+
+            return NavigatingElement()
+
+    created = []
+
+    def factory(headless, profile=None):
+        created.append(CdpStubDriver(headless))
+        return created[-1]
+
+    server_module.browser_pool = BrowserPool(driver_factory=factory, size=1)
+    result = asyncio.run(
+        automate_browser_task(
+            "https://shop.example/cart", [{"type": "click", "selector": "a.pay"}]
+        )
+    )
+    assert result["final_url"] == "https://checkout.example/pay"
+
+    cleared = [
+        params
+        for command, params in created[0].cdp_commands
+        if command == "Storage.clearDataForOrigin"
+    ]
+    assert cleared == [
+        {"origin": "https://checkout.example", "storageTypes": "all"},
+        {"origin": "https://shop.example", "storageTypes": "all"},
+    ]
+
+
+def test_recycles_after_max_uses():
+    """Drivers are retired after max_uses sessions"""
+
+    pool, created = make_pool(max_uses=2)
+    for _ in range(3):
+        pool.checkin(pool.checkout())
+
+    assert len(created) == 2
+    assert created[0].quit_called
+    assert pool.stats()["recycled"] == 1
+
+
+def test_crashed_driver_is_replaced():
+    """A driver that died while idle or in use is discarded"""
+
+    pool, created = make_pool()
+    entry = pool.checkout()
+    entry["driver"].crashed = True
+    pool.checkin(entry)
+
+    replacement = pool.checkout()
+    assert replacement["driver"] is not created[0]
+    assert pool.stats()["discarded"] == 1
+    assert pool.stats()["live"] == 1
+
+
+def test_idle_drivers_are_reaped():
+    """Drivers idle past idle_timeout are quit"""
+
+    pool, created = make_pool(idle_timeout=0.05)
+    pool.checkin(pool.checkout())
+    time.sleep(0.1)
+    pool.reap_idle()
+
+    assert created[0].quit_called
+    assert pool.stats()["live"] == 0
+    assert pool.stats()["reaped"] == 1
+
+
+def test_size_limit_blocks_until_checkin():
+    """Checkout waits for a free slot and times out when none appears"""
+
+    pool, _ = make_pool(size=1)
+    entry = pool.checkout()
+
+    try:
+        pool.checkout(timeout=0.05)
+    except TimeoutError:
+        pass
+    else:
+        raise AssertionError("checkout beyond pool size did not time out")
+
+    threading.Timer(0.05, pool.checkin, args=(entry,)).start()
+    assert pool.checkout(timeout=1)["driver"] is entry["driver"]
+
+
+def test_full_pool_swaps_idle_driver_of_other_kind():
+    """A headed request evicts an idle headless driver when the pool is full"""
+
+    pool, created = make_pool(size=1)
+    pool.checkin(pool.checkout(headless=True))
+
+    entry = pool.checkout(headless=False, timeout=0.5)
+    assert entry["driver"].headless is False
+    assert created[0].quit_called
+    assert pool.stats()["live"] == 1
+
+
+def use_stub_pool(**kwargs):
+    """Install a stub-driver pool as the server's shared browser pool"""
+
+    pool, created = make_pool(**kwargs)
+    server_module.browser_pool = pool
+    return pool, created
+
+
+def test_sessions_do_not_block_event_loop():
+    """Sessions with long waits run in threads while the loop keeps serving"""
+
+    pool, _ = use_stub_pool(size=2)
+    ticks = []
+
+    async def ticker():
+        for _ in range(5):
+            await asyncio.sleep(0.05)
+            ticks.append(time.perf_counter())
+
+    async def scenario():
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            automate_browser_task("https://a.example", [{"type": "wait", "seconds": 0.5}]),
+            automate_browser_task("https://b.example", [{"type": "wait", "seconds": 0.5}]),
+            ticker(),
+        )
+        return results, time.perf_counter() - start, start
+
+    (first, second, _), elapsed, start = asyncio.run(scenario())
+
+    assert first["status"] == second["status"] == "success"
+    assert elapsed < 0.9, "sessions ran one after another"
+    assert ticks and ticks[0] - start < 0.2, "event loop was blocked"
+    assert pool.stats()["created"] == 2
+
+
+def test_session_deadline_cancels_wait():
+    """A session past its deadline is stopped and its driver returned"""
+
+    pool, _ = use_stub_pool(size=1)
+    actions = [{"type": "wait", "seconds": 10}, {"type": "scroll"}]
+
+    start = time.perf_counter()
+    result = asyncio.run(automate_browser_task("https://a.example", actions, timeout=0.2))
+    elapsed = time.perf_counter() - start
+
+    assert result["status"] == "error" and "deadline" in result["error"]
+    assert elapsed < 1
+
+    deadline = time.monotonic() + 2
+    while pool.stats()["idle"] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["idle"] == 1
+
+
+def run_script(actions, driver_setup=None, timeout=None):
+    """Run an action script on a fresh stub pool, returning result and driver"""
+
+    pool, created = use_stub_pool(size=1)
+    if driver_setup:
+        entry = pool.checkout()
+        driver_setup(entry["driver"])
+        pool.checkin(entry)
+    result = asyncio.run(automate_browser_task("https://a.example", actions, timeout=timeout))
+    return result, created[0]
+
+
+def test_wait_for_selector_returns_when_element_appears():
+    """A selector wait ends shortly after the element shows up, not at its timeout"""
+
+    def setup(driver):
+        driver.created_at = time.monotonic()
+        driver.element_appears_after = 0.3
+
+    start = time.perf_counter()
+    result, _ = run_script(
+        [{"type": "wait_for_selector", "selector": "#app", "timeout": 5}], setup
+    )
+    elapsed = time.perf_counter() - start
+
+    assert result["status"] == "success", result
+    assert 0.3 <= elapsed < 1.5
+    assert result["actions_performed"][0].startswith("Waited for selector #app")
+
+
+def test_wait_for_selector_times_out():
+    """A selector that never appears fails the session after its timeout"""
+
+    def setup(driver):
+        driver.element_appears_after = 60
+
+    result, _ = run_script(
+        [{"type": "wait_for_selector", "selector": "#never", "timeout": 0.2}], setup
+    )
+
+    assert result["status"] == "error"
+    assert "Timed out after 0.2s" in result["error"]
+
+
+def test_wait_for_network_idle():
+    """Network idle waits until the resource count stops changing"""
+
+    def setup(driver):
+        driver.resource_counts = [1, 3, 5, 8, 8, 8, 8, 8, 8, 8]
+
+    result, _ = run_script(
+        [{"type": "wait_for_network_idle", "idle_ms": 200, "timeout": 5}], setup
+    )
+
+    assert result["status"] == "success", result
+    assert "network idle" in result["actions_performed"][0]
+
+
+def test_network_idle_waits_for_requests_in_flight():
+    """A long request keeps the network busy even when no resource completes"""
+
+    driver = StubDriver()
+    driver.inflight_requests = [1] * 8
+    condition = server_module.network_idle(0.05)
+
+    start = time.monotonic()
+    while not condition(driver):
+        time.sleep(0.02)
+    elapsed = time.monotonic() - start
+
+    assert not driver.inflight_requests
+    assert elapsed >= 0.05 + 7 * 0.02
+    assert "setResourceTimingBufferSize" in driver.scripts[0]
+
+
+def test_wait_for_text():
+    """Text waits match text inside the selected element"""
+
+    result, _ = run_script([{"type": "wait_for_text", "selector": "#status", "text": "Ready"}])
+
+    assert result["status"] == "success", result
+
+
+def test_lightweight_profile_launch_options():
+    """The lightweight preset blocks images and loads pages eagerly"""
+
+    profile = resolve_load_profile("lightweight")
+    options = build_chrome_options(True, profile)
+
+    assert options.page_load_strategy == "eager"
+    assert "--disable-extensions" in options.arguments
+    assert options.experimental_options["prefs"] == {
+        "profile.managed_default_content_settings.images": 2
+    }
+
+    full = build_chrome_options(True, resolve_load_profile(None))
+    assert full.page_load_strategy == "normal"
+    assert "prefs" not in full.experimental_options
+
+    text_only = build_chrome_options(True, resolve_load_profile("text_only"))
+    assert text_only.experimental_options["prefs"] == {
+        "profile.managed_default_content_settings.images": 2,
+        "profile.managed_default_content_settings.javascript": 2,
+    }
+    assert server_module.browser_launch_key(
+        True, resolve_load_profile("text_only")
+    ) != server_module.browser_launch_key(
+        True, resolve_load_profile({"preset": "text_only", "disable_javascript": False})
+    )
+
+
+def test_profile_overrides_and_blocked_urls():
+    """Dict profiles override a preset and produce runtime block patterns"""
+
+    profile = resolve_load_profile(
+        {"preset": "lightweight", "block_fonts": False, "blocked_domains": ["ads.example"]}
+    )
+    patterns = blocked_url_patterns(profile)
+
+    assert "*.mp4" in patterns
+    assert "*.woff2" not in patterns
+    assert "*://ads.example/*" in patterns and "*://*.ads.example/*" in patterns
+
+    try:
+        resolve_load_profile({"page_load_strategy": "fast"})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("invalid page_load_strategy was accepted")
+
+
+def test_pool_keeps_profiles_apart():
+    """Drivers launched with different profiles are not handed out interchangeably"""
+
+    pool, created = make_pool()
+    pool.checkin(pool.checkout(load_profile="lightweight"))
+
+    full = pool.checkout(load_profile="full")
+    assert full["driver"] is not created[0]
+    assert full["driver"].profile["page_load_strategy"] == "normal"
+    pool.checkin(full)
+
+    light = pool.checkout(load_profile={"preset": "lightweight", "blocked_domains": ["x.com"]})
+    assert light["driver"] is created[0], "runtime-only settings should reuse the driver"
+
+
+def test_batch_runs_in_parallel_on_pooled_drivers():
+    """A batch reuses pooled drivers, stays under its cap and keeps input order"""
+
+    pool, created = use_stub_pool(size=2)
+    urls = [f"https://site{i}.example/" for i in range(6)]
+    actions = [{"type": "wait", "seconds": 0.2}, {"type": "extract_text", "selector": "h1"}]
+
+    start = time.perf_counter()
+    result = asyncio.run(batch_browser_automation(urls, actions, max_concurrency=5))
+    elapsed = time.perf_counter() - start
+
+    assert [r["url"] for r in result["results"]] == urls
+    assert all(r["extracted_text"] == ["Ready"] for r in result["results"])
+    assert result["summary"]["succeeded"] == 6
+    assert result["summary"]["max_concurrency"] == 2, "cap should not exceed pool size"
+    assert len(created) == 2, "drivers were launched per URL instead of reused"
+    assert 0.6 <= elapsed < 1.2
+
+
+def test_batch_reports_progress_per_url():
+    """Each finished URL is reported when the caller sent a progress token"""
+
+    import mcp.types as types
+    from mcp.server.lowlevel.server import request_ctx
+    from mcp.shared.context import RequestContext
+
+    class RecordingSession:
+        def __init__(self):
+            self.notifications = []
+
+        async def send_progress_notification(self, token, progress, total, message, **kwargs):
+            self.notifications.append((token, progress, total, message))
+
+    use_stub_pool(size=2)
+    session = RecordingSession()
+    urls = ["https://one.example/", "https://two.example/"]
+
+    async def scenario():
+        request_ctx.set(
+            RequestContext(
+                request_id=1,
+                meta=types.RequestParams.Meta(progressToken="batch-1"),
+                session=session,
+                lifespan_context=None,
+            )
+        )
+        return await batch_browser_automation(urls, [{"type": "extract_text"}])
+
+    saved = {"browser_progress_text_chars": server_module.CONFIG["browser_progress_text_chars"]}
+    server_module.CONFIG["browser_progress_text_chars"] = 3
+    try:
+        asyncio.run(scenario())
+    finally:
+        server_module.CONFIG.update(saved)
+
+    assert [n[1] for n in session.notifications] == [1, 2]
+    assert all(n[0] == "batch-1" and n[2] == 2 for n in session.notifications)
+    messages = sorted((json.loads(n[3]) for n in session.notifications), key=lambda m: m["index"])
+    assert [m["url"] for m in messages] == urls
+    assert all(m["status"] == "success" for m in messages)
+    assert all(m["extracted_text"] == ["Rea"] and m["truncated"] for m in messages)
+
+
+def test_batch_writes_results_to_sink():
+    """With a sink, batch results go to a dataset and only the summary returns"""
+
+    import tempfile
+
+    use_stub_pool(size=2)
+    saved = {"datasets_dir": server_module.CONFIG["datasets_dir"]}
+    server_module.CONFIG["datasets_dir"] = tempfile.mkdtemp(prefix="datasets_")
+    urls = [f"https://site{i}.example/" for i in range(4)]
+    actions = [{"type": "extract_text", "selector": "h1"}]
+
+    try:
+        result = asyncio.run(
+            batch_browser_automation(urls, actions, sink={"name": "pages", "format": "sqlite"})
+        )
+        rows = server_module.query_dataset("pages.sqlite", order_by=["url"])["data"]
+    finally:
+        server_module.CONFIG.update(saved)
+
+    assert set(result) == {"sink", "summary"}
+    assert result["summary"]["succeeded"] == 4
+    assert result["sink"]["name"] == "pages.sqlite"
+    assert result["sink"]["records_written"] == 4
+    assert [row["url"] for row in rows] == urls
+    assert rows[0]["extracted_text"] == '["Ready"]'
+
+
+def test_batch_numbers_screenshot_paths():
+    """Each URL in a batch writes its own screenshot file"""
+
+    numbered = server_module.number_screenshot_paths(
+        [{"type": "scroll"}, {"type": "screenshot", "path": "shots/page.png"}], 3
+    )
+    assert numbered[0] == {"type": "scroll"}
+    assert numbered[1]["path"] == "shots/page_3.png"
+
+
+ARTICLE = "<html><body><article>" + "<p>Rendered paragraph text.</p>" * 40 + "</article></body></html>"
+APP_SHELL = '<html><body><div id="app"></div><script src="/app.js"></script></body></html>'
+CHALLENGE = "<html><head><title>Just a moment...</title></head><body></body></html>"
+
+
+def unlock_with_stub_browser(stub, paths, rendered_html=ARTICLE):
+    """Unlock each path in turn with a stub browser that renders ``rendered_html``"""
+
+    pool, created = use_stub_pool(size=1)
+    entry = pool.checkout(load_profile=server_module.CONFIG["render_load_profile"])
+    entry["driver"].page_source = rendered_html
+    pool.checkin(entry)
+
+    saved = {key: server_module.CONFIG[key] for key in ("cache_enabled", "render_idle_ms")}
+    server_module.CONFIG["cache_enabled"] = False
+    server_module.CONFIG["render_idle_ms"] = 50
+    server_module.render_decisions = RenderDecisionCache()
+
+    async def scenario():
+        try:
+            return [await server_module.unlock_web_content(stub.url(p)) for p in paths]
+        finally:
+            await close_http_client()
+
+    try:
+        return asyncio.run(scenario()), created[0]
+    finally:
+        server_module.CONFIG.update(saved)
+
+
+def test_js_shell_falls_back_to_browser_and_is_remembered():
+    """A near-empty static page is rendered, and its host skips the static tier next time"""
+
+    with StubServer({"/app": lambda h: send_response(h, body=APP_SHELL)}) as stub:
+        (first, second), _ = unlock_with_stub_browser(stub, ["/app", "/app"])
+
+        assert first["fetch_mode"] == second["fetch_mode"] == "browser"
+        assert "Rendered paragraph text." in first["content"]
+        assert stub.request_count == 1, "known JS host was fetched statically again"
+        assert first["final_url"].endswith("/app")
+
+
+def test_static_page_does_not_start_browser():
+    """Pages with enough static text never touch the browser pool"""
+
+    with StubServer({"/post": lambda h: send_response(h, body=ARTICLE)}) as stub:
+        (result,), _ = unlock_with_stub_browser(stub, ["/post"])
+
+        assert result["fetch_mode"] == "static"
+        assert server_module.render_decisions.counters["rendered"] == 0
+        assert server_module.render_decisions.stats()["render_hosts"] == []
+
+
+def test_challenge_response_is_rendered():
+    """A Cloudflare challenge served with 403 is retried in the browser"""
+
+    def challenge(handler):
+        send_response(handler, 403, CHALLENGE, headers={"Server": "cloudflare"})
+
+    with StubServer({"/guarded": challenge}) as stub:
+        (result,), _ = unlock_with_stub_browser(stub, ["/guarded"])
+
+        assert result["status"] == "success"
+        assert result["fetch_mode"] == "browser"
+
+
+def test_render_that_does_not_help_is_skipped_next_time():
+    """A thin page the browser cannot improve marks its host as static-only"""
+
+    thin = "<html><body><p>Short note.</p></body></html>"
+    with StubServer({"/note": lambda h: send_response(h, body=thin)}) as stub:
+        (first, second), _ = unlock_with_stub_browser(stub, ["/note", "/note"], thin)
+
+        assert first["fetch_mode"] == second["fetch_mode"] == "static"
+        stats = server_module.render_decisions.stats()
+        assert stats["static_hosts"] == [stub.base_url.split("//", 1)[1]]
+        assert stats["render_skipped"] == 1
+
+
+def test_failed_render_is_not_retried_on_every_call():
+    """When the browser tier fails, the host falls back to static fetches for a while"""
+
+    def no_browser(headless, profile=None):
+        raise RuntimeError("chrome not found")
+
+    with StubServer({"/app": lambda h: send_response(h, body=APP_SHELL)}) as stub:
+        server_module.browser_pool = BrowserPool(driver_factory=no_browser, size=1)
+        saved = {"cache_enabled": server_module.CONFIG["cache_enabled"]}
+        server_module.CONFIG["cache_enabled"] = False
+        server_module.render_decisions = RenderDecisionCache()
+
+        async def scenario():
+            try:
+                return [await server_module.unlock_web_content(stub.url("/app")) for _ in range(3)]
+            finally:
+                await close_http_client()
+
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            server_module.CONFIG.update(saved)
+
+        assert all(r["fetch_mode"] == "static" for r in results)
+        counters = server_module.render_decisions.counters
+        assert counters["render_failed"] == 1 and counters["render_skipped"] == 2
+
+
+def test_batch_extract_does_not_render_by_default():
+    """Thin pages in a batch stay on the static tier unless rendering is asked for"""
+
+    with StubServer({"/app": lambda h: send_response(h, body=APP_SHELL)}) as stub:
+        pool, created = use_stub_pool(size=1)
+        saved = {key: server_module.CONFIG[key] for key in ("cache_enabled", "per_host_delay")}
+        server_module.CONFIG["cache_enabled"] = False
+        server_module.CONFIG["per_host_delay"] = 0
+        server_module.render_decisions = RenderDecisionCache()
+
+        async def scenario():
+            try:
+                return await server_module.batch_url_extract([stub.url("/app")] * 3)
+            finally:
+                await close_http_client()
+
+        try:
+            results = asyncio.run(scenario())
+        finally:
+            server_module.CONFIG.update(saved)
+
+        assert [r["fetch_mode"] for r in results] == ["static"] * 3
+        assert created == [], "batch extraction started a browser"
+
+
+def main():
+    """Run all tests"""
+    tests = [value for key, value in globals().items() if key.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    main()
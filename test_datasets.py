@@ -0,0 +1,752 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the dataset tools (create, query, list).
+
+Every test works in a fresh temporary datasets directory.
+Run with ``python test_datasets.py`` or ``python -m pytest test_datasets.py``.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import enhanced_server_pure as server_module
+from enhanced_server_pure import (
+    DataFrameCache,
+    create_dataset,
+    downcast_frame,
+    index_dataset,
+    parse_where,
+    query_dataset,
+)
+import pandas as pd
+
+RECORDS = [
+    {
+        "url": f"https://site{i % 4}.example/page/{i}",
+        "status": "success" if i % 3 else "error",
+        "words": i * 10,
+        "title": f"Page {i}",
+    }
+    for i in range(30)
+]
+
+
+def use_fresh_datasets_dir() -> str:
+    """Point the server at an empty temporary datasets directory"""
+
+    directory = tempfile.mkdtemp(prefix="datasets_")
+    server_module.CONFIG["datasets_dir"] = directory
+    server_module.dataset_cache.clear()
+    return directory
+
+
+def test_parquet_projection_and_pushdown():
+    """Parquet queries return only the requested columns of matching rows"""
+
+    use_fresh_datasets_dir()
+    created = create_dataset("pages", RECORDS, "parquet")
+    assert created["status"] == "success", created
+
+    result = query_dataset(
+        "pages.parquet",
+        columns=["url", "words"],
+        filters=[["status", "==", "success"], ["words", ">=", 100]],
+        limit=5,
+    )
+
+    assert result["status"] == "success", result
+    assert result["columns"] == ["url", "words"]
+    assert result["rows"] == 5
+    assert [row["words"] for row in result["data"]] == [100, 110, 130, 140, 160]
+
+
+def test_parquet_text_query_with_filters():
+    """A text query is combined with filters and the limit on Parquet data"""
+
+    use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "parquet")
+
+    result = query_dataset(
+        "pages.parquet", query="SITE1", filters=[["status", "in", ["error"]]]
+    )
+
+    assert result["status"] == "success", result
+    assert [row["title"] for row in result["data"]] == ["Page 9", "Page 21"]
+
+
+def test_csv_and_json_support_columns_and_filters():
+    """CSV and JSON datasets accept the same projection and filters"""
+
+    use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "csv")
+    create_dataset("pages", RECORDS, "json")
+    filters = [["words", "<", 50], ["status", "!=", "error"]]
+
+    csv_result = query_dataset("pages.csv", columns=["title"], filters=filters)
+    json_result = query_dataset("pages.json", columns=["title"], filters=filters)
+
+    expected = [{"title": f"Page {i}"} for i in (1, 2, 4)]
+    assert csv_result["data"] == expected
+    assert json_result["data"] == expected
+
+
+def test_invalid_filters_are_rejected():
+    """Malformed filters produce an error result instead of a wrong answer"""
+
+    use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "csv")
+
+    for filters in ([["words", "~", 1]], [["words", "in", 5]], [["words", ">"]]):
+        result = query_dataset("pages.csv", filters=filters)
+        assert result["status"] == "error", filters
+
+    result = query_dataset("pages.csv", filters=[["missing", "==", 1]])
+    assert result["status"] == "error" and "missing" in result["error"]
+
+
+def test_repeated_queries_hit_the_frame_cache():
+    """Paging through a CSV dataset parses it once until the file changes"""
+
+    use_fresh_datasets_dir()
+    cache = server_module.dataset_cache
+    create_dataset("pages", RECORDS, "csv")
+    before = dict(cache.counters)
+
+    first = query_dataset("pages.csv", limit=10)
+    second = query_dataset("pages.csv", filters=[["words", ">", 100]], columns=["title"])
+    assert cache.counters["misses"] - before["misses"] == 1
+    assert cache.counters["hits"] - before["hits"] == 1
+    assert first["rows"] == 10 and second["data"][0] == {"title": "Page 11"}
+
+    create_dataset("pages", RECORDS[:5], "csv")
+    rewritten = query_dataset("pages.csv")
+    assert rewritten["rows"] == 5, "stale frame served after the file changed"
+    assert cache.counters["invalidations"] - before["invalidations"] == 1
+
+
+def test_frame_cache_evicts_to_memory_budget():
+    """The least recently used frames are dropped to stay under the byte budget"""
+
+    directory = use_fresh_datasets_dir()
+    paths = []
+    for name in ("a", "b", "c"):
+        create_dataset(name, RECORDS, "csv")
+        paths.append(os.path.join(directory, f"{name}.csv"))
+
+    one_frame = int(
+        downcast_frame(pd.read_csv(paths[0])).memory_usage(deep=True).sum()
+    )
+    cache = DataFrameCache(max_bytes=one_frame * 2)
+    for path in paths:
+        cache.get(path, pd.read_csv)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    assert stats["memory_bytes"] <= stats["max_bytes"]
+    cache.get(paths[2], pd.read_csv)
+    assert cache.counters["hits"] == 1
+
+
+def test_downcast_keeps_values_and_filters_working():
+    """Downcast frames are smaller yet give the same query answers"""
+
+    frame = pd.DataFrame(RECORDS)
+    downcast = downcast_frame(frame.copy())
+
+    assert downcast["words"].dtype == "int16"
+    assert isinstance(downcast["status"].dtype, pd.CategoricalDtype)
+    assert downcast.memory_usage(deep=True).sum() < frame.memory_usage(deep=True).sum()
+
+    use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "csv")
+    result = query_dataset("pages.csv", filters=[["status", ">=", "f"]], columns=["words"])
+    assert result["status"] == "success", result
+    assert len(result["data"]) == 20 and isinstance(result["data"][0]["words"], int)
+
+
+def test_ordering_and_pagination_across_formats():
+    """Every format sorts and pages through matches the same way"""
+
+    use_fresh_datasets_dir()
+    expected = [f"Page {i}" for i in (29, 28, 26, 25)]
+    for format_type in ("csv", "json", "parquet", "sqlite"):
+        create_dataset("pages", RECORDS, format_type)
+        name = f"pages.{format_type}"
+        first = query_dataset(
+            name, filters=[["status", "==", "success"]], order_by=["-words"], limit=2
+        )
+        second = query_dataset(
+            name,
+            filters=[["status", "==", "success"]],
+            order_by=["-words"],
+            limit=2,
+            offset=first["next_offset"],
+        )
+
+        titles = [row["title"] for row in first["data"] + second["data"]]
+        assert titles == expected, (format_type, titles)
+        assert second["offset"] == 2 and second["next_offset"] == 4
+
+    last = query_dataset("pages.sqlite", limit=100)
+    assert last["rows"] == 30 and last["next_offset"] is None
+
+
+def test_index_dataset_builds_searchable_sqlite_copy():
+    """index_dataset streams a CSV into SQLite with column and full-text indexes"""
+
+    directory = use_fresh_datasets_dir()
+    records = [
+        dict(record, content="Article about " + ("python" if record["words"] % 20 else "rust"))
+        for record in RECORDS
+    ]
+    create_dataset("articles", records, "csv")
+
+    chunk_rows = server_module.CONFIG["dataset_chunk_rows"]
+    server_module.CONFIG["dataset_chunk_rows"] = 7
+    try:
+        built = index_dataset("articles.csv", index_columns=["status", "words"])
+    finally:
+        server_module.CONFIG["dataset_chunk_rows"] = chunk_rows
+    assert built["status"] == "success", built
+    assert built["name"] == "articles.sqlite" and built["records"] == 30
+    assert set(built["fts_columns"]) == {"url", "status", "title", "content"}
+
+    import sqlite3
+
+    db = sqlite3.connect(os.path.join(directory, "articles.sqlite"))
+    plan = " ".join(
+        row[-1]
+        for row in db.execute(
+            'EXPLAIN QUERY PLAN SELECT * FROM records WHERE "status" = ? ORDER BY "words"',
+            ("error",),
+        )
+    )
+    db.close()
+    assert "records_status_idx" in plan, plan
+
+    result = query_dataset(
+        "articles.sqlite", query="rus", columns=["title"], filters=[["status", "==", "error"]]
+    )
+    assert result["status"] == "success", result
+    assert [row["title"] for row in result["data"]] == [f"Page {i}" for i in range(0, 30, 6)]
+
+
+def test_sqlite_text_query_without_fts_uses_like():
+    """A SQLite dataset with no full-text index still answers substring queries"""
+
+    use_fresh_datasets_dir()
+    server_module.write_sqlite_dataset(
+        os.path.join(server_module.CONFIG["datasets_dir"], "plain.sqlite"),
+        [RECORDS],
+        fts_columns=[],
+    )
+
+    result = query_dataset("plain.sqlite", query="age 2_", columns=["title"])
+    assert result["data"] == [], "LIKE wildcards in the query must be escaped"
+    result = query_dataset("plain.sqlite", query="PAGE 2", columns=["title"], limit=3)
+    assert [row["title"] for row in result["data"]] == ["Page 2", "Page 20", "Page 21"]
+
+
+def stream_csv_queries(min_bytes=0, chunk_rows=4):
+    """Make every CSV query stream in small chunks until restored"""
+
+    saved = {
+        key: server_module.CONFIG[key]
+        for key in ("dataset_stream_min_bytes", "dataset_chunk_rows")
+    }
+    server_module.CONFIG["dataset_stream_min_bytes"] = min_bytes
+    server_module.CONFIG["dataset_chunk_rows"] = chunk_rows
+    return saved
+
+
+def test_streamed_csv_queries_match_in_memory_results():
+    """Chunked CSV queries return exactly what the in-memory path returns"""
+
+    use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "csv")
+    queries = [
+        {"limit": 5},
+        {"query": "site2", "limit": 3, "offset": 1},
+        {"filters": [["words", ">=", 120]], "columns": ["title", "words"], "limit": 4},
+        {
+            "filters": [["status", "==", "success"]],
+            "order_by": ["-words"],
+            "limit": 3,
+            "offset": 2,
+        },
+        {"cursor": 25, "limit": 10},
+    ]
+    expected = [query_dataset("pages.csv", **kwargs) for kwargs in queries]
+
+    saved = stream_csv_queries()
+    try:
+        streamed = [query_dataset("pages.csv", **kwargs) for kwargs in queries]
+    finally:
+        server_module.CONFIG.update(saved)
+
+    for kwargs, want, got in zip(queries, expected, streamed):
+        assert got["status"] == "success", got
+        assert got["data"] == want["data"], kwargs
+        assert got["next_cursor"] == want["next_cursor"], kwargs
+
+
+def test_cursor_pages_through_csv_without_gaps():
+    """Following next_cursor visits every match once, in file order"""
+
+    use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "csv")
+    saved = stream_csv_queries()
+    try:
+        titles = []
+        cursor = None
+        while True:
+            page = query_dataset(
+                "pages.csv", filters=[["status", "==", "error"]], limit=3, cursor=cursor
+            )
+            titles += [row["title"] for row in page["data"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    finally:
+        server_module.CONFIG.update(saved)
+
+    assert titles == [f"Page {i}" for i in range(0, 30, 3)]
+
+
+def test_streamed_query_stops_reading_at_limit():
+    """A streamed query never parses rows past the chunk holding its last match"""
+
+    directory = use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "csv")
+    with open(os.path.join(directory, "pages.csv"), "a") as f:
+        f.write("this,row,has,far,too,many,fields\n" * 10)
+
+    saved = stream_csv_queries()
+    try:
+        result = query_dataset("pages.csv", limit=5)
+        assert result["status"] == "success", result
+        assert result["rows"] == 5 and result["next_cursor"] == 5
+
+        result = query_dataset("pages.csv", limit=50)
+        assert result["status"] == "error", "malformed tail should only be hit by a full scan"
+    finally:
+        server_module.CONFIG.update(saved)
+
+
+WHERE_RECORDS = [
+    {
+        "url": f"https://site{i % 4}.example/{'blog' if i % 2 else 'tag'}/{i}",
+        "status": "success" if i % 3 else "error",
+        "words": None if i % 7 == 0 else i * 10,
+        "lang": None if i % 5 == 0 else ("en" if i % 2 else "de"),
+    }
+    for i in range(30)
+]
+WHERE_CASES = {
+    'status == "success" and 50 <= words < 150': [5, 8, 10, 11, 13],
+    'lang in ["de"] or matches(url, "site3.*/1[59]$")': [
+        2, 4, 6, 8, 12, 14, 15, 16, 18, 19, 22, 24, 26, 28,
+    ],
+    'not (lang != "en") and icontains(url, "SITE1")': [1, 9, 13, 17, 21, 29],
+    "isnull(words) or words > 270": [0, 7, 14, 21, 28, 29],
+    'lang not in ["en"] and startswith(col("url"), "https://site2") and status != "error"': [
+        2, 14, 22, 26,
+    ],
+    # Python re features that Arrow's RE2 engine lacks: lookaround, backreference
+    r'matches(url, "site(?!0)\\d.*/blog/") and words >= 200': [23, 25, 27, 29],
+    r'matches(url, "(\\d)\\1$") or lang == "de"': [
+        2, 4, 6, 8, 11, 12, 14, 16, 18, 22, 24, 26, 28,
+    ],
+}
+
+
+def test_where_expressions_agree_across_formats():
+    """Each format evaluates where expressions the same way, nulls included"""
+
+    use_fresh_datasets_dir()
+    for format_type in ("csv", "json", "jsonl", "parquet", "sqlite"):
+        create_dataset("mixed", WHERE_RECORDS, format_type)
+
+    for expression, expected in WHERE_CASES.items():
+        for format_type in ("csv", "json", "jsonl", "parquet", "sqlite"):
+            result = query_dataset(f"mixed.{format_type}", where=expression, columns=["url"])
+            assert result["status"] == "success", (format_type, result)
+            got = [int(row["url"].rsplit("/", 1)[1]) for row in result["data"]]
+            assert got == expected, (format_type, expression, got)
+
+    saved = stream_csv_queries()
+    try:
+        for expression, expected in WHERE_CASES.items():
+            result = query_dataset("mixed.csv", where=expression, columns=["url"])
+            assert [int(row["url"].rsplit("/", 1)[1]) for row in result["data"]] == expected
+    finally:
+        server_module.CONFIG.update(saved)
+
+
+def test_where_rejects_anything_but_the_query_language():
+    """Expressions are parsed, never evaluated; other syntax is an error"""
+
+    rejected = [
+        '__import__("os").system("true")',
+        "url.startswith('x')",
+        "words + 1 > 2",
+        "words > other_column",
+        "lambda: 1",
+        "contains(url)",
+        'matches(url, "(")',
+        "status ==",
+    ]
+    for expression in rejected:
+        try:
+            parse_where(expression)
+        except ValueError:
+            continue
+        raise AssertionError(f"accepted: {expression}")
+
+    assert parse_where("1 < words <= 5") == (
+        "and",
+        [("cmp", "words", ">", 1), ("cmp", "words", "<=", 5)],
+    )
+
+    use_fresh_datasets_dir()
+    create_dataset("mixed", WHERE_RECORDS, "csv")
+    result = query_dataset("mixed.csv", where="missing == 1")
+    assert result["status"] == "error" and "missing" in result["error"]
+
+
+def test_jsonl_datasets_with_compression():
+    """JSON Lines datasets, plain or compressed, answer the same queries"""
+
+    directory = use_fresh_datasets_dir()
+    names = {None: "pages.jsonl", "gzip": "pages.jsonl.gz", "zstd": "pages.jsonl.zst"}
+    for compression, name in names.items():
+        created = create_dataset("pages", RECORDS, "jsonl", compression)
+        assert created["status"] == "success", created
+        assert os.path.exists(os.path.join(directory, name))
+
+    listed = {d["name"]: d for d in server_module.list_datasets()}
+    assert listed["pages.jsonl.zst"]["type"] == ".jsonl"
+    assert listed["pages.jsonl.zst"]["compression"] == "zstd"
+
+    for name in names.values():
+        result = query_dataset(
+            name,
+            where='status == "error" and words > 50',
+            columns=["title"],
+            order_by=["-words"],
+            limit=3,
+        )
+        assert result["status"] == "success", result
+        assert [row["title"] for row in result["data"]] == ["Page 27", "Page 24", "Page 21"]
+
+        result = query_dataset(name, query="SITE3", limit=2, offset=1)
+        assert [row["title"] for row in result["data"]] == ["Page 7", "Page 11"]
+
+    built = index_dataset("pages.jsonl.gz", index_columns=["words"])
+    assert built["name"] == "pages.sqlite" and built["records"] == 30
+
+
+def test_jsonl_query_reads_lazily_and_pages_by_line():
+    """A JSON Lines query stops at its limit and resumes from next_cursor"""
+
+    directory = use_fresh_datasets_dir()
+    create_dataset("log", RECORDS, "jsonl")
+    with open(os.path.join(directory, "log.jsonl"), "a") as f:
+        f.write("\n{not json\n")
+
+    batch_lines = server_module.CONFIG["jsonl_batch_lines"]
+    server_module.CONFIG["jsonl_batch_lines"] = 4
+    try:
+        first = query_dataset("log.jsonl", filters=[["status", "==", "error"]], limit=4)
+        assert first["status"] == "success", "lines past the limit should not be parsed"
+        second = query_dataset(
+            "log.jsonl",
+            filters=[["status", "==", "error"]],
+            limit=4,
+            cursor=first["next_cursor"],
+        )
+        titles = [row["title"] for row in first["data"] + second["data"]]
+        assert titles == [f"Page {i}" for i in range(0, 24, 3)]
+
+        result = query_dataset("log.jsonl", filters=[["status", "==", "error"]], limit=50)
+        assert result["status"] == "error" and "line 32" in result["error"]
+    finally:
+        server_module.CONFIG["jsonl_batch_lines"] = batch_lines
+
+
+def test_jsonl_append_across_compressed_frames():
+    """Appending to a compressed JSON Lines file keeps earlier records readable"""
+
+    directory = use_fresh_datasets_dir()
+    for compression, name in [("gzip", "log.jsonl.gz"), ("zstd", "log.jsonl.zst")]:
+        path = os.path.join(directory, name)
+        server_module.write_jsonl(path, RECORDS[:10], compression)
+        server_module.write_jsonl(path, RECORDS[10:], compression, append=True)
+
+        result = query_dataset(name, columns=["title"], limit=100)
+        assert result["status"] == "success", result
+        assert [row["title"] for row in result["data"]] == [r["title"] for r in RECORDS]
+
+
+def test_append_writes_only_new_records():
+    """Appending to CSV, JSON Lines and SQLite datasets adds to the existing rows"""
+
+    directory = use_fresh_datasets_dir()
+    for format_type in ["csv", "jsonl", "sqlite"]:
+        name = f"log.{format_type}"
+        first = create_dataset("log", RECORDS[:10], format_type, mode="append")
+        assert first["status"] == "success", first
+        before = query_dataset(name, limit=100)
+        assert before["rows"] == 10
+
+        second = create_dataset("log", RECORDS[10:], format_type, mode="append")
+        assert second["status"] == "success" and second["records"] == 20, second
+        result = query_dataset(name, limit=100, order_by=["words"])
+        assert [row["title"] for row in result["data"]] == [r["title"] for r in RECORDS]
+
+    with open(os.path.join(directory, "log.csv")) as f:
+        assert f.read().count("url,status,words,title") == 1
+
+    partial = create_dataset("log", [{"title": "Short"}], "csv", mode="append")
+    assert partial["status"] == "success", partial
+    unknown = create_dataset("log", [{"lang": "en"}], "csv", mode="append")
+    assert unknown["status"] == "error" and "lang" in unknown["error"]
+
+    result = create_dataset("log", RECORDS, "parquet", mode="append")
+    assert result["status"] == "error"
+    assert [d["name"] for d in server_module.list_datasets() if d["name"].startswith(".")] == []
+
+
+def test_upsert_replaces_rows_by_key():
+    """Upserting by key updates existing SQLite rows and inserts new ones"""
+
+    use_fresh_datasets_dir()
+    created = create_dataset("pages", RECORDS[:20], "sqlite", mode="upsert", key=["url"])
+    assert created["inserted"] == 20 and created["updated"] == 0, created
+
+    changed = [dict(r, title=f"Revised {r['words']}") for r in RECORDS[15:30]]
+    changed.append(dict(RECORDS[29], title="Latest"))
+    result = create_dataset("pages", changed, "sqlite", mode="upsert", key="url")
+    assert result["status"] == "success", result
+    assert result["inserted"] == 10 and result["updated"] == 5
+
+    rows = query_dataset("pages.sqlite", limit=100)["data"]
+    assert len(rows) == 30
+    assert [row["title"] for row in rows[14:17]] == ["Page 14", "Revised 150", "Revised 160"]
+    assert rows[-1]["title"] == "Latest"
+    # The full-text index follows the updated values
+    assert query_dataset("pages.sqlite", query="Revised")["rows"] == 14
+    assert query_dataset("pages.sqlite", query="Revised 15")["rows"] == 1
+
+    missing = create_dataset("pages", [{"title": "No url"}], "sqlite", mode="upsert", key="url")
+    assert missing["status"] == "error"
+    result = create_dataset("pages", RECORDS, "csv", mode="upsert", key="url")
+    assert result["status"] == "error"
+
+
+def test_upsert_updates_only_supplied_columns():
+    """A partial record keeps the columns it left out, and new key columns are added"""
+
+    use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS[:5], "sqlite", mode="upsert", key="url")
+    partial = [{"url": RECORDS[1]["url"], "status": "archived"}]
+    result = create_dataset("pages", partial, "sqlite", mode="upsert", key="url")
+    assert result["status"] == "success" and result["updated"] == 1, result
+
+    row = query_dataset("pages.sqlite", where='status == "archived"')["data"][0]
+    assert (row["title"], row["words"]) == ("Page 1", 10)
+
+    # The key column exists only in the incoming records
+    create_dataset("items", [{"name": "old"}], "sqlite")
+    added = [{"sku": "a1", "name": "first"}, {"sku": "a1", "price": 3}]
+    result = create_dataset("items", added, "sqlite", mode="upsert", key="sku")
+    assert result["status"] == "success" and result["inserted"] == 1, result
+    rows = query_dataset("items.sqlite", where='sku == "a1"')["data"]
+    assert [(r["name"], r["price"]) for r in rows] == [("first", 3)]
+
+def test_overwrite_is_atomic():
+    """A failed overwrite leaves the previous dataset in place"""
+
+    directory = use_fresh_datasets_dir()
+    create_dataset("pages", RECORDS, "json")
+    failed = create_dataset("pages", [{"bad": object()}], "json")
+    assert failed["status"] == "error"
+
+    assert len(query_dataset("pages.json", limit=100)["data"]) == 30
+    assert sorted(os.listdir(directory)) == [".pages.json.lock", "pages.json"]
+
+
+def test_concurrent_appends_are_serialized():
+    """Appends from many threads land as whole records"""
+
+    use_fresh_datasets_dir()
+
+    def append(worker: int):
+        for batch in range(10):
+            records = [dict(r, worker=worker, batch=batch) for r in RECORDS]
+            assert create_dataset("log", records, "jsonl", mode="append")["status"] == "success"
+
+    threads = [threading.Thread(target=append, args=(worker,)) for worker in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = query_dataset("log.jsonl", limit=10_000)
+    assert result["status"] == "success", result
+    assert result["rows"] == 6 * 10 * len(RECORDS)
+
+
+def test_dataset_tools_run_off_the_event_loop():
+    """A slow dataset call does not stop the event loop serving other requests"""
+
+    import time
+
+    def slow_query(*args):
+        time.sleep(0.3)
+        return {"status": "success"}
+
+    async def scenario():
+        ticks = []
+
+        async def tick():
+            while len(ticks) < 10:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.02)
+
+        response, _ = await asyncio.gather(
+            server_module.handle_call_tool("query_dataset", {"name": "pages.csv"}), tick()
+        )
+        return response, ticks
+
+    query = server_module.query_dataset
+    server_module.query_dataset = slow_query
+    try:
+        start = time.monotonic()
+        response, ticks = asyncio.run(scenario())
+    finally:
+        server_module.query_dataset = query
+
+    assert '"success"' in response[0].text
+    assert ticks[-1] - start < 0.3, "the event loop was blocked by the query"
+
+
+async def stub_unlock(url, extract_text=True, **kwargs):
+    """unlock_web_content stand-in: every third page fails"""
+
+    number = int(url.rsplit("/", 1)[1])
+    await asyncio.sleep(0.001 * (number % 5))
+    if number % 3 == 0:
+        return {"url": url, "status": "error", "error": "HTTP 503"}
+    return {"url": url, "status": "success", "title": f"Page {number}", "content": "x" * number}
+
+
+def with_stub_unlock(coroutine, **config):
+    """Run a tool coroutine against stub_unlock, without per-host delays"""
+
+    unlock = server_module.unlock_web_content
+    saved = dict(server_module.CONFIG)
+    server_module.unlock_web_content = stub_unlock
+    server_module.CONFIG.update(per_host_delay=0, **config)
+    try:
+        return asyncio.run(coroutine)
+    finally:
+        server_module.unlock_web_content = unlock
+        server_module.CONFIG.update(saved)
+
+
+def test_batch_extract_streams_into_sink():
+    """batch_url_extract writes every result to the sink and returns a summary"""
+
+    use_fresh_datasets_dir()
+    urls = [f"https://site{i % 3}.example/page/{i}" for i in range(25)]
+    result = with_stub_unlock(
+        server_module.batch_url_extract(urls, max_concurrency=5, sink="crawl"),
+        sink_batch_records=4,
+    )
+
+    assert "results" not in result
+    assert result["summary"] == {"total_urls": 25, "succeeded": 16, "failed": 9}
+    assert result["sink"] == {
+        "name": "crawl.jsonl", "format": "jsonl", "mode": "append", "records_written": 25
+    }
+    stored = query_dataset("crawl.jsonl", limit=100)["data"]
+    assert sorted(row["url"] for row in stored) == sorted(urls)
+    assert query_dataset("crawl.jsonl", where='status == "error"')["data"][0]["error"] == "HTTP 503"
+
+    # Re-crawling into a keyed SQLite sink updates rows instead of duplicating them
+    sink = {"name": "pages", "format": "sqlite", "mode": "upsert", "key": ["url"]}
+    for _ in range(2):
+        result = with_stub_unlock(server_module.batch_url_extract(urls, sink=sink))
+        assert result["sink"]["records_written"] == 25, result
+    assert len(query_dataset("pages.sqlite", limit=100)["data"]) == 25
+
+
+def test_sink_errors_are_reported():
+    """An invalid sink is rejected up front; a failed write shows in the summary"""
+
+    use_fresh_datasets_dir()
+    urls = [f"https://site.example/page/{i}" for i in range(1, 4)]
+    try:
+        with_stub_unlock(
+            server_module.batch_url_extract(urls, sink={"name": "x", "format": "json", "mode": "append"})
+        )
+    except ValueError as e:
+        assert "Append mode" in str(e)
+    else:
+        raise AssertionError("append to a json sink should be rejected")
+
+    create_dataset("log", [{"url": "https://site.example/page/0"}], "csv")
+    result = with_stub_unlock(
+        server_module.batch_url_extract(urls, sink={"name": "log", "format": "csv"})
+    )
+    assert result["sink"]["records_written"] == 0
+    assert "Columns not in the CSV header" in result["sink"]["error"]
+
+
+def test_search_results_flow_into_sink():
+    """web_search writes one record per result, with extracted content merged in"""
+
+    use_fresh_datasets_dir()
+    search_results = [
+        {"title": f"Result {i}", "url": f"https://site.example/page/{i}", "snippet": "s"}
+        for i in range(1, 5)
+    ]
+
+    async def stub_search(query, num_results=10):
+        return search_results[:num_results]
+
+    search = server_module.search_bing
+    server_module.search_bing = stub_search
+    try:
+        result = with_stub_unlock(
+            server_module.search_and_extract("pages", 4, True, sink="serp")
+        )
+    finally:
+        server_module.search_bing = search
+
+    assert "results" not in result and "extracted_content" not in result
+    assert result["sink"]["records_written"] == 4
+    rows = query_dataset("serp.jsonl", order_by=["rank"])["data"]
+    assert [row["rank"] for row in rows] == [1, 2, 3, 4]
+    assert {row["query"] for row in rows} == {"pages"}
+    assert rows[0]["extraction_status"] == "success" and rows[0]["content"] == "x"
+    assert rows[2]["extraction_status"] == "error"
+
+
+def main():
+    """Run all tests"""
+    tests = [value for key, value in globals().items() if key.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    main()
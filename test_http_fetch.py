@@ -0,0 +1,675 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the HTTP fetch layer (caches, streamed downloads, retries).
+
+Every test runs against a local stub server, so no network access is needed.
+Run with ``python test_http_fetch.py`` or ``python -m pytest test_http_fetch.py``.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import enhanced_server_pure as server_module
+from enhanced_server_pure import (
+    HTTPResponseCache,
+    close_http_client,
+    get_with_retries,
+    normalize_url,
+    stream_download,
+)
+from benchmarks.stub_server import StubServer, send_response
+
+
+def run(coro):
+    """Run a coroutine on a fresh loop and close the shared client afterwards"""
+
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await close_http_client()
+
+    return asyncio.run(wrapper())
+
+
+def use_fresh_cache(**kwargs) -> HTTPResponseCache:
+    """Point the server at an empty cache in a temporary directory"""
+
+    directory = tempfile.mkdtemp(prefix="http_cache_")
+    cache = HTTPResponseCache(os.path.join(directory, "responses.sqlite3"), **kwargs)
+    server_module.CONFIG["cache_enabled"] = True
+    server_module._response_cache = cache
+    return cache
+
+
+def test_normalize_url():
+    """Equivalent URLs share a cache key"""
+
+    assert normalize_url("HTTP://Example.COM:80/a?b=2&a=1#frag") == (
+        "http://example.com/a?a=1&b=2"
+    )
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("https://example.com:8443/x") == "https://example.com:8443/x"
+
+
+def test_cache_hit_skips_network():
+    """A fresh cached page is served without contacting the server"""
+
+    cache = use_fresh_cache()
+    page = lambda h: send_response(h, headers={"Cache-Control": "max-age=60"})
+
+    with StubServer({"/page": page}) as stub:
+        first = run(get_with_retries(stub.url("/page")))
+        second = run(get_with_retries(stub.url("/page")))
+
+        assert first == second
+        assert stub.request_count == 1
+        assert cache.counters["hits"] == 1
+        assert cache.counters["misses"] == 1
+
+
+def test_conditional_revalidation():
+    """Stale entries are revalidated with If-None-Match and a 304 reuses the body"""
+
+    cache = use_fresh_cache()
+    seen_validators = []
+
+    def page(handler):
+        seen_validators.append(handler.headers.get("If-None-Match"))
+        if handler.headers.get("If-None-Match") == '"v1"':
+            handler.send_response(304)
+            handler.send_header("ETag", '"v1"')
+            handler.send_header("Cache-Control", "no-cache")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+        else:
+            send_response(handler, headers={"ETag": '"v1"', "Cache-Control": "no-cache"})
+
+    with StubServer({"/page": page}) as stub:
+        first = run(get_with_retries(stub.url("/page")))
+        second = run(get_with_retries(stub.url("/page")))
+
+    assert first == second
+    assert seen_validators == [None, '"v1"']
+    assert cache.counters["revalidated"] == 1
+
+
+def test_no_store_is_not_cached():
+    """Responses marked no-store always go back to the network"""
+
+    use_fresh_cache()
+    page = lambda h: send_response(h, headers={"Cache-Control": "no-store"})
+
+    with StubServer({"/page": page}) as stub:
+        run(get_with_retries(stub.url("/page")))
+        run(get_with_retries(stub.url("/page")))
+        assert stub.request_count == 2
+
+
+def test_memory_lru_and_disk_tier():
+    """Evicted memory entries are still served from the SQLite tier"""
+
+    cache = use_fresh_cache(memory_entries=2)
+    page = lambda h: send_response(h, body=h.path, headers={"Cache-Control": "max-age=60"})
+    routes = {f"/p{i}": page for i in range(3)}
+
+    with StubServer(routes) as stub:
+        for i in range(3):
+            run(get_with_retries(stub.url(f"/p{i}")))
+        assert cache.stats()["memory_entries"] == 2
+        assert cache.stats()["disk_entries"] == 3
+
+        reopened = HTTPResponseCache(cache.db_path)
+        assert reopened.get(stub.url("/p0"))["body"] == "/p0"
+
+
+def test_disk_size_limit_evicts_oldest():
+    """The disk tier stays within its byte budget"""
+
+    cache = use_fresh_cache(disk_bytes=2500)
+    page = lambda h: send_response(
+        h, body=h.path * 500, headers={"Cache-Control": "max-age=60"}
+    )
+    routes = {f"/p{i}": page for i in range(3)}
+
+    with StubServer(routes) as stub:
+        for i in range(3):
+            run(get_with_retries(stub.url(f"/p{i}")))
+
+    stats = cache.stats()
+    assert stats["disk_bytes"] <= 2500
+    assert stats["evictions"] >= 1
+
+
+def test_disk_tier_runs_off_the_event_loop():
+    """Disk reads and writes happen on a worker thread and keep an exact byte count"""
+
+    cache = use_fresh_cache(memory_entries=1, disk_bytes=2500)
+    headers = {"cache-control": "max-age=60"}
+    disk_threads = []
+    for name in ("_read_disk", "_write_disk"):
+        method = getattr(cache, name)
+
+        def recorded(*args, method=method):
+            disk_threads.append(threading.get_ident())
+            return method(*args)
+
+        setattr(cache, name, recorded)
+
+    async def scenario():
+        await cache.store("https://example.com/a", "a" * 1000, headers)
+        await cache.store("https://example.com/b", "b" * 1000, headers)
+        # Replacing a body frees the old one; a third page forces an eviction
+        await cache.store("https://example.com/a", "A" * 1200, headers)
+        await cache.store("https://example.com/c", "c" * 1000, headers)
+        return await cache.lookup("https://example.com/a"), threading.get_ident()
+
+    entry, loop_thread = asyncio.run(scenario())
+
+    assert entry["body"] == "A" * 1200
+    assert disk_threads and loop_thread not in disk_threads
+    summed = cache.db.execute("SELECT SUM(size) FROM bodies").fetchone()[0]
+    assert cache.stats()["disk_bytes"] == summed <= 2500
+    assert cache.stats()["evictions"] == 1
+
+
+def test_normalize_query_keeps_order_of_phrases_and_operators():
+    """Only plain keyword queries are reordered for the SERP cache key"""
+
+    normalize_query = server_module.normalize_query
+    assert normalize_query("Python  Tutorial") == normalize_query("tutorial python")
+    for first, second in [
+        ('"new york" times', 'times "new york"'),
+        ("-foo bar", "bar -foo"),
+        ("site:example.com news", "news site:example.com"),
+        ("cats OR dogs", "dogs OR cats"),
+    ]:
+        assert normalize_query(first) != normalize_query(second), (first, second)
+    assert normalize_query('"New York"  Times') == '"new york" times'
+    assert normalize_query("cats OR dogs") != normalize_query("cats or dogs")
+    # Lower-case "or" is a search term, not an operator, even next to a phrase
+    assert normalize_query('"New York" OR times') == '"new york" OR times'
+    assert normalize_query('"New York" OR times') != normalize_query('"new york" or times')
+
+
+def test_serp_cache_superset_and_stale():
+    """Near-identical queries share a SERP entry and stale entries refresh in the background"""
+
+    calls = []
+
+    async def fake_fetch(query, num_results):
+        calls.append(num_results)
+        return [
+            {"title": f"Result {i}", "url": f"https://example.com/{i}", "snippet": ""}
+            for i in range(num_results)
+        ]
+
+    async def scenario():
+        first = await server_module.search_bing("Python  Tutorial", 5)
+        second = await server_module.search_bing("tutorial python", 10)
+        server_module.CONFIG["serp_cache_ttl"] = -1
+        stale = await server_module.search_bing("python tutorial", 3)
+        await asyncio.sleep(0.05)
+        return first, second, stale
+
+    original_fetch = server_module.fetch_bing_results
+    original_ttl = server_module.CONFIG["serp_cache_ttl"]
+    server_module.fetch_bing_results = fake_fetch
+    server_module.serp_cache = server_module.SERPCache()
+    try:
+        first, second, stale = asyncio.run(scenario())
+    finally:
+        server_module.fetch_bing_results = original_fetch
+        server_module.CONFIG["serp_cache_ttl"] = original_ttl
+
+    assert (len(first), len(second), len(stale)) == (5, 10, 3)
+    assert calls == [20, 20]
+    stats = server_module.serp_cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["refreshes"]) == (1, 1, 1)
+
+
+def write_chunks(handler, chunks, delay=0.0, content_type="text/html"):
+    """Stream chunks without a Content-Length, closing the connection at the end"""
+
+    handler.send_response(200)
+    handler.send_header("Content-Type", content_type)
+    handler.send_header("Connection", "close")
+    handler.end_headers()
+    for chunk in chunks:
+        handler.wfile.write(chunk)
+        handler.wfile.flush()
+        if delay:
+            time.sleep(delay)
+    handler.close_connection = True
+
+
+def test_oversized_body_is_truncated_and_not_cached():
+    """Bodies beyond max_body_bytes are cut off and never stored"""
+
+    cache = use_fresh_cache()
+    huge = lambda h: write_chunks(h, (b"<p>" + b"x" * 65536 + b"</p>" for _ in range(200)))
+
+    with StubServer({"/huge": huge}) as stub:
+        page = run(stream_download(stub.url("/huge"), max_bytes=256 * 1024))
+        assert page.truncated
+        assert len(page.text) == 256 * 1024
+
+        body = run(get_with_retries(stub.url("/huge"), max_bytes=100_000))
+        assert len(body) == 100_000
+        assert cache.stats()["disk_entries"] == 0
+
+
+def test_slow_drip_aborts_at_deadline():
+    """An endless trickle of bytes stops at max_download_seconds"""
+
+    drip = lambda h: write_chunks(h, (b"<p>drip</p>" for _ in range(1000)), delay=0.1)
+    original_deadline = server_module.CONFIG["max_download_seconds"]
+    server_module.CONFIG["max_download_seconds"] = 1
+
+    try:
+        with StubServer({"/drip": drip}) as stub:
+            start = time.perf_counter()
+            page = run(stream_download(stub.url("/drip")))
+            elapsed = time.perf_counter() - start
+    finally:
+        server_module.CONFIG["max_download_seconds"] = original_deadline
+
+    assert page.truncated
+    assert "drip" in page.text
+    assert elapsed < 3
+
+
+def test_non_html_content_type_is_rejected():
+    """Binary downloads are refused before their body is read"""
+
+    binary = lambda h: write_chunks(
+        h, (b"\0" * 65536 for _ in range(1000)), content_type="application/zip"
+    )
+
+    with StubServer({"/file.zip": binary}) as stub:
+        try:
+            run(stream_download(stub.url("/file.zip")))
+        except ValueError as e:
+            assert "application/zip" in str(e)
+        else:
+            raise AssertionError("binary download was not rejected")
+
+
+def test_charset_from_first_chunk():
+    """A <meta charset> in the first chunk decides how the body is decoded"""
+
+    latin1 = '<html><head><meta charset="iso-8859-1"></head><body>Café</body></html>'
+    page_route = lambda h: send_response(
+        h, body=latin1.encode("iso-8859-1"), headers={"Content-Type": "text/html"}
+    )
+
+    with StubServer({"/latin1": page_route}) as stub:
+        page = run(stream_download(stub.url("/latin1")))
+
+    assert "Café" in page.text
+
+
+def fault_injecting_route(responses):
+    """Answer successive requests with the given (status, headers) pairs, then 200"""
+
+    remaining = list(responses)
+
+    def route(handler):
+        if remaining:
+            status, headers = remaining.pop(0)
+            send_response(handler, status, body="fault", headers=headers)
+        else:
+            send_response(handler)
+
+    return route
+
+
+def fetch_with_policy(url, **policy):
+    """Fetch through get_with_retries with caching off and an explicit policy"""
+
+    saved = {"cache_enabled": server_module.CONFIG["cache_enabled"]}
+    server_module.CONFIG["cache_enabled"] = False
+    policy = {"max_attempts": 3, "base_delay": 0.05, "max_delay": 0.2, "deadline": 10, **policy}
+    start = time.perf_counter()
+    try:
+        body = run(get_with_retries(url, policy=policy))
+        error = None
+    except Exception as e:
+        body, error = None, str(e)
+    finally:
+        server_module.CONFIG.update(saved)
+    return body, error, time.perf_counter() - start
+
+
+def test_first_attempt_has_no_delay():
+    """A healthy fetch is not slowed down by a pre-request sleep"""
+
+    with StubServer() as stub:
+        body, error, elapsed = fetch_with_policy(stub.url("/page"))
+
+    assert error is None and body
+    assert elapsed < 0.5
+
+
+def test_retries_transient_server_errors():
+    """5xx responses are retried until the server recovers"""
+
+    route = fault_injecting_route([(503, {}), (502, {})])
+    with StubServer({"/flaky": route}) as stub:
+        body, error, _ = fetch_with_policy(stub.url("/flaky"))
+        assert error is None and body
+        assert stub.request_count == 3
+
+
+def test_does_not_retry_client_errors():
+    """A 404 fails after a single request"""
+
+    route = fault_injecting_route([(404, {})] * 3)
+    with StubServer({"/missing": route}) as stub:
+        body, error, _ = fetch_with_policy(stub.url("/missing"))
+        assert body is None and "1 attempt" in error
+        assert stub.request_count == 1
+
+
+def test_honors_retry_after():
+    """A 429 with Retry-After delays the next attempt by at least that long"""
+
+    route = fault_injecting_route([(429, {"Retry-After": "1"})])
+    with StubServer({"/limited": route}) as stub:
+        body, error, elapsed = fetch_with_policy(stub.url("/limited"))
+
+    assert error is None and body
+    assert elapsed >= 1.0
+
+
+def test_deadline_bounds_total_time():
+    """Retries stop once the per-call deadline would be exceeded"""
+
+    route = fault_injecting_route([(503, {"Retry-After": "5"})] * 10)
+    with StubServer({"/down": route}) as stub:
+        body, error, elapsed = fetch_with_policy(
+            stub.url("/down"), max_attempts=10, deadline=2
+        )
+        assert body is None and "no time left" in error
+        assert stub.request_count == 1
+    assert elapsed < 1
+
+
+def test_circuit_breaker_fails_fast_and_recovers():
+    """A failing host trips the breaker, then a single probe closes it again"""
+
+    breaker = server_module.host_breaker = server_module.HostCircuitBreaker()
+    config = server_module.CONFIG
+    original = {key: config[key] for key in ("breaker_min_requests", "breaker_open_seconds")}
+    config.update(breaker_min_requests=3, breaker_open_seconds=0.5)
+    healthy = {"value": False}
+
+    def route(handler):
+        send_response(handler, 200 if healthy["value"] else 503)
+
+    try:
+        with StubServer({"/page": route}) as stub:
+            url = stub.url("/page")
+            for _ in range(3):
+                fetch_with_policy(url, max_attempts=1)
+            assert breaker.status()[stub.base_url[7:]]["state"] == "open"
+
+            _, error, elapsed = fetch_with_policy(url, max_attempts=1)
+            assert "Circuit open" in error and elapsed < 0.1
+            assert stub.request_count == 3
+
+            healthy["value"] = True
+            time.sleep(0.6)
+            body, error, _ = fetch_with_policy(url, max_attempts=1)
+            assert error is None and body
+            assert breaker.status()[stub.base_url[7:]]["state"] == "closed"
+    finally:
+        config.update(original)
+
+
+def run_bounded_with_probe(urls, durations=None, **limits):
+    """Run a sleeping worker through run_bounded and record how it was scheduled"""
+
+    from urllib.parse import urlparse
+
+    active = {"total": 0}
+    peaks = {"total": 0}
+    starts = {}
+
+    async def worker(url):
+        host = urlparse(url).netloc
+        starts.setdefault(host, []).append(time.monotonic())
+        active["total"] += 1
+        active[host] = active.get(host, 0) + 1
+        peaks["total"] = max(peaks["total"], active["total"])
+        peaks[host] = max(peaks.get(host, 0), active[host])
+        await asyncio.sleep((durations or {}).get(host, 0.05))
+        active["total"] -= 1
+        active[host] -= 1
+        return f"done {url}"
+
+    results = asyncio.run(server_module.run_bounded(urls, worker, **limits))
+    return results, peaks, starts
+
+
+def test_run_bounded_keeps_order_and_global_cap():
+    """Results come back in input order with at most max_concurrency in flight"""
+
+    urls = [f"https://host{i % 10}.example/{i}" for i in range(30)]
+    results, peaks, _ = run_bounded_with_probe(
+        urls, max_concurrency=4, per_host_concurrency=10, per_host_delay=0
+    )
+
+    assert results == [f"done {url}" for url in urls]
+    assert peaks["total"] == 4
+
+
+def test_run_bounded_per_host_cap_and_spacing():
+    """Each host gets at most its concurrency share, with starts spaced apart"""
+
+    urls = [f"https://busy.example/{i}" for i in range(4)] + [
+        f"https://other{i}.example/" for i in range(3)
+    ]
+    results, peaks, starts = run_bounded_with_probe(
+        urls, max_concurrency=10, per_host_concurrency=2, per_host_delay=0.03
+    )
+
+    assert results == [f"done {url}" for url in urls]
+    assert peaks["busy.example"] == 2
+    busy = starts["busy.example"]
+    assert all(b - a >= 0.029 for a, b in zip(busy, busy[1:])), busy
+    # Other hosts are not held back by the busy host's politeness delay
+    first = min(min(times) for times in starts.values())
+    assert all(starts[f"other{i}.example"][0] - first < 0.02 for i in range(3))
+
+
+def test_run_bounded_spacing_holds_under_global_contention():
+    """Requests queued on the global limit still start per_host_delay apart"""
+
+    # Two slow hosts hold both global slots, then release them at the same moment
+    urls = ["https://slow1.example/", "https://slow2.example/"] + [
+        f"https://busy.example/{i}" for i in range(3)
+    ]
+    results, peaks, starts = run_bounded_with_probe(
+        urls,
+        durations={"slow1.example": 0.2, "slow2.example": 0.2},
+        max_concurrency=2,
+        per_host_concurrency=2,
+        per_host_delay=0.1,
+    )
+
+    assert results == [f"done {url}" for url in urls]
+    assert peaks["total"] == 2
+    busy = starts["busy.example"]
+    assert busy[0] - starts["slow1.example"][0] >= 0.199
+    assert all(b - a >= 0.099 for a, b in zip(busy, busy[1:])), busy
+
+
+def extraction_routes():
+    """Stub routes for search extraction: fast pages, a 404 and slow pages"""
+
+    def slow(handler):
+        time.sleep(2)
+        send_response(handler)
+
+    return {
+        "/fast1": lambda h: send_response(h),
+        "/fast2": lambda h: send_response(h),
+        "/missing": lambda h: send_response(h, 404, "gone"),
+        "/slow1": slow,
+        "/slow2": slow,
+    }
+
+
+def extract_first(stub, paths, max_successes, time_budget):
+    saved = {"cache_enabled": server_module.CONFIG["cache_enabled"]}
+    server_module.CONFIG["cache_enabled"] = False
+    search_results = [{"title": path, "url": stub.url(path)} for path in paths]
+    start = time.perf_counter()
+    try:
+        result = run(
+            server_module.extract_first_successes(search_results, max_successes, time_budget)
+        )
+    finally:
+        server_module.CONFIG.update(saved)
+    return result, time.perf_counter() - start
+
+
+def test_extraction_stops_at_first_successes():
+    """Extraction returns once enough pages succeeded and cancels the stragglers"""
+
+    paths = ["/fast1", "/missing", "/slow1", "/fast2", "/slow2"]
+    with StubServer(extraction_routes()) as stub:
+        result, elapsed = extract_first(stub, paths, max_successes=2, time_budget=10)
+
+    extracted = result["extracted_content"]
+    assert [e["title"] for e in extracted] == ["/fast1", "/missing", "/fast2"]
+    assert [e["status"] for e in extracted] == ["success", "error", "success"]
+    assert result["cancelled"] == 2
+    assert result["timed_out"] is False
+    assert elapsed < 1.5, "waited for the slow pages"
+
+
+def test_extraction_respects_time_budget():
+    """When too few pages succeed in time, extraction stops at the budget"""
+
+    paths = ["/slow1", "/fast1", "/slow2"]
+    with StubServer(extraction_routes()) as stub:
+        result, elapsed = extract_first(stub, paths, max_successes=2, time_budget=0.5)
+
+    assert [e["title"] for e in result["extracted_content"]] == ["/fast1"]
+    assert result["cancelled"] == 2
+    assert result["timed_out"] is True
+    assert 0.5 <= elapsed < 1.5
+
+
+PARSE_PAGE = "<html><head><title>Parsed</title></head><body><article>" + (
+    "<p>Paragraph of article text for the parser.</p>" * 50
+) + "</article></body></html>"
+
+
+PARSE_SETTINGS = ("parse_executor", "parse_workers", "parse_inline_max_bytes")
+
+
+def use_parse_executor(kind: str, workers: int = 2):
+    """Send every document to a fresh ``kind`` parse pool; returns the settings it replaced"""
+
+    saved = {key: server_module.CONFIG[key] for key in PARSE_SETTINGS}
+    server_module.shutdown_parse_executor()
+    server_module.CONFIG["parse_executor"] = kind
+    server_module.CONFIG["parse_workers"] = workers
+    server_module.CONFIG["parse_inline_max_bytes"] = 0
+    return saved
+
+
+def test_parser_runs_on_thread_and_process_pools():
+    """Both executor kinds return exactly what an inline parse returns"""
+
+    expected = server_module.extract_page(PARSE_PAGE, "https://example.com/a")
+    saved = {key: server_module.CONFIG[key] for key in PARSE_SETTINGS}
+    try:
+        for kind, executor_type in [
+            ("thread", server_module.ThreadPoolExecutor),
+            ("process", server_module.ProcessPoolExecutor),
+        ]:
+            use_parse_executor(kind)
+            result = asyncio.run(
+                server_module.run_parser(
+                    server_module.extract_page, PARSE_PAGE, "https://example.com/a"
+                )
+            )
+            assert result == expected
+            assert isinstance(server_module._parse_executor, executor_type)
+    finally:
+        server_module.shutdown_parse_executor()
+        server_module.CONFIG.update(saved)
+
+
+def test_warm_parse_executor_starts_workers():
+    """Warming the process pool spawns every worker before the first page"""
+
+    saved = use_parse_executor("process")
+    try:
+        from concurrent.futures import wait
+
+        wait(server_module.warm_parse_executor())
+        executor = server_module._parse_executor
+        assert len(executor._processes) == 2
+
+        start = time.perf_counter()
+        asyncio.run(
+            server_module.run_parser(server_module.extract_page, PARSE_PAGE, "https://a.example/")
+        )
+        assert time.perf_counter() - start < 1.0, "the first parse still paid for worker startup"
+    finally:
+        server_module.shutdown_parse_executor()
+        server_module.CONFIG.update(saved)
+
+
+def test_parser_recovers_from_killed_worker():
+    """A dead worker falls back to a thread parse and a fresh pool next time"""
+
+    import signal
+
+    saved = use_parse_executor("process")
+    try:
+        from concurrent.futures import wait
+
+        wait(server_module.warm_parse_executor())
+        broken = server_module._parse_executor
+        for pid in list(broken._processes):
+            os.kill(pid, signal.SIGKILL)
+        time.sleep(0.5)
+
+        async def parse():
+            return await server_module.run_parser(
+                server_module.extract_page, PARSE_PAGE, "https://example.com/a"
+            )
+
+        assert asyncio.run(parse())["title"] == "Parsed"
+        assert server_module._parse_executor is None
+
+        assert asyncio.run(parse())["title"] == "Parsed"
+        assert server_module._parse_executor is not broken
+    finally:
+        server_module.shutdown_parse_executor()
+        server_module.CONFIG.update(saved)
+
+
+def main():
+    """Run all tests"""
+    tests = [value for key, value in globals().items() if key.startswith("test_")]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+    print("\n🎉 All tests passed!")
+
+
+if __name__ == "__main__":
+    main()